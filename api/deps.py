@@ -0,0 +1,159 @@
+"""
+FastAPI dependencies that hand a route a pooled database connection.
+
+db/ stays free of the HTTP layer (scripts use DBConnection directly); this
+module adds what only a request needs: read-your-writes routing between the
+primary and the replica, 503 on pool exhaustion, returning or closing the
+connection when the request ends, and lane admission (db/lanes.py).
+"""
+import time
+import threading
+import psycopg2
+from fastapi import Depends, HTTPException, Request
+from jose import jwt
+from jose.exceptions import JWTError
+
+from db.connection import ConnectionPool, DBConnection, PoolTimeout, READ_YOUR_WRITES_SECONDS, current
+from db.lanes import get_lane
+
+
+# ----- READ-YOUR-WRITES ROUTING -----
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_recent_writes = {}          # client key -> monotonic time of its last write
+_recent_writes_lock = threading.Lock()
+
+
+def _client_key(request: Request) -> str:
+    """
+    Identify the caller for read-your-writes routing: the token subject when a
+    bearer token is present, otherwise the client address. The token is only
+    used for routing here; it is verified by the auth dependency.
+    """
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        try:
+            sub = jwt.get_unverified_claims(auth[7:]).get("sub")
+            if sub:
+                return f"user:{sub}"
+        except JWTError:
+            pass
+    return f"addr:{request.client.host if request.client else ''}"
+
+
+def mark_write(request: Request):
+    now = time.monotonic()
+    with _recent_writes_lock:
+        _recent_writes[_client_key(request)] = now
+        if len(_recent_writes) > 10_000:
+            cutoff = now - READ_YOUR_WRITES_SECONDS
+            for key in [k for k, t in _recent_writes.items() if t < cutoff]:
+                del _recent_writes[key]
+
+
+def wrote_recently(request: Request) -> bool:
+    with _recent_writes_lock:
+        last = _recent_writes.get(_client_key(request))
+    return last is not None and time.monotonic() - last < READ_YOUR_WRITES_SECONDS
+
+
+# ----- CONNECTION DEPENDENCIES -----
+
+def _checkout(pool: ConnectionPool):
+    try:
+        return pool.getconn()
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Database is busy, please retry")
+
+
+def _serve(pool: ConnectionPool, conn):
+    lease = object()
+    conn.pool = pool
+    conn.lease = lease
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        # A detached connection is returned by its new owner, possibly before
+        # this runs, and may already belong to another request.
+        conn = current(conn)
+        if conn.lease is lease:
+            conn.lease = None
+            conn.admission = None
+            pool.putconn(conn, close=broken)
+
+
+def get_db(request: Request):
+    """
+    FastAPI dependency: check out a primary connection for one request.
+    The connection is always returned to the pool, and closed instead if the
+    request failed because the connection itself broke.
+    Non-GET requests count as writes for read-your-writes routing.
+    """
+    pool = DBConnection.get_pool()
+    conn = _checkout(pool)
+    try:
+        yield from _serve(pool, conn)
+    finally:
+        if request.method not in READ_METHODS:
+            mark_write(request)
+
+
+def get_read_db(request: Request):
+    """
+    FastAPI dependency for read-only routes: a replica connection when
+    DATABASE_REPLICA_URL is configured, unless this client wrote within the
+    last READ_YOUR_WRITES_SECONDS or the replica is unavailable, in which
+    case the primary is used.
+    """
+    replica = DBConnection.get_replica_pool()
+    if replica is not None and not wrote_recently(request):
+        try:
+            conn = replica.getconn()
+        except (PoolTimeout, RuntimeError) as e:
+            print("Replica unavailable, reading from primary:", e)
+        else:
+            yield from _serve(replica, conn)
+            return
+
+    pool = DBConnection.get_pool()
+    conn = _checkout(pool)
+    yield from _serve(pool, conn)
+
+
+# ----- LANES -----
+
+def lane_db(name: str, read_only: bool = False):
+    """
+    FastAPI dependency factory: admit the request into a lane *before* checking
+    out a pooled connection, so queued report requests never sit on connections
+    that interactive requests need. With read_only=True the connection comes
+    from get_read_db (replica routing).
+
+    Usage:
+    async def get_all_claims(conn=Depends(lane_db(REPORTS, read_only=True))):
+        queries = AsyncQueries(conn, lane=REPORTS)
+    """
+    lane = get_lane(name)
+    db_dependency = get_read_db if read_only else get_db
+
+    async def admit():
+        admission = await lane.admit()
+        try:
+            yield admission
+        finally:
+            # A streamed response releases it once the stream ends instead.
+            if not admission.detached:
+                admission.release()
+
+    # Sub-dependencies are resolved in order and torn down in reverse, so the
+    # connection is returned to the pool before the lane slot is released.
+    async def dependency(admission=Depends(admit), conn=Depends(db_dependency)):
+        conn.admission = admission
+        return conn
+
+    return dependency
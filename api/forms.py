@@ -1,14 +1,27 @@
-from fastapi import APIRouter, HTTPException, Request, Depends, Query
+import re
+import json
+import base64
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, Query
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any, Optional, List
-from sql.combinedQueries import Queries
+from sql.combinedQueries import AsyncQueries
+from sql.queries.formRegistry import FORMS
 from db.connection import DBConnection
+from db.lanes import lane_stats, REPORTS
+from db.query_metrics import query_stats
+from api.deps import get_db, get_read_db, lane_db
+from api.streaming import wants_ndjson, stream_ndjson
+from utils.cache import cache_stats
+from utils.etag import cache_etag, claim_etag, etag_matches, not_modified, set_etag
+from utils.blobs import expand_blobs, get as read_blob, is_digest, REF_PREFIX
+from utils.fast_json import FastJSONRoute
 from utils.hashing import hash_password
 from psycopg2.errors import UniqueViolation
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from utils.jwt_handler import decode_token
 from fastapi import status
-from datetime import datetime,timezone,timedelta
+from datetime import date,datetime,timezone,timedelta
 
 security = HTTPBearer(
     scheme_name="Bearer",
@@ -53,289 +66,161 @@ def get_current_user(
         permissions=payload.get("permissions", {}),
     )
 
+# Heavy list/report routes run in their own lane so they never delay form saves,
+# and read from the replica when one is configured.
+reports_db = lane_db(REPORTS, read_only=True)
+
 router = APIRouter(
     prefix="/api",
     tags=["claims"],
-    dependencies=[Depends(get_current_user)]  # ALL routes protected by default
+    dependencies=[Depends(get_current_user)],  # ALL routes protected by default
+    route_class=FastJSONRoute,
 )
 
+# Sparse fieldsets: ?fields=a,b narrows a form read to those columns plus its
+# key columns (allowlists and response views in sql/queries/formRegistry.py).
+def parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return list(dict.fromkeys(names)) or None
+
+def etag_resource(resource: str, fields: Optional[list[str]], blobs: str = "inline") -> str:
+    # Each projection is its own representation, so it gets its own ETag.
+    if fields is not None:
+        resource = f"{resource}?fields={','.join(sorted(fields))}"
+    return resource if blobs == "inline" else f"{resource}?blobs={blobs}"
+
+# Signatures and images are stored as blob references (utils/blobs.py). Reads
+# expand them unless the client asks for ?blobs=ref and fetches /blobs/{hash}.
+BLOB_CACHE_CONTROL = "private, max-age=31536000, immutable"
+BLOB_IMAGE_TYPE = re.compile(r"^image/[a-z0-9.+-]+$")   # SVG is excluded separately: it can carry script
+BLOBS_QUERY = Query("inline", pattern="^(inline|ref)$", description="inline: embed images; ref: return blob references")
+
+async def with_blobs(queries: AsyncQueries, result, blobs: str):
+    if blobs != "inline" or not result:
+        return result
+    # One file read per image: on the query lane, not the event loop.
+    return await queries.lane.run(expand_blobs, result)
+
 # -------------------------------------------------------------------
 # ENDPOINTS
 # -------------------------------------------------------------------
 
 @router.get("/accident-claims/{claim_id}")
-async def get_accident_claim(claim_id: str) -> Dict[str, Any]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    
-    result = queries.get_accident_claim(claim_id)
+async def get_accident_claim(
+    claim_id: str,
+    request: Request,
+    http_response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    blobs: str = BLOBS_QUERY,
+    conn=Depends(get_db)
+) -> Dict[str, Any]:
+    queries = AsyncQueries(conn)
+    columns = parse_fields(fields)
+
+    etag = claim_etag(etag_resource("accident-claim", columns, blobs), claim_id, await queries.get_claim_version(claim_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(http_response, etag)
+
+    try:
+        result = await with_blobs(queries, await queries.get_accident_claim(claim_id, fields=columns), blobs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not result:
         raise HTTPException(status_code=404, detail="Accident claim not found")
-    
-    return {
-        "user_name": result.get("user_name", ""),
-        "claim_id": result["claim_id"],
-        "checklist_v.d": result.get("checklist_vd"),
-        "checklist_pi": result.get("checklist_pi"),
-        "checklist_dvla": result.get("checklist_dvla"),
-        "checklist_badge": result.get("checklist_badge"),
-        "checklist_recovery": result.get("checklist_recovery"),
-        "checklist_hire": result.get("checklist_hire"),
-        "checklist_ni_no": result.get("checklist_ni_no"),
-        "checklist_storage": result.get("checklist_storage"),
-        "checklist_plate": result.get("checklist_plate"),
-        "checklist_licence": result.get("checklist_licence"),
-        "checklist_logbook": result.get("checklist_logbook"),
-        "date_of_claim": result.get("date_of_claim", ""),
-        "accident_date": result.get("accident_date", ""),
-        "accident_time": result.get("accident_time", ""),
-        "accident_location": result.get("accident_location", ""),
-        "accident_description": result.get("accident_description", ""),
-        "owner_full_name": result.get("owner_full_name", ""),
-        "owner_email": result.get("owner_email", ""),
-        "owner_telephone": result.get("owner_telephone", ""),
-        "owner_address": result.get("owner_address", ""),
-        "owner_postcode": result.get("owner_postcode", ""),
-        "owner_dob": result.get("owner_dob", ""),
-        "owner_ni_number": result.get("owner_ni_number", ""),
-        "owner_occupation": result.get("owner_occupation", ""),
-        "driver_full_name": result.get("driver_full_name", ""),
-        "driver_email": result.get("driver_email", ""),
-        "driver_telephone": result.get("driver_telephone", ""),
-        "driver_address": result.get("driver_address", ""),
-        "driver_postcode": result.get("driver_postcode", ""),
-        "driver_dob": result.get("driver_dob", ""),
-        "driver_ni_number": result.get("driver_ni_number", ""),
-        "driver_occupation": result.get("driver_occupation", ""),
-        "client_vehicle_make": result.get("client_vehicle_make", ""),
-        "client_vehicle_model": result.get("client_vehicle_model", ""),
-        "client_registration": result.get("client_registration", ""),
-        "client_policy_no": result.get("client_policy_no", ""),
-        "client_cover_type": result.get("client_cover_type", ""),
-        "client_policy_holder": result.get("client_policy_holder", ""),
-        "third_party_name": result.get("third_party_name", ""),
-        "third_party_email": result.get("third_party_email", ""),
-        "third_party_telephone": result.get("third_party_telephone", ""),
-        "third_party_address": result.get("third_party_address", ""),
-        "third_party_postcode": result.get("third_party_postcode", ""),
-        "third_party_dob": result.get("third_party_dob", ""),
-        "third_party_ni_number": result.get("third_party_ni_number", ""),
-        "third_party_occupation": result.get("third_party_occupation", ""),
-        "third_party_vehicle_make": result.get("third_party_vehicle_make", ""),
-        "third_party_vehicle_model": result.get("third_party_vehicle_model", ""),
-        "third_party_registration": result.get("third_party_registration", ""),
-        "third_party_policy_no": result.get("third_party_policy_no", ""),
-        "third_party_policy_holder": result.get("third_party_policy_holder", ""),
-        "fault_opinion": result.get("fault_opinion", ""),
-        "fault_reason": result.get("fault_reason", ""),
-        "road_conditions": result.get("road_conditions", ""),
-        "weather_conditions": result.get("weather_conditions", ""),
-        "witness1_name": result.get("witness1_name", ""),
-        "witness1_address": result.get("witness1_address", ""),
-        "witness1_postcode": result.get("witness1_postcode", ""),
-        "witness1_telephone": result.get("witness1_telephone", ""),
-        "witness2_name": result.get("witness2_name", ""),
-        "witness2_address": result.get("witness2_address", ""),
-        "witness2_postcode": result.get("witness2_postcode", ""),
-        "witness2_telephone": result.get("witness2_telephone", ""),
-        "loss_of_earnings": result.get("loss_of_earnings"),
-        "employer_details": result.get("employer_details", ""),
-        "print_name": result.get("print_name", ""),
-        "declaration_date": result.get("declaration_date", ""),
-        "client_signature": result.get("client_signature"),
-        "circumstance_drawing": result.get("circumstance_drawing"),
-        "direction_before_drawing": result.get("direction_before_drawing"),
-        "direction_after_drawing": result.get("direction_after_drawing"),
-        "json_before": result.get("json_before"),
-        "json_after": result.get("json_after")
-    }
+    return FORMS["accident_claims"].views["read"](result, columns)
 
 @router.get("/pre-inspection-forms/{claim_id}")
-async def get_pre_inspection_form(claim_id: str) -> list[Dict[str, Any]]:
+async def get_pre_inspection_form(
+    claim_id: str,
+    request: Request,
+    http_response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    blobs: str = BLOBS_QUERY,
+    conn=Depends(get_db)
+) -> list[Dict[str, Any]]:
     """
     Get ALL pre-inspection forms for given claim_id (multiple inspections)
     """
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-   
-    results = queries.get_pre_inspection_form(claim_id)
+    queries = AsyncQueries(conn)
+    columns = parse_fields(fields)
    
-    response_list = []
-    for result in results:
-        response = {
-            f"condition_{i}": result.get(f"condition_{i}", "") for i in range(1, 31)
-        }
-        response.update({
-            "user_name": result.get("user_name", ""),
-            "date": result.get("date", ""),
-            "customer": result.get("customer", ""),
-            "detailer": result.get("detailer", ""),
-            "order_number": result.get("order_number", ""),
-            "year": result.get("year", ""),
-            "make": result.get("make", ""),
-            "model": result.get("model", ""),
-            "notes": result.get("notes", ""),
-            "recommendations": result.get("recommendations", ""),
-            "customer_signature": result.get("customer_signature"),
-            "detailer_signature": result.get("detailer_signature"),
-            "base_vehicle_image": result.get("base_vehicle_image"),
-            "annotated_vehicle_image": result.get("annotated_vehicle_image"),
-            "claim_id": result["claim_id"],
-            "inspection_id": result["inspection_id"],
-        })
-        response_list.append(response)
-    
-    return response_list
+    etag = claim_etag(etag_resource("pre-inspection-forms", columns, blobs), claim_id, await queries.get_claim_version(claim_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(http_response, etag)
+
+    try:
+        results = await with_blobs(queries, await queries.get_pre_inspection_form(claim_id, fields=columns), blobs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    view = FORMS["pre_inspection_forms"].views["read"]
+    return [view(result, columns) for result in results]
 
 @router.get("/cancellation-forms/{claim_id}")
-async def get_cancellation_form(claim_id: str) -> Dict[str, Any]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_cancellation_form(claim_id: str, blobs: str = BLOBS_QUERY, conn=Depends(get_db)) -> Dict[str, Any]:
+    queries = AsyncQueries(conn)
     
-    result = queries.get_cancellation_form(claim_id)
+    result = await with_blobs(queries, await queries.get_cancellation_form(claim_id), blobs)
     if not result:
         raise HTTPException(status_code=404, detail="Cancellation form not found")
-    
-    return {
-        "user_name": result.get("user_name", ""),
-        "name": result.get("name", ""),
-        "address": result.get("address", ""),
-        "postcode": result.get("postcode", ""),
-        "email": result.get("email", ""),
-        "cancellation_date": result.get("cancellation_date", ""),
-        "cancellation_signature": result.get("cancellation_signature"),
-        "claim_id": result["claim_id"]
-    }
+    return FORMS["cancellation_forms"].views["read"](result)
 
 @router.get("/storage-forms/{claim_id}")
-async def get_storage_form(claim_id: str) -> Dict[str, Any]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    
-    result = queries.get_storage_form(claim_id)
+async def get_storage_form(
+    claim_id: str,
+    request: Request,
+    http_response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    blobs: str = BLOBS_QUERY,
+    conn=Depends(get_db)
+) -> Dict[str, Any]:
+    queries = AsyncQueries(conn)
+    columns = parse_fields(fields)
+
+    etag = claim_etag(etag_resource("storage-form", columns, blobs), claim_id, await queries.get_claim_version(claim_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(http_response, etag)
+
+    try:
+        result = await with_blobs(queries, await queries.get_storage_form(claim_id, fields=columns), blobs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not result:
         raise HTTPException(status_code=404, detail="Storage form not found")
-    
-    return {
-        "user_name": result.get("user_name", ""),
-        "name": result.get("name", ""),
-        "postcode": result.get("postcode", ""),
-        "address1": result.get("address1", ""),
-        "address2": result.get("address2", ""),
-        "vehicle_make": result.get("vehicle_make", ""),
-        "vehicle_model": result.get("vehicle_model", ""),
-        "registration_number": result.get("registration_number", ""),
-        "date_of_recovery": result.get("date_of_recovery", ""),
-        "storage_start_date": result.get("storage_start_date", ""),
-        "storage_end_date": result.get("storage_end_date", ""),
-        "number_of_days": result.get("number_of_days"),
-        "charges_per_day": result.get("charges_per_day"),
-        "total_storage_charge": result.get("total_storage_charge"),
-        "recovery_charge": result.get("recovery_charge"),
-        "subtotal": result.get("subtotal"),
-        "vat_amount": result.get("vat_amount"),
-        "invoice_total": result.get("invoice_total"),
-        "client_date": result.get("client_date", ""),
-        "owner_date": result.get("owner_date", ""),
-        "client_signature": result.get("client_signature"),
-        "owner_signature": result.get("owner_signature"),
-        "claim_id": result["claim_id"],
-        "storage_location_key": result.get("storage_location_key", "") 
-    }
+    return FORMS["storage_forms"].views["read"](result, columns)
 
 @router.get("/rental-agreements/{claim_id}")
-async def get_rental_agreement(claim_id: str) -> Dict[str, Any]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    
-    result = queries.get_rental_agreement(claim_id)
+async def get_rental_agreement(
+    claim_id: str,
+    request: Request,
+    http_response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    blobs: str = BLOBS_QUERY,
+    conn=Depends(get_db)
+) -> Dict[str, Any]:
+    queries = AsyncQueries(conn)
+    columns = parse_fields(fields)
+
+    etag = claim_etag(etag_resource("rental-agreement", columns, blobs), claim_id, await queries.get_claim_version(claim_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(http_response, etag)
+
+    try:
+        result = await with_blobs(queries, await queries.get_rental_agreement(claim_id, fields=columns), blobs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not result:
         raise HTTPException(status_code=404, detail="Rental agreement not found")
-    
-    response = {
-        "user_name": result.get("user_name", ""),
-        "rental_agreement_id": result["rental_agreement_id"],
-        "claim_id": result["claim_id"],
-        "hirer_name": result.get("hirer_name", ""),
-        "title": result.get("title", ""),
-        "permanent_address": result.get("permanent_address", ""),
-        "additional_driver_name": result.get("additional_driver_name", ""),
-        "licence_no": result.get("licence_no", ""),
-        "date_issued": result.get("date_issued", ""),
-        "expiry_date": result.get("expiry_date", ""),
-        "dob": result.get("dob", ""),
-        "date_test_passed": result.get("date_test_passed", ""),
-        "occupation": result.get("occupation", ""),
-        "daily_rate": result.get("daily_rate"),
-        "policy_excess": result.get("policy_excess"),
-        "deposit": result.get("deposit"),
-        "refuelling_charge": result.get("refuelling_charge"),
-        "insurance_company": result.get("insurance_company", ""),
-        "policy_no": result.get("policy_no", ""),
-        "insurance_dates": result.get("insurance_dates", ""),
-        "own_insurance_confirm": result.get("own_insurance_confirm", "No"),
-        "insurance_date": result.get("insurance_date", ""),
-        "insurance_time": result.get("insurance_time", ""),
-        "new_licence_no": result.get("new_licence_no", ""),
-        "new_date_issued": result.get("new_date_issued", ""),
-        "new_expiry_date": result.get("new_expiry_date", ""),
-        "new_dob": result.get("new_dob", ""),
-        "new_date_test_passed": result.get("new_date_test_passed", ""),
-        "new_occupation": result.get("new_occupation", ""),
-        "motoring_offence_3yrs": result.get("motoring_offence_3yrs", ""),
-        "disqualified_5yrs": result.get("disqualified_5yrs", ""),
-        "accident_3yrs": result.get("accident_3yrs", ""),
-        "insurance_declined_5yrs": result.get("insurance_declined_5yrs", ""),
-        "dishonesty_conviction": result.get("dishonesty_conviction", ""),
-        "medical_condition1": result.get("medical_condition1", ""),
-        "medical_condition2": result.get("medical_condition2", ""),
-        "medical_details": result.get("medical_details", ""),
-        "additional_driver_auth": result.get("additional_driver_auth", ""),
-        "hire_vehicle_reg": result.get("hire_vehicle_reg", ""),
-        "hire_vehicle_make": result.get("hire_vehicle_make", ""),
-        "hire_vehicle_model": result.get("hire_vehicle_model", ""),
-        "hire_vehicle_group": result.get("hire_vehicle_group", ""),
-        "hire_vehicle_date_out": result.get("hire_vehicle_date_out", ""),
-        "hire_vehicle_date_in": result.get("hire_vehicle_date_in", ""),
-        "hire_vehicle_fuel_out": result.get("hire_vehicle_fuel_out", ""),
-        "hire_vehicle_fuel_in": result.get("hire_vehicle_fuel_in", ""),
-        "hire_vehicle_rate_per_day": result.get("hire_vehicle_rate_per_day", ""),
-        "change_vehicle_reg": result.get("change_vehicle_reg", ""),
-        "change_vehicle_make": result.get("change_vehicle_make", ""),
-        "change_vehicle_model": result.get("change_vehicle_model", ""),
-        "change_vehicle_group": result.get("change_vehicle_group", ""),
-        "change_vehicle_date_out": result.get("change_vehicle_date_out", ""),
-        "change_vehicle_date_in": result.get("change_vehicle_date_in", ""),
-        "change_vehicle_fuel_out": result.get("change_vehicle_fuel_out", ""),
-        "change_vehicle_fuel_in": result.get("change_vehicle_fuel_in", ""),
-        "admin_fee": result.get("admin_fee"),
-        "delivery_charge": result.get("delivery_charge"),
-        "cdw_per_day": result.get("cdw_per_day"),
-        "days_out": result.get("days_out"),
-        "days_in": result.get("days_in"),
-        "total_days": result.get("total_days"),
-        "rate_per_day": result.get("rate_per_day"),
-        "refuelling_total": result.get("refuelling_total"),
-        "subtotal": result.get("subtotal"),
-        "vat": result.get("vat"),
-        "total_cost": result.get("total_cost"),
-        "declaration_date": result.get("declaration_date", ""),
-        "liability_date": result.get("liability_date", ""),
-        "hirer_signature_terms": result.get("hirer_signature_terms"),
-        "company_signature": result.get("company_signature"),
-        "hirer_signature_insurance": result.get("hirer_signature_insurance"),
-        "declaration_signature": result.get("declaration_signature"),
-        "liability_signature": result.get("liability_signature"),
-        "change_vehicle_history": result.get("change_vehicle_history", ""),
-        "hire_vehicle_miles_out": result.get("hire_vehicle_miles_out", ""),
-        "hire_vehicle_miles_in": result.get("hire_vehicle_miles_in", "")
-    }
-    return response
+    return FORMS["rental_agreements"].views["read"](result, columns)
 
 @router.post("/claims")
-async def create_claim(payload: Dict[str, Any]):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_claim(payload: Dict[str, Any], conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     claimant_name = payload.get("claimant_name")
     claim_type    = payload.get("claim_type")
@@ -349,7 +234,7 @@ async def create_claim(payload: Dict[str, Any]):
         )
 
     try:
-        a = queries.insert_claim(
+        a = await queries.insert_claim(
             claimant_name=claimant_name,
             claim_type=claim_type,
             council=council,
@@ -357,13 +242,11 @@ async def create_claim(payload: Dict[str, Any]):
         )
         
     except UniqueViolation:
-        conn.rollback()
         raise HTTPException(
             status_code=409,
             detail="claim_id already exists"
         )
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
     return {
@@ -372,11 +255,10 @@ async def create_claim(payload: Dict[str, Any]):
     }
 
 @router.delete("/claims/{claim_id}")
-async def delete_claim(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def delete_claim(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    deleted = queries.delete_claim(claim_id)
+    deleted = await queries.delete_claim(claim_id)
 
     if not deleted:
         raise HTTPException(
@@ -390,28 +272,142 @@ async def delete_claim(claim_id: str):
     }
 
 @router.get("/claims")
-async def get_all_claims() -> list[Dict[str, Any]]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    return queries.get_all_claims()
+async def get_all_claims(
+    request: Request,
+    http_response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    status: Optional[List[str]] = Query(None),
+    claim_type: Optional[List[str]] = Query(None),
+    council: Optional[List[str]] = Query(None),
+    is_disputed: Optional[bool] = None,
+    date_field: str = "claim_start_date",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    conn=Depends(reports_db),
+):
+    """
+    Without paging, filter or sort parameters this returns every claim, as
+    before. With any of them it returns one page:
+    {"data": [...], "next_cursor": "...", "has_more": bool};
+    pass next_cursor back as `cursor` (with the same sort/order) for the next page.
+    status, claim_type and council may be repeated to match any of the values.
+    The full list is streamed one claim per line with Accept: application/x-ndjson.
+    Lists served from the claims cache carry an ETag, so pollers revalidate
+    and the compressed body is reused (utils/compression.py).
+    """
+    queries = AsyncQueries(conn, lane=REPORTS)
+
+    paged = any(v is not None for v in (
+        limit, cursor, sort, status, claim_type, council, is_disputed, date_from, date_to
+    ))
+    if not paged:
+        if wants_ndjson(request):
+            return stream_ndjson(conn, await queries.get_all_claims(stream=True))
+        version, result = await queries.get_all_claims(versioned=True)
+    else:
+        try:
+            version, result = await queries.get_claims_page(
+                limit=limit or 50,
+                cursor=cursor,
+                sort=sort or "claim_id",
+                order=order,
+                status=status,
+                claim_type=claim_type,
+                council=council,
+                is_disputed=is_disputed,
+                date_field=date_field,
+                date_from=date_from,
+                date_to=date_to,
+                versioned=True,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    etag = cache_etag(f"claims?{request.url.query}", version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(http_response, etag)
+    return result
+
+@router.get("/claims/changes")
+async def get_claims_changes(since: Optional[str] = None, conn=Depends(get_db)) -> Dict[str, Any]:
+    """
+    Delta sync for the claims list. Call without `since` for every live claim
+    and a cursor, then pass the last cursor back as `since` to get only the
+    claims changed after it ("changed", full rows) and the ids of claims
+    deleted after it ("deleted"). Rows may repeat across polls; apply them
+    idempotently. Always reads the primary so a cursor never runs ahead of
+    the data it was read with.
+    """
+    queries = AsyncQueries(conn)
+
+    if since is not None and not since.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return await queries.get_claims_changes(int(since) if since is not None else None)
 
 @router.get("/claims/{claim_id}")
-async def get_claim(claim_id: str) -> Dict[str, Any]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_claim(claim_id: str, request: Request, http_response: Response, conn=Depends(get_db)) -> Dict[str, Any]:
+    queries = AsyncQueries(conn)
+
+    etag = claim_etag("claim", claim_id, await queries.get_claim_version(claim_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(http_response, etag)
 
-    result = queries.get_claim_by_id(claim_id)
+    result = await queries.get_claim_by_id(claim_id)
     if not result:
         raise HTTPException(status_code=404, detail="Claim not found")
 
     return result
 
+@router.get("/claims/{claim_id}/bundle")
+async def get_claim_bundle(
+    claim_id: str,
+    request: Request,
+    include: Optional[str] = Query(None, description="Comma-separated sections, e.g. claim,accident_claim,invoices"),
+    blobs: str = BLOBS_QUERY,
+    conn=Depends(get_db)
+):
+    """
+    Everything the claim screen loads, in one response: the claim plus the
+    requested sections (all when include is not given). The JSON is built
+    by Postgres, so it is passed through without re-encoding (unless blob
+    references have to be expanded).
+    """
+    queries = AsyncQueries(conn)
+    sections = parse_fields(include)
+    resource = etag_resource("bundle", sections, blobs)
+
+    # Revalidation costs one indexed lookup, not the bundle statement.
+    if request.headers.get("if-none-match"):
+        etag = claim_etag(resource, claim_id, await queries.get_claim_version(claim_id))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    try:
+        bundle = await queries.get_claim_bundle(claim_id, include=sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not bundle:
+        raise HTTPException(status_code=404, detail="Claim not found")
+
+    version, body = bundle
+    etag = claim_etag(resource, claim_id, version)
+    if blobs == "inline" and REF_PREFIX in body:
+        body = await queries.lane.run(lambda: json.dumps(expand_blobs(json.loads(body))))
+    response = Response(content=body, media_type="application/json")
+    set_etag(response, etag)
+    return response
+
 @router.get("/claim-documents/{claim_id}", response_model=Dict[str, Any])
-async def get_claim_documents(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_claim_documents(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    result = queries.get_claim_documents(claim_id)
+    result = await queries.get_claim_documents(claim_id)
 
     if not result:
         raise HTTPException(status_code=404, detail="Documents not found")
@@ -422,11 +418,10 @@ async def get_claim_documents(claim_id: str):
     }
 
 @router.delete("/claim-documents/{claim_id}/{doc_name}")
-async def delete_claim_document(claim_id: str, doc_name: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def delete_claim_document(claim_id: str, doc_name: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    success = queries.delete_claim_document(claim_id, doc_name)
+    success = await queries.delete_claim_document(claim_id, doc_name)
 
     if not success:
         raise HTTPException(status_code=404, detail="Document not found for this claim")
@@ -445,6 +440,7 @@ class RegisterUserRequest(BaseModel):
 async def register_user(
     data: RegisterUserRequest,
     current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(
@@ -452,12 +448,12 @@ async def register_user(
             detail="Admin privileges required",
         )
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    hashed_password = hash_password(data.password)
+    # argon2 takes tens of milliseconds of CPU: on the lane, not the event loop.
+    hashed_password = await queries.lane.run(hash_password, data.password)
 
-    user = queries.create_user(
+    user = await queries.create_user(
         data.username,
         hashed_password,
         data.role
@@ -479,6 +475,7 @@ class ChangePasswordRequest(BaseModel):
 async def change_password(
     data: ChangePasswordRequest,
     current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(
@@ -486,12 +483,11 @@ async def change_password(
             detail="Admin privileges required",
         )
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    hashed_password = hash_password(data.new_password)
+    hashed_password = await queries.lane.run(hash_password, data.new_password)
 
-    success = queries.change_user_password(
+    success = await queries.change_user_password(
         data.username,
         hashed_password
     )
@@ -508,6 +504,7 @@ async def change_password(
 async def delete_user(
     user_id: int,
     current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(
@@ -515,10 +512,9 @@ async def delete_user(
             detail="Admin privileges required",
         )
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    deleted = queries.delete_user(user_id)
+    deleted = await queries.delete_user(user_id)
 
     if not deleted:
         raise HTTPException(
@@ -534,11 +530,10 @@ class SoftDeleteClaimRequest(BaseModel):
     deleted_by: str
 
 @router.put("/claims/{claim_id}/soft-delete")
-async def soft_delete_claim(claim_id: str, request: SoftDeleteClaimRequest):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def soft_delete_claim(claim_id: str, request: SoftDeleteClaimRequest, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    deleted = queries.soft_delete_claim(claim_id, request.deleted_by)
+    deleted = await queries.soft_delete_claim(claim_id, request.deleted_by)
 
     if not deleted:
         raise HTTPException(
@@ -557,11 +552,10 @@ class CloseClaimRequest(BaseModel):
     reason: Optional[str] = None
 
 @router.put("/claims/{claim_id}/close")
-async def close_claim(claim_id: str, request: CloseClaimRequest):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def close_claim(claim_id: str, request: CloseClaimRequest, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    closed = queries.close_claim(claim_id, request.closed_by, request.reason)
+    closed = await queries.close_claim(claim_id, request.closed_by, request.reason)
 
     if not closed:
         raise HTTPException(
@@ -576,11 +570,10 @@ async def close_claim(claim_id: str, request: CloseClaimRequest):
     }
 
 @router.put("/claims/{claim_id}/reopen")
-async def reopen_claim(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def reopen_claim(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    reopened = queries.reopen_claim(claim_id)
+    reopened = await queries.reopen_claim(claim_id)
 
     if not reopened:
         raise HTTPException(
@@ -596,6 +589,7 @@ async def reopen_claim(claim_id: str):
 @router.get("/users")
 async def get_all_users(
     current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(
@@ -603,21 +597,19 @@ async def get_all_users(
             detail="Admin privileges required",
         )
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    users = queries.get_all_non_admin_users()
+    users = await queries.get_all_non_admin_users()
 
     return {
         "users": users
     }
 
 @router.get("/recently")
-async def recently_deleted_claims():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def recently_deleted_claims(conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    claims = queries.get_recently_deleted_claims()
+    claims = await queries.get_recently_deleted_claims()
 
     if not claims:
         return {"count": 0, "claims": []}
@@ -629,12 +621,13 @@ async def recently_deleted_claims():
 
 @router.get("/pre-inspection-forms/inspection/{inspection_id}")
 async def get_pre_inspection_form_by_inspection_id(
-    inspection_id: str
+    inspection_id: str,
+    blobs: str = BLOBS_QUERY,
+    conn=Depends(get_db)
 ) -> Dict[str, Any]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    result = queries.get_pre_inspection_form_by_inspection(inspection_id)
+    result = await with_blobs(queries, await queries.get_pre_inspection_form_by_inspection(inspection_id), blobs)
 
     if not result:
         raise HTTPException(
@@ -642,27 +635,7 @@ async def get_pre_inspection_form_by_inspection_id(
             detail="Pre-inspection form not found for this inspection_id"
         )
 
-    response = {f"condition_{i}": result.get(f"condition_{i}", "") for i in range(1, 31)}
-
-    response.update({
-        "date": result.get("date", ""),
-        "customer": result.get("customer", ""),
-        "detailer": result.get("detailer", ""),
-        "order_number": result.get("order_number", ""),
-        "year": result.get("year", ""),
-        "make": result.get("make", ""),
-        "model": result.get("model", ""),
-        "notes": result.get("notes", ""),
-        "recommendations": result.get("recommendations", ""),
-        "customer_signature": result.get("customer_signature"),
-        "detailer_signature": result.get("detailer_signature"),
-        "base_vehicle_image": result.get("base_vehicle_image"),
-        "annotated_vehicle_image": result.get("annotated_vehicle_image"),
-        "claim_id": result.get("claim_id"),
-        "inspection_id": result.get("inspection_id"),
-    })
-
-    return response
+    return FORMS["pre_inspection_forms"].views["saved"](result)
 
 class InvoiceCreate(BaseModel):
     claim_id: str
@@ -673,11 +646,10 @@ class InvoiceCreate(BaseModel):
     user_name: str
 
 @router.post("/invoice")
-async def create_invoice(data: InvoiceCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_invoice(data: InvoiceCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    invoice_id = queries.insert_invoice(
+    invoice_id = await queries.insert_invoice(
         data.claim_id,
         data.info,
         data.docs,
@@ -706,12 +678,12 @@ class InvoiceUpdate(BaseModel):
 async def update_invoice(
     invoice_id: int,
     data: InvoiceUpdate,
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db)
 ):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    updated_id = queries.update_invoice(
+    updated_id = await queries.update_invoice(
         invoice_id,
         data.info,
         data.storage_bill,
@@ -746,12 +718,12 @@ class InvoiceDatetimeUpdate(BaseModel):
 async def update_invoice_datetime(
     invoice_id: int,
     data: InvoiceDatetimeUpdate,
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db)
 ):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    updated = queries.update_invoice_datetime(
+    updated = await queries.update_invoice_datetime(
         invoice_id,
         data.invoice_datetime
     )
@@ -765,11 +737,13 @@ async def update_invoice_datetime(
 
 
 @router.get("/invoice")
-async def get_all_invoices():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_all_invoices(request: Request, conn=Depends(reports_db)):
+    queries = AsyncQueries(conn, lane=REPORTS)
 
-    invoices = queries.get_all_invoices()
+    if wants_ndjson(request):
+        return stream_ndjson(conn, await queries.get_all_invoices(stream=True))
+
+    invoices = await queries.get_all_invoices()
 
     return {
         "success": True,
@@ -778,11 +752,10 @@ async def get_all_invoices():
     }
 
 @router.get("/invoice/{claim_id}")
-async def get_invoices(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_invoices(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    invoices = queries.get_invoices_by_claim_id(claim_id)
+    invoices = await queries.get_invoices_by_claim_id(claim_id)
 
     return {
         "success": True,
@@ -794,10 +767,10 @@ async def get_invoices(claim_id: str):
 async def update_claim(
     claim_id: str, 
     payload: Dict[str, Any],
-    current_user: CurrentUser = Depends(get_current_user)  # Inject the current user here
+    current_user: CurrentUser = Depends(get_current_user),  # Inject the current user here
+    conn=Depends(get_db)
 ):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
     valid_fields = ["claimant_name", "council", "claim_type", "pay_date", "claim_start_date", "invoice_date"]
     update_data = {k: payload[k] for k in valid_fields if k in payload}
@@ -810,7 +783,7 @@ async def update_claim(
 
     try:
         # Pass the username to the database function
-        updated = queries.update_claim_dynamic(
+        updated = await queries.update_claim_dynamic(
             claim_id, 
             update_data, 
             updated_by=current_user.username
@@ -823,7 +796,6 @@ async def update_claim(
             )
 
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
     return {"message": "Claim updated successfully", "claim_id": claim_id}
@@ -836,18 +808,16 @@ class CarCreate(BaseModel):
     attributes: Optional[List[str]] = []
 
 @router.post("/car")
-async def create_car(payload: CarCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_car(payload: CarCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
     try:
-        queries.insert_car(
+        await queries.insert_car(
             payload.model,
             payload.name,
             payload.reg_no,
             payload.attributes if payload.attributes is not None else []
         )
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     return {
         "success": True,
@@ -865,12 +835,11 @@ class CarUpdate(BaseModel):
     ownership_amount: Optional[float] = None
 
 @router.put("/car/{car_id}")
-async def update_car(car_id: int, payload: CarUpdate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_car(car_id: int, payload: CarUpdate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     try:
-        updated = queries.update_car(
+        updated = await queries.update_car(
                 car_id,
                 payload.model,
                 payload.name,
@@ -882,7 +851,6 @@ async def update_car(car_id: int, payload: CarUpdate):
                 payload.ownership_amount,
             )
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
     if not updated:
@@ -894,11 +862,10 @@ async def update_car(car_id: int, payload: CarUpdate):
     }
 
 @router.delete("/car/{car_id}")
-async def delete_car(car_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def delete_car(car_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    deleted = queries.delete_car(car_id)
+    deleted = await queries.delete_car(car_id)
     if deleted:
         return {
             "success": True,
@@ -911,11 +878,10 @@ async def delete_car(car_id: str):
         }
 
 @router.get("/car/{car_id}")
-async def get_car_by_id(car_id: int):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_car_by_id(car_id: int, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    car = queries.get_car_by_id(car_id)
+    car = await queries.get_car_by_id(car_id)
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
 
@@ -925,11 +891,10 @@ async def get_car_by_id(car_id: int):
     }
 
 @router.get("/cars")
-async def get_all_cars():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_all_cars(conn=Depends(get_read_db)):
+    queries = AsyncQueries(conn)
 
-    cars = queries.get_all_cars()
+    cars = await queries.get_all_cars()
 
     return {
         "success": True,
@@ -938,11 +903,10 @@ async def get_all_cars():
     }
 
 @router.get("/cars/free/count")
-async def get_non_long_hire_cars_count():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_non_long_hire_cars_count(conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    count = queries.get_non_long_hire_cars_count()
+    count = await queries.get_non_long_hire_cars_count()
 
     return {
         "success": True,
@@ -950,11 +914,10 @@ async def get_non_long_hire_cars_count():
     }
 
 @router.get("/cars/free")
-async def get_free_cars():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_free_cars(conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    cars = queries.get_free_cars()
+    cars = await queries.get_free_cars()
 
     return {
         "success": True,
@@ -963,11 +926,10 @@ async def get_free_cars():
     }
 
 @router.get("/cars/available")
-async def get_available_cars():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_available_cars(conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    cars = queries.get_available_cars()
+    cars = await queries.get_available_cars()
 
     return {
         "success": True,
@@ -983,15 +945,14 @@ class LongClaimCreate(BaseModel):
     hirer_name: Optional[str] = None
 
 @router.post("/long-claim")
-async def create_long_claim(payload: LongClaimCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_long_claim(payload: LongClaimCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
     if not payload.starting_date:
         payload.starting_date = None
     if not payload.ending_date:
         payload.ending_date = None
 
-    long_claim_id = queries.insert_long_claim(
+    long_claim_id = await queries.insert_long_claim(
         payload.starting_date,
         payload.ending_date,
         payload.hirer_name
@@ -1009,16 +970,15 @@ class LongClaimUpdate(BaseModel):
     hirer_name: Optional[str] = None
 
 @router.put("/long-claim")
-async def update_long_claim(payload: LongClaimUpdate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_long_claim(payload: LongClaimUpdate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     if not payload.starting_date:
         payload.starting_date = None
     if not payload.ending_date:
         payload.ending_date = None
 
-    queries.update_long_claim(
+    await queries.update_long_claim(
         payload.long_claim_id,
         payload.starting_date,
         payload.ending_date,
@@ -1034,11 +994,10 @@ class LongClaimCarAction(BaseModel):
     car_id: int
 
 @router.post("/long-claim/{long_claim_id}/add-car")
-async def add_car_to_long_claim(long_claim_id: str, payload: LongClaimCarAction):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def add_car_to_long_claim(long_claim_id: str, payload: LongClaimCarAction, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    queries.add_car_to_long_claim(long_claim_id, payload.car_id)
+    await queries.add_car_to_long_claim(long_claim_id, payload.car_id)
 
     return {
         "success": True,
@@ -1046,11 +1005,10 @@ async def add_car_to_long_claim(long_claim_id: str, payload: LongClaimCarAction)
     }
 
 @router.delete("/long-claim/{long_claim_id}/remove-car/{car_id}")
-async def remove_car_from_long_claim(long_claim_id: str, car_id: int):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def remove_car_from_long_claim(long_claim_id: str, car_id: int, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    queries.remove_car_from_long_claim(long_claim_id, car_id)
+    await queries.remove_car_from_long_claim(long_claim_id, car_id)
 
     return {
         "success": True,
@@ -1058,11 +1016,10 @@ async def remove_car_from_long_claim(long_claim_id: str, car_id: int):
     }
 
 @router.get("/long-claims")
-async def get_all_long_claims():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_all_long_claims(conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    claims = queries.get_all_long_claims()
+    claims = await queries.get_all_long_claims()
 
     return {
         "success": True,
@@ -1085,12 +1042,11 @@ class ClaimantCreate(BaseModel):
     delivery_charges: Optional[float] = 0
 
 @router.post("/claimant")
-async def create_claimant(payload: ClaimantCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_claimant(payload: ClaimantCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     try:
-        claimant_id = queries.insert_claimant(
+        claimant_id = await queries.insert_claimant(
             payload.long_claim_id,
             payload.car_id,
             payload.start_date,
@@ -1125,9 +1081,8 @@ class ClaimantUpdate(BaseModel):
     delivery_charges: Optional[float] = None
 
 @router.put("/claimant/{claimant_id}")
-async def update_claimant(claimant_id: int, payload: ClaimantUpdate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_claimant(claimant_id: int, payload: ClaimantUpdate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     try:
         update_data = payload.model_dump(exclude_unset=True)
@@ -1135,7 +1090,7 @@ async def update_claimant(claimant_id: int, payload: ClaimantUpdate):
         if not update_data:
             return {"success": True, "message": "No updates provided"}
 
-        queries.update_claimant(claimant_id, update_data)
+        await queries.update_claimant(claimant_id, update_data)
 
         return {
             "success": True,
@@ -1149,11 +1104,10 @@ async def update_claimant(claimant_id: int, payload: ClaimantUpdate):
         )
 
 @router.get("/claimants/refs/long_claims")
-async def get_long_claims_by_refs(ref_nos: List[str] = Query(..., description="List of reference numbers")):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_long_claims_by_refs(ref_nos: List[str] = Query(..., description="List of reference numbers"), conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    raw_data = queries.get_long_claims_for_refs(ref_nos=ref_nos)
+    raw_data = await queries.get_long_claims_for_refs(ref_nos=ref_nos)
 
     formatted_data = {
         str(row["ref_no"]): row["long_claim_ids"] 
@@ -1166,22 +1120,20 @@ async def get_long_claims_by_refs(ref_nos: List[str] = Query(..., description="L
     }
 
 @router.delete("/claimant/{claimant_id}")
-async def delete_claimant(claimant_id: int):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def delete_claimant(claimant_id: int, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    deleted = queries.delete_claimant(claimant_id)
+    deleted = await queries.delete_claimant(claimant_id)
     if deleted:
         return {"success": True, "message": "Claimant deleted successfully"}
     else:
         return {"success": False, "message": "Claimant not found"}
 
 @router.get("/claimant/{claimant_id}")
-async def get_claimant_by_id(claimant_id: int):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_claimant_by_id(claimant_id: int, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    data = queries.get_claimant(claimant_id=claimant_id)
+    data = await queries.get_claimant(claimant_id=claimant_id)
 
     return {
         "success": True,
@@ -1190,11 +1142,13 @@ async def get_claimant_by_id(claimant_id: int):
     }
 
 @router.get("/claimants")
-async def get_all_claimants():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_all_claimants(request: Request, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
+
+    if wants_ndjson(request):
+        return stream_ndjson(conn, await queries.get_all_claimants(stream=True))
 
-    data = queries.get_all_claimants()
+    data = await queries.get_all_claimants()
 
     return {
         "success": True,
@@ -1205,11 +1159,10 @@ async def get_all_claimants():
 # ---------------------- HIRE CHECKLIST ----------------------
 
 @router.get("/long-claim/{long_claim_id}/cars")
-async def get_cars_for_long_claim(long_claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_cars_for_long_claim(long_claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    data = queries.get_cars_by_long_claim(long_claim_id)
+    data = await queries.get_cars_by_long_claim(long_claim_id)
 
     return {
         "success": True,
@@ -1218,11 +1171,10 @@ async def get_cars_for_long_claim(long_claim_id: str):
     }
 
 @router.get("/car/{car_id}/claimants/{claim_id}")
-async def get_claimants_for_car(car_id: int, claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_claimants_for_car(car_id: int, claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    data = queries.get_claimants_by_car(car_id, claim_id)
+    data = await queries.get_claimants_by_car(car_id, claim_id)
 
     return {
         "success": True,
@@ -1231,11 +1183,10 @@ async def get_claimants_for_car(car_id: int, claim_id: str):
     }
 
 @router.get("/long-hire/{long_claim_id}/claimants")
-async def get_claimants_for_claim(long_claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_claimants_for_claim(long_claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    data = queries.get_claimants_for_claim(long_claim_id)
+    data = await queries.get_claimants_for_claim(long_claim_id)
 
     claimants_by_car = {}
     for claimant in data:
@@ -1251,10 +1202,9 @@ async def get_claimants_for_claim(long_claim_id: str):
     }
 
 @router.get("/long-claims/{claim_id}")
-async def get_long_claim_by_id(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    claim = queries.get_long_claim_by_id(claim_id)
+async def get_long_claim_by_id(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
+    claim = await queries.get_long_claim_by_id(claim_id)
     if not claim:
         return {
             "success": False,
@@ -1267,59 +1217,53 @@ async def get_long_claim_by_id(claim_id: str):
     }
 
 @router.put("/long-claim/{long_claim_id}/mark-invoice")
-async def mark_invoice(long_claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def mark_invoice(long_claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    updated = queries.mark_invoice(long_claim_id)
+    updated = await queries.mark_invoice(long_claim_id)
     if updated:
         return {"success": True, "message": "Invoice marked as true"}
     else:
         return {"success": False, "message": "Long claim not found"}
     
 @router.put("/long-claims/{claim_id}/restore")
-async def restore_claim(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    restored = queries.restore_claim(claim_id)
+async def restore_claim(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
+    restored = await queries.restore_claim(claim_id)
     if restored == 0:
         return {"success": False, "message": "Claim not found"}
     return {"success": True, "message": f"Claim {claim_id} restored successfully."}
 
 @router.delete("/long-claims/{claim_id}/delete")
-async def delete_long_claim(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    deleted = queries.delete_long_claim(claim_id)
+async def delete_long_claim(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
+    deleted = await queries.delete_long_claim(claim_id)
     if deleted == 0:
         return {"success": False, "message": "Claim not found"}
     return {"success": True, "message": f"Claim {claim_id} deleted permanently."}
 
 @router.patch("/long-claims/{claim_id}/mark-deleted")
-async def mark_recently_deleted(claim_id: str, payload: Dict[str, str]):
+async def mark_recently_deleted(claim_id: str, payload: Dict[str, str], conn=Depends(get_db)):
     deleted_by = payload.get("deleted_by")
     if not deleted_by:
         raise HTTPException(status_code=400, detail="deleted_by is required")
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
     
     try:
-        updated = queries.mark_as_recently_deleted(claim_id, deleted_by)
+        updated = await queries.mark_as_recently_deleted(claim_id, deleted_by)
         if updated == 0:
             raise HTTPException(status_code=404, detail="Claim not found")
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     
     return {"success": True, "message": f"Claim {claim_id} marked as recently deleted by {deleted_by}."}
 
 @router.get("/long/soft-deleted")
-async def get_soft_deleted_long_claims():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_soft_deleted_long_claims(conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    claims = queries.get_soft_deleted_long_claims()
+    claims = await queries.get_soft_deleted_long_claims()
 
     return {
         "success": True,
@@ -1331,50 +1275,32 @@ async def get_soft_deleted_long_claims():
 async def get_hire_checklists(
     long_claim_id: str,
     car_id: int,
-    claimant_id: int
+    claimant_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    blobs: str = BLOBS_QUERY,
+    conn=Depends(get_db)
 ) -> List[Dict[str, Any]]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-
-    results = queries.get_hire_checklists(
-        long_claim_id=long_claim_id,
-        car_id=car_id,
-        claimant_id=claimant_id
-    )
+    queries = AsyncQueries(conn)
+    columns = parse_fields(fields)
 
-    response_list = []
-
-    for result in results:
-        item = {
-            **{f"condition_{i}": result.get(f"condition_{i}", "") for i in range(1, 31)},
-            "date": result.get("date", ""),
-            "customer": result.get("customer", ""),
-            "detailer": result.get("detailer", ""),
-            "order_number": result.get("order_number", ""),
-            "year": result.get("year", ""),
-            "make": result.get("make", ""),
-            "model": result.get("model", ""),
-            "notes": result.get("notes", ""),
-            "recommendations": result.get("recommendations", ""),
-            "customer_signature": result.get("customer_signature"),
-            "detailer_signature": result.get("detailer_signature"),
-            "base_vehicle_image": result.get("base_vehicle_image"),
-            "annotated_vehicle_image": result.get("annotated_vehicle_image"),
-            "long_claim_id": result["long_claim_id"],
-            "car_id": result["car_id"],
-            "claimant_id": result["claimant_id"],
-            "inspection_id": result["inspection_id"],
-        }
-        response_list.append(item)
+    try:
+        results = await with_blobs(queries, await queries.get_hire_checklists(
+            long_claim_id=long_claim_id,
+            car_id=car_id,
+            claimant_id=claimant_id,
+            fields=columns
+        ), blobs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return response_list
+    view = FORMS["hire_checklist"].views["read"]
+    return [view(result, columns) for result in results]
 
 @router.put("/claims/{claim_id}/restore")
-async def restore_claim(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def restore_claim(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    restored = queries.restore_short_claim(claim_id)
+    restored = await queries.restore_short_claim(claim_id)
 
     if not restored:
         raise HTTPException(
@@ -1388,28 +1314,25 @@ async def restore_claim(claim_id: str):
     }
 
 @router.put("/claims/{claim_id}/status")
-async def update_claim_status_api(claim_id: str, payload: Dict[str, str]):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_claim_status_api(claim_id: str, payload: Dict[str, str], conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     status = payload.get("status")
     if not status:
         raise HTTPException(status_code=400, detail="status is required")
 
     try:
-        updated = queries.update_claim_status(claim_id, status)
+        updated = await queries.update_claim_status(claim_id, status)
         if not updated:
             raise HTTPException(status_code=404, detail="claim_id not found")
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
     return {"message": "Status updated successfully", "claim_id": claim_id, "status": status}
 
 @router.put("/claims/{claim_id}/disputed")
-async def update_claim_disputed_api(claim_id: str, payload: Dict[str, Any]):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_claim_disputed_api(claim_id: str, payload: Dict[str, Any], conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     is_disputed = payload.get("is_disputed")
     dispute_reason = payload.get("dispute_reason")
@@ -1421,11 +1344,10 @@ async def update_claim_disputed_api(claim_id: str, payload: Dict[str, Any]):
         )
 
     try:
-        updated = queries.update_claim_disputed(claim_id, is_disputed, dispute_reason)
+        updated = await queries.update_claim_disputed(claim_id, is_disputed, dispute_reason)
         if not updated:
             raise HTTPException(status_code=404, detail="claim_id not found")
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
     return {
@@ -1436,12 +1358,11 @@ async def update_claim_disputed_api(claim_id: str, payload: Dict[str, Any]):
     }
 
 @router.get("/claim-bill/{claim_id}")
-async def get_claim_bill(claim_id: str) -> Dict[str, Any]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_claim_bill(claim_id: str, conn=Depends(get_db)) -> Dict[str, Any]:
+    queries = AsyncQueries(conn)
 
-    rental = queries.get_rental_by_claim(claim_id)
-    storage = queries.get_storage_by_claim(claim_id)
+    rental = await queries.get_rental_by_claim(claim_id)
+    storage = await queries.get_storage_by_claim(claim_id)
 
     return {
         "rental": rental,
@@ -1454,11 +1375,10 @@ class LongHireInvoiceCreate(BaseModel):
     user_name: str
 
 @router.post("/long_hire_invoice")
-async def create_long_hire_invoice(data: LongHireInvoiceCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_long_hire_invoice(data: LongHireInvoiceCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    invoice_id = queries.insert_long_hire_invoice(
+    invoice_id = await queries.insert_long_hire_invoice(
         data.claim_id,
         data.amount,
         data.user_name
@@ -1470,11 +1390,10 @@ async def create_long_hire_invoice(data: LongHireInvoiceCreate):
     return {"success": True, "invoice_id": invoice_id}
 
 @router.get("/long_hire_invoice")
-async def get_all_long_hire_invoices():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_all_long_hire_invoices(conn=Depends(get_read_db)):
+    queries = AsyncQueries(conn)
 
-    invoices = queries.get_all_long_hire_invoices()
+    invoices = await queries.get_all_long_hire_invoices()
 
     return {
         "success": True,
@@ -1483,11 +1402,10 @@ async def get_all_long_hire_invoices():
     }
 
 @router.get("/long-claim/{long_claim_id}/daily-rates")
-async def get_daily_rates(long_claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_daily_rates(long_claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    data = queries.get_daily_rates_for_claim(long_claim_id)
+    data = await queries.get_daily_rates_for_claim(long_claim_id)
 
     rates = {item['car_id']: item['daily_rate'] or 0 for item in data}
 
@@ -1501,11 +1419,10 @@ class DailyRateUpdate(BaseModel):
     daily_rate: float
 
 @router.put("/long-claim/{long_claim_id}/daily-rate")
-async def update_daily_rate(long_claim_id: str, body: DailyRateUpdate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_daily_rate(long_claim_id: str, body: DailyRateUpdate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    updated = queries.update_daily_rate(
+    updated = await queries.update_daily_rate(
         long_claim_id,
         body.car_id,
         body.daily_rate
@@ -1518,7 +1435,8 @@ async def update_daily_rate(long_claim_id: str, body: DailyRateUpdate):
 @router.put("/accident-claims/{claim_id}/direction")
 async def update_drawing_direction(
     claim_id: str,
-    request: Request
+    request: Request,
+    conn=Depends(get_db)
 ) -> Dict[str, Any]:
     try:
         data = await request.json()
@@ -1537,9 +1455,8 @@ async def update_drawing_direction(
     value_column = "direction_before_drawing" if direction_type == "before" else "direction_after_drawing"
     json_column = "json_before" if direction_type == "before" else "json_after"
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    result = queries.upsert_accident_claim_with_json(
+    queries = AsyncQueries(conn)
+    result = await queries.upsert_accident_claim_with_json(
         claim_id, value_column, value, json_column, json_data
     )
 
@@ -1552,7 +1469,8 @@ async def update_drawing_direction(
 @router.put("/cars/{car_id}/long")
 async def update_long_hire(
     car_id: int,
-    request: Request
+    request: Request,
+    conn=Depends(get_db)
 ) -> Dict[str, Any]:
 
     try:
@@ -1565,10 +1483,9 @@ async def update_long_hire(
     if value not in [True, False]:
         raise HTTPException(status_code=400, detail="value must be true or false")
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    result = queries.update_is_long_hire(car_id, value)
+    result = await queries.update_is_long_hire(car_id, value)
 
     if not result:
         raise HTTPException(status_code=404, detail="Car not found")
@@ -1581,7 +1498,8 @@ async def update_long_hire(
 @router.put("/cars/availability/{reg_no}")
 async def update_availability(
     reg_no: str,
-    request: Request
+    request: Request,
+    conn=Depends(get_db)
 ) -> Dict[str, Any]:
 
     try:
@@ -1594,10 +1512,9 @@ async def update_availability(
     if value not in [True, False]:
         raise HTTPException(status_code=400, detail="value must be true or false")
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    result = queries.update_is_available(reg_no, value)
+    result = await queries.update_is_available(reg_no, value)
 
     if not result:
         raise HTTPException(status_code=404, detail="Car not found")
@@ -1608,10 +1525,9 @@ async def update_availability(
     }
 
 @router.get("/summary/{claim_id}", response_model=Dict[str, Any])
-async def get_claim_summary(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
-    result = queries.get_claim_summary(claim_id)
+async def get_claim_summary(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
+    result = await queries.get_claim_summary(claim_id)
     if not result:
         raise HTTPException(status_code=404, detail="Claim not found")
 
@@ -1621,13 +1537,12 @@ class ClaimLockRequest(BaseModel):
     locked_by: str
 
 @router.get("/claims/{claim_id}/lock")
-async def get_claim_lock_status(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_claim_lock_status(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     print(f"[GET] claim_id: {claim_id}")
 
-    claim = queries.get_claim_lock(claim_id)
+    claim = await queries.get_claim_lock(claim_id)
     if not claim:
         print("[GET] Claim not found")
         raise HTTPException(status_code=404, detail="Claim not found")
@@ -1648,7 +1563,7 @@ async def get_claim_lock_status(claim_id: str):
             is_locked = True
         else:
             print("[GET] Lock EXPIRED → clearing")
-            queries.clear_claim_lock(claim_id)
+            await queries.clear_claim_lock(claim_id)
             locked_by = None
     else:
         print("[GET] No lock present")
@@ -1667,17 +1582,17 @@ LOCK_DURATION_SECONDS = 300
 async def update_claim_lock(
     claim_id: str,
     update: ClaimLockRequest,
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db)
 ):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
     now = datetime.now(timezone.utc)
     expires_at = now + timedelta(seconds=LOCK_DURATION_SECONDS)
 
     print(f"[LOCK] request by {update.locked_by} for {claim_id}")
 
-    claim = queries.get_claim_lock(claim_id)
+    claim = await queries.get_claim_lock(claim_id)
     if not claim:
         print("[LOCK] Claim not found")
         raise HTTPException(status_code=404, detail="Claim not found")
@@ -1705,7 +1620,7 @@ async def update_claim_lock(
 
     print("[LOCK] GRANTED / REFRESHED")
 
-    queries.set_claim_lock(
+    await queries.set_claim_lock(
         claim_id=claim_id,
         locked_by=update.locked_by,
         lock_expires_at=expires_at
@@ -1722,14 +1637,14 @@ async def update_claim_lock(
 @router.delete("/claims/{claim_id}/lock")
 async def unlock_claim(
     claim_id: str,
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db)
 ):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
     print(f"[UNLOCK] request by {current_user.username} for {claim_id}")
 
-    claim = queries.get_claim_lock(claim_id)
+    claim = await queries.get_claim_lock(claim_id)
 
     if not claim:
         print("[UNLOCK] Claim not found")
@@ -1737,7 +1652,7 @@ async def unlock_claim(
 
     print("[UNLOCK] clearing lock")
 
-    queries.clear_claim_lock(claim_id)
+    await queries.clear_claim_lock(claim_id)
 
     return {
         "success": True,
@@ -1749,13 +1664,15 @@ async def unlock_claim(
 
 
 @router.get("/fleet-history", response_model=None)
-async def get_all_fleet_history():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_all_fleet_history(request: Request, conn=Depends(reports_db)):
+    queries = AsyncQueries(conn, lane=REPORTS)
 
     print("Fetching all fleet history")
 
-    history = queries.get_all_fleet_history()
+    if wants_ndjson(request):
+        return stream_ndjson(conn, await queries.get_all_fleet_history(stream=True))
+
+    history = await queries.get_all_fleet_history()
 
     return {
         "count": len(history),
@@ -1765,7 +1682,8 @@ async def get_all_fleet_history():
 @router.put("/claims/ref-no/{claim_id}")
 async def update_ref_no(
     claim_id: str,
-    request: Request
+    request: Request,
+    conn=Depends(get_db)
 ) -> Dict[str, Any]:
 
     try:
@@ -1778,10 +1696,9 @@ async def update_ref_no(
     if not ref_no:
         raise HTTPException(status_code=400, detail="ref_no is required")
 
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
-    result = queries.update_ref_no(claim_id, ref_no)
+    result = await queries.update_ref_no(claim_id, ref_no)
 
     if not result:
         raise HTTPException(status_code=404, detail="Claim not found")
@@ -1796,11 +1713,10 @@ class PaymentUpdate(BaseModel):
     pay_date: Optional[str] = None
 
 @router.put("/claims/{claim_id}/payment")
-async def update_payment_details(claim_id: str, payment_update: PaymentUpdate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_payment_details(claim_id: str, payment_update: PaymentUpdate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    updated = queries.update_payment_details(
+    updated = await queries.update_payment_details(
         claim_id,
         payment_update.payment,
         payment_update.pay_date
@@ -1819,16 +1735,16 @@ class HireVehicleDatesUpdate(BaseModel):
 async def update_hire_vehicle_dates(
     claim_id: str, 
     payload: HireVehicleDatesUpdate,
-    current_user: CurrentUser = Depends(get_current_user)  # Inject current user
+    current_user: CurrentUser = Depends(get_current_user),  # Inject current user
+    conn=Depends(get_db)
 ):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
     print(f"Received request to update hire vehicle dates for claim_id: {claim_id} with payload: {payload.dict()} by user: {current_user.username}")
     # Check if neither date_in nor date_out is present in the payload
 
 
     # Pass the username from current_user to the updated_by parameter
-    updated = queries.update_hire_vehicle_dates(
+    updated = await queries.update_hire_vehicle_dates(
         claim_id=claim_id,
         date_in=payload.date_in,
         date_out=payload.date_out,
@@ -1845,10 +1761,10 @@ async def update_hire_vehicle_dates(
 async def add_update(
     claim_id: str,
     payload: dict,
-    current_user: CurrentUser = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    conn=Depends(get_db)
 ):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+    queries = AsyncQueries(conn)
 
     new_update = payload.get("update")
 
@@ -1860,7 +1776,7 @@ async def add_update(
         if field not in new_update:
             raise HTTPException(status_code=400, detail=f"{field} is required")
 
-    updated = queries.add_update(claim_id, new_update, current_user.id)
+    updated = await queries.add_update(claim_id, new_update, current_user.id)
 
     if not updated:
         raise HTTPException(status_code=404, detail="Claim not found")
@@ -1868,16 +1784,15 @@ async def add_update(
     return {"message": "Update added successfully"}
 
 @router.put("/claims/{claim_id}/updates/{update_id}")
-async def edit_update(claim_id: str, update_id: int, payload: dict):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def edit_update(claim_id: str, update_id: int, payload: dict, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     new_data = payload.get("update")
 
     if not new_data:
         raise HTTPException(status_code=400, detail="update is required")
 
-    updated = queries.edit_update(claim_id, update_id, new_data)
+    updated = await queries.edit_update(claim_id, update_id, new_data)
 
     if not updated:
         raise HTTPException(status_code=404, detail="Update not found")
@@ -1885,11 +1800,10 @@ async def edit_update(claim_id: str, update_id: int, payload: dict):
     return {"message": "Update edited successfully"}
 
 @router.get("/claims/{claim_id}/updates")
-async def get_updates(claim_id: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_updates(claim_id: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    updates = queries.get_updates(claim_id)
+    updates = await queries.get_updates(claim_id)
 
     return {
         "count": len(updates),
@@ -1902,17 +1816,15 @@ class BroadcastCreate(BaseModel):
     message: str
 
 @router.post("/notifications/broadcast")
-async def create_broadcast(payload: BroadcastCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_broadcast(payload: BroadcastCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
     try:
-        queries.broadcast_notification(
+        await queries.broadcast_notification(
             payload.sender_id,
             payload.title,
             payload.message
         )
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     return {
         "success": True,
@@ -1920,11 +1832,10 @@ async def create_broadcast(payload: BroadcastCreate):
     }
 
 @router.get("/notifications/users/{user_id}")
-async def get_notifications(user_id: int, unread_only: bool = Query(False, description="Fetch only unread notifications")):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_notifications(user_id: int, unread_only: bool = Query(False, description="Fetch only unread notifications"), conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
     try:
-        data = queries.get_user_notifications(user_id, unread_only)
+        data = await queries.get_user_notifications(user_id, unread_only)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {
@@ -1933,13 +1844,11 @@ async def get_notifications(user_id: int, unread_only: bool = Query(False, descr
     }
 
 @router.patch("/notifications/{notification_id}/users/{user_id}/read")
-async def mark_single_read(notification_id: int, user_id: int):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def mark_single_read(notification_id: int, user_id: int, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
     try:
-        queries.mark_single_as_read(notification_id, user_id)
+        await queries.mark_single_as_read(notification_id, user_id)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     return {
         "success": True,
@@ -1947,13 +1856,11 @@ async def mark_single_read(notification_id: int, user_id: int):
     }
 
 @router.patch("/notifications/users/{user_id}/read-all")
-async def mark_all_read(user_id: int):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def mark_all_read(user_id: int, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
     try:
-        queries.mark_all_as_read(user_id)
+        await queries.mark_all_as_read(user_id)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     return {
         "success": True,
@@ -1961,13 +1868,11 @@ async def mark_all_read(user_id: int):
     }
 
 @router.delete("/notifications/expired")
-async def clean_expired_notifications():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def clean_expired_notifications(conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
     try:
-        deleted_count = queries.delete_expired_notifications()
+        deleted_count = await queries.delete_expired_notifications()
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     return {
         "success": True,
@@ -1975,13 +1880,11 @@ async def clean_expired_notifications():
     }
 
 @router.patch("/notifications/users/{user_id}/clear")
-async def clear_all_notifications(user_id: int):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def clear_all_notifications(user_id: int, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
     try:
-        queries.clear_all_notifications(user_id)
+        await queries.clear_all_notifications(user_id)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     return {
         "success": True,
@@ -1989,11 +1892,10 @@ async def clear_all_notifications(user_id: int):
     }
 
 @router.get("/claims/{claim_id}/history")
-async def get_claim_history(claim_id: str) -> list[Dict[str, Any]]:
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_claim_history(claim_id: str, conn=Depends(get_db)) -> list[Dict[str, Any]]:
+    queries = AsyncQueries(conn)
 
-    result = queries.get_claim_changes_history(claim_id)
+    result = await queries.get_claim_changes_history(claim_id)
 
     return result
 
@@ -2004,11 +1906,10 @@ class ClaimChangeCreate(BaseModel):
     fields: List[str]
 
 @router.post("/claims/{claim_id}/history")
-async def create_claim_history(claim_id: str, data: ClaimChangeCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_claim_history(claim_id: str, data: ClaimChangeCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    queries.insert_claim_change(
+    await queries.insert_claim_change(
         claim_id=claim_id,
         user_name=data.user_name,
         date=data.date,
@@ -2024,11 +1925,10 @@ class PaymentUpdate(BaseModel):
     payment_date: str | None
 
 @router.post("/long_hire_invoice/update_payment_date")
-async def update_payment_date(data: PaymentUpdate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_payment_date(data: PaymentUpdate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    success = queries.update_payment_date(
+    success = await queries.update_payment_date(
         data.claim_id,
         data.payment_date
     )
@@ -2039,12 +1939,11 @@ async def update_payment_date(data: PaymentUpdate):
     return {"success": True, "message": "Payment date updated"}
 
 @router.put("/cars/{car_id}/sync-service-miles")
-async def sync_car_service_miles(car_id: int):
-    conn = DBConnection.get_connection()
+async def sync_car_service_miles(car_id: int, conn=Depends(get_db)):
     
     try:
-        queries = Queries(conn)
-        updated_car = queries.sync_last_service_miles(car_id)
+        queries = AsyncQueries(conn)
+        updated_car = await queries.sync_last_service_miles(car_id)
         
         if not updated_car:
             return {
@@ -2052,15 +1951,11 @@ async def sync_car_service_miles(car_id: int):
                 "message": "Car not found"
             }
             
-        # Commit the transaction to save the UPDATE
-        conn.commit()
-
         return {
             "success": True,
             "data": updated_car
         }
     except Exception as e:
-        conn.rollback() # Rollback on error
         return {
             "success": False,
             "error": str(e)
@@ -2073,11 +1968,10 @@ class MotDocUpdate(BaseModel):
     mot_doc: str | None
 
 @router.post("/car/upload_mot_doc")
-async def upload_mot_doc(data: MotDocUpdate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def upload_mot_doc(data: MotDocUpdate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    success = queries.update_mot_doc(
+    success = await queries.update_mot_doc(
         data.car_id,
         data.mot_doc
     )
@@ -2094,11 +1988,10 @@ class OfferCreate(BaseModel):
 
 
 @router.post("/offers/create")
-async def create_offer(data: OfferCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_offer(data: OfferCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    success = queries.create_blank_offer(data.claim_id)
+    success = await queries.create_blank_offer(data.claim_id)
 
     if not success:
         return {
@@ -2114,11 +2007,10 @@ async def create_offer(data: OfferCreate):
 
 
 @router.get("/offers")
-async def get_offers():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def get_offers(conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    data = queries.get_all_offers()
+    data = await queries.get_all_offers()
 
     return {
         "success": True,
@@ -2143,13 +2035,12 @@ class OfferUpdate(BaseModel):
 
 
 @router.put("/offers/{claim_id}")
-async def update_offer(claim_id: str, data: OfferUpdate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def update_offer(claim_id: str, data: OfferUpdate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     update_data = {k: v for k, v in data.dict().items() if v is not None}
 
-    success = queries.update_offer(claim_id, update_data)
+    success = await queries.update_offer(claim_id, update_data)
 
     if not success:
         return {
@@ -2164,11 +2055,22 @@ async def update_offer(claim_id: str, data: OfferUpdate):
 
 
 @router.get("/claims-search")
-async def search_claims():
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def search_claims(
+    q: str = Query(..., max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    conn=Depends(get_db),
+):
+    """
+    Top `limit` claims matching `q` on claim id, claimant name, ref no or
+    vehicle registration, best match first. `q` is required; a blank `q`
+    matches nothing.
+    """
+    queries = AsyncQueries(conn)
 
-    data = queries.get_claim_search_list()
+    if not q.strip():
+        data = []
+    else:
+        data = await queries.search_claims(q.strip(), limit)
 
     return {
         "success": True,
@@ -2184,11 +2086,10 @@ class OfferCreate(BaseModel):
     offer1_status: str
     
 @router.post("/offers")
-async def create_offer(data: OfferCreate):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def create_offer(data: OfferCreate, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    success = queries.create_offer(
+    success = await queries.create_offer(
         claim_id=data.claim_id,
         offer1=data.offer1,
         offer1_date=data.offer1_date,
@@ -2204,4 +2105,68 @@ async def create_offer(data: OfferCreate):
     return {
         "success": True,
         "message": "Offer created"
-    }
\ No newline at end of file
+    }
+
+@router.get("/blobs/{digest}")
+async def get_blob(digest: str, request: Request):
+    """
+    One stored signature/drawing/image by its SHA-256. Blobs never change,
+    so they may be cached indefinitely. Data URLs are served decoded, with
+    their own media type if it is an image type.
+    """
+    if not is_digest(digest):
+        raise HTTPException(status_code=400, detail="Invalid blob hash")
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": BLOB_CACHE_CONTROL, "X-Content-Type-Options": "nosniff"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    data = await run_in_threadpool(read_blob, digest)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+    media_type = "application/octet-stream"
+    if data.startswith(b"data:"):
+        header, _, payload = data.partition(b",")
+        if header.endswith(b";base64"):
+            # Clients choose the data URL header; only images are served as
+            # such, so a stored text/html payload cannot run on this origin.
+            declared = header[5:-7].decode("ascii", "replace").strip().lower()
+            if BLOB_IMAGE_TYPE.match(declared) and declared != "image/svg+xml":
+                media_type = declared
+            try:
+                data = base64.b64decode(payload)
+            except ValueError:
+                raise HTTPException(status_code=500, detail="Corrupt blob")
+    return Response(content=data, media_type=media_type, headers=headers)
+
+@router.get("/blobs-report")
+async def get_blob_storage_report(conn=Depends(reports_db)):
+    """
+    Blob store usage: references vs distinct blobs across all forms
+    (bytes_saved is what deduplicating identical images saves), plus the
+    payloads still stored inline.
+    """
+    queries = AsyncQueries(conn, lane=REPORTS)
+    return await queries.get_blob_storage_report()
+
+@router.get("/db/pool-stats")
+async def get_pool_stats():
+    return DBConnection.pool_stats()
+
+
+@router.get("/db/lane-stats")
+async def get_lane_stats():
+    return lane_stats()
+
+
+@router.get("/db/query-stats")
+async def get_query_stats():
+    """Latency histogram summary (p50/p95/p99), rows and bytes per query method."""
+    return query_stats()
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters of the in-process caches (e.g. the claims list)."""
+    return cache_stats()
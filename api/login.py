@@ -1,20 +1,21 @@
-from fastapi import APIRouter, HTTPException, Query, status
-from sql.combinedQueries import Queries
-from db.connection import DBConnection
+from fastapi import APIRouter, HTTPException, Query, status, Depends
+from sql.combinedQueries import AsyncQueries
+from api.deps import get_db
 from utils.hashing import verify_password
 from utils.jwt_handler import create_access_token, create_refresh_token ,decode_token
 from pydantic import BaseModel
-router = APIRouter(prefix="/auth", tags=["login"])
+from utils.fast_json import FastJSONRoute
+router = APIRouter(prefix="/auth", tags=["login"], route_class=FastJSONRoute)
 
 
 @router.post("/login")
-async def login_user(username: str, password: str):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def login_user(username: str, password: str, conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
-    user = queries.get_user_by_username(username)
+    user = await queries.get_user_by_username(username)
 
-    if not user or not verify_password(password, user["password"]):
+    # argon2 takes tens of milliseconds of CPU: on the lane, not the event loop.
+    if not user or not await queries.lane.run(verify_password, password, user["password"]):
         raise HTTPException(status_code=400, detail="Invalid username or password")
 
     token_data = {
@@ -45,9 +46,8 @@ async def login_user(username: str, password: str):
 
     
 @router.post("/refresh")
-async def refresh_access_token(refresh_token: str = Query(...)):
-    conn = DBConnection.get_connection()
-    queries = Queries(conn)
+async def refresh_access_token(refresh_token: str = Query(...), conn=Depends(get_db)):
+    queries = AsyncQueries(conn)
 
     payload = decode_token(refresh_token)
 
@@ -70,7 +70,7 @@ async def refresh_access_token(refresh_token: str = Query(...)):
             detail="Invalid token payload"
         )
 
-    user = queries.get_user_by_id(user_id)
+    user = await queries.get_user_by_id(user_id)
 
     if not user:
         raise HTTPException(
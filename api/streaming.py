@@ -0,0 +1,59 @@
+"""
+NDJSON streaming for the large list endpoints.
+
+A client that sends `Accept: application/x-ndjson` gets one JSON object per
+line instead of a single JSON document. Rows are read from a server-side
+(named) cursor STREAM_BATCH_SIZE at a time (sql/queries/claimFormQueries.py)
+and written as they arrive, so memory stays at one batch whatever the size
+of the result.
+
+Usage:
+    @router.get("/fleet-history")
+    async def get_all_fleet_history(request: Request, conn=Depends(reports_db)):
+        queries = AsyncQueries(conn, lane=REPORTS)
+        if wants_ndjson(request):
+            return stream_ndjson(conn, await queries.get_all_fleet_history(stream=True))
+        ...
+
+The response body outlives the route handler, so the stream takes the
+request's connection over (db.connection.detach) and returns it to the pool
+once the last row is sent, the client goes away or the query fails.
+"""
+
+import psycopg2
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from db.connection import detach, release
+from utils.fast_json import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _lines(conn, batches):
+    broken = False
+    try:
+        yield None   # primed by stream_ndjson(), so closing the generator always releases conn
+        for batch in batches:
+            yield b"".join(dumps(row) + b"\n" for row in batch)
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        close = getattr(batches, "close", None)
+        if close:
+            close()
+        release(conn, close=broken)
+
+
+def stream_ndjson(conn, batches) -> StreamingResponse:
+    """
+    Stream `batches` (lists of row dicts, e.g. from a query method called
+    with stream=True) as NDJSON, taking ownership of `conn` until done.
+    """
+    detach(conn)
+    lines = _lines(conn, batches)
+    next(lines)
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,118 @@
+"""
+Requests per second for concurrent routes that run a slow query.
+
+Two routes run the same query (SELECT pg_sleep) through the query layer:
+  /blocking  calls Queries directly inside an async route (the old pattern)
+  /awaited   awaits AsyncQueries, which runs the query on a worker thread
+
+Requests are sent straight to the ASGI app on one event loop, the same way
+uvicorn would deliver them, so a blocking route serialises the whole batch.
+
+Usage:
+    python benchmarks/bench_async_routes.py [--requests 200] [--concurrency 20] [--sleep 0.01]
+
+Uses DATABASE_URL (and DB_SSLMODE) from .env.local / the environment.
+DB_POOL_MAX should be at least --concurrency.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from db.connection import DBConnection  # noqa: E402
+from api.deps import get_db  # noqa: E402
+from sql.combinedQueries import AsyncQueries, Queries  # noqa: E402
+
+
+class BenchQueries(Queries):
+    def slow_query(self, seconds: float):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_sleep(%s)", (seconds,))
+        self.conn.commit()
+        return True
+
+
+class AsyncBenchQueries(AsyncQueries):
+    queries_class = BenchQueries
+
+
+def build_app(sleep: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/blocking")
+    async def blocking(conn=Depends(get_db)):
+        return {"ok": BenchQueries(conn).slow_query(sleep)}
+
+    @app.get("/awaited")
+    async def awaited(conn=Depends(get_db)):
+        return {"ok": await AsyncBenchQueries(conn).slow_query(sleep)}
+
+    return app
+
+
+async def call(app, path: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(app, path: str, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            status = await call(app, path)
+            if status != 200:
+                raise RuntimeError(f"{path} returned {status}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--sleep", type=float, default=0.01, help="seconds each query takes")
+    args = parser.parse_args()
+
+    app = build_app(args.sleep)
+    try:
+        for path in ("/blocking", "/awaited"):
+            await run(app, path, args.concurrency, args.concurrency)  # warm up the pool
+            rps = await run(app, path, args.requests, args.concurrency)
+            print(f"{path:<10} {rps:8.1f} req/s")
+    finally:
+        DBConnection.close_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Cold-start profile for the serverless deployment.
+
+Each run starts a fresh Python process (as a cold Vercel function would),
+imports main, and sends one request straight to the ASGI app. It reports:
+
+  import       time to `import main`
+  first resp   time from process start to the first complete response
+               (includes opening the first database connection)
+
+and, with --profile, the slowest modules from `python -X importtime`.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 5] [--path "/auth/login?username=__bench__&password=x"] [--profile]
+
+The default path is a login for a user that does not exist: it runs one
+query and answers 400 without touching argon2. Uses DATABASE_URL (and
+DB_SSLMODE) from .env.local / the environment.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import asyncio, json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import main
+imported = time.perf_counter()
+
+path, _, query = {path!r}.partition("?")
+scope = {{
+    "type": "http", "asgi": {{"version": "3.0"}}, "http_version": "1.1",
+    "method": {method!r}, "scheme": "http", "path": path, "raw_path": path.encode(),
+    "query_string": query.encode(), "root_path": "", "headers": [],
+    "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+}}
+status = []
+
+async def receive():
+    return {{"type": "http.request", "body": b"", "more_body": False}}
+
+async def send(message):
+    if message["type"] == "http.response.start":
+        status.append(message["status"])
+
+asyncio.run(main.app(scope, receive, send))
+done = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (done - start) * 1000,
+    "status": status[0] if status else None,
+    "passlib_loaded": "passlib" in sys.modules,
+}}))
+"""
+
+
+def cold_run(path: str, method: str) -> dict:
+    code = CHILD.format(root=str(ROOT), path=path, method=method)
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile(top: int):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, cwd=ROOT, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    print("\nSlowest imports (cumulative ms / self ms):")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/auth/login?username=__bench__&password=x")
+    parser.add_argument("--method", default="POST")
+    parser.add_argument("--profile", action="store_true", help="also print an -X importtime profile")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    results = [cold_run(args.path, args.method) for _ in range(args.runs)]
+
+    print(f"{args.method} {args.path}  status {results[0]['status']}  "
+          f"passlib loaded: {results[0]['passlib_loaded']}")
+    for key, label in (("import_ms", "import"), ("first_response_ms", "first resp")):
+        values = [r[key] for r in results]
+        print(f"{label:<11} median {statistics.median(values):7.1f} ms   "
+              f"min {min(values):7.1f} ms   max {max(values):7.1f} ms")
+
+    if args.profile:
+        import_profile(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Per-request database latency: checkout + one query + release.
+
+Compares the old behaviour (ping every connection with SELECT 1 on checkout)
+against the current pool, which validates by age/idle time only; idle
+connections are pinged by the keepalive thread, and a connection the server
+dropped is replaced when its first query fails (AsyncQueries).
+
+Two traffic shapes are measured: back-to-back requests, and requests that
+arrive --idle-gap seconds apart (light traffic, where the connection has sat
+idle before every checkout). The gap itself is not timed.
+
+Usage:
+    python benchmarks/bench_db_checkout.py [--iterations 500] [--idle-gap 1.5] [--idle-iterations 20]
+
+Uses DATABASE_URL (and DB_SSLMODE) from .env.local / the environment. Against a
+remote database the difference per request is roughly one network round trip.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import psycopg2  # noqa: E402
+from db.connection import ConnectionPool, DBConnection  # noqa: E402
+
+
+class PingingPool(ConnectionPool):
+    """The previous checkout path: one SELECT 1 round trip per checkout."""
+
+    def _is_usable(self, conn) -> bool:
+        if conn.closed != 0:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+def run(pool, iterations: int, gap: float = 0.0) -> list:
+    samples = []
+    for _ in range(iterations):
+        if gap:
+            time.sleep(gap)
+        start = time.perf_counter()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT now()")
+                cur.fetchone()
+            conn.commit()
+        finally:
+            pool.putconn(conn)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{name:<18} mean {statistics.mean(samples):7.3f} ms   "
+        f"p50 {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--idle-gap", type=float, default=1.5, help="seconds between requests in the idle case")
+    parser.add_argument("--idle-iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    for label, iterations, gap in (
+        ("back to back", args.iterations, 0.0),
+        (f"{args.idle_gap:g}s idle between requests", args.idle_iterations, args.idle_gap),
+    ):
+        print(label)
+        for name, cls in (("ping on checkout", PingingPool), ("age/idle check", ConnectionPool)):
+            pool = cls(DBConnection._connect, minconn=1, maxconn=1, keepalive_interval=0)
+            try:
+                run(pool, 20)  # warm up
+                report(f"  {name}", run(pool, iterations, gap))
+            finally:
+                pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Per-request form work before and after the form registry.
+
+For a full accident claim and rental agreement payload, times what a save
+and its response cost outside the database:
+  inline     the previous per-request code: scan the writable column list,
+             build params and the UPDATE/INSERT with f-strings, then build
+             the response with a dict literal of row.get() calls
+  uncached   the registry path with the form_sql cache turned off, so
+             every call builds its statement again
+  registry   sql/queries/formRegistry.py: form.fields_in, the cached
+             update_sql/insert_sql, and the form's "saved" view
+
+Both paths are checked to produce the same SQL and response first. The
+form_sql cache's hits and misses during the registry run are printed to
+show the statement is built once per field-set. With --reflect, the one-off
+reflection done by the first form_for() in a process is timed as well.
+
+Usage:
+    python benchmarks/bench_form_registry.py [--iterations 2000] [--reflect]
+
+Uses DATABASE_URL (and DB_SSLMODE) from .env.local / the environment.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sql.queries.formRegistry import FORMS, form_sql_cache, reflect_forms  # noqa: E402
+
+TABLES = ("accident_claims", "rental_agreements")
+
+
+def inline_response(view):
+    """The response function as it was written by hand: one dict literal."""
+    items = ", ".join(f"{key!r}: row.get({column!r}, {default!r})" for key, column, default in view.entries)
+    return eval(f"lambda row: {{{items}}}")
+
+
+def inline_save(table: str, writable: list, respond, claim_id: str, data: dict, exists: bool):
+    fields_to_update = [col for col in writable if col in data]
+    params = {"claim_id": claim_id, **{k: data[k] for k in fields_to_update}}
+    if exists:
+        set_clause = ", ".join(f"{col} = %({col})s" for col in fields_to_update)
+        query = f"""
+            UPDATE {table}
+            SET {set_clause}
+            WHERE claim_id = %(claim_id)s
+            RETURNING *;
+        """
+    else:
+        insert_columns = ["claim_id"] + fields_to_update
+        query = f"""
+            INSERT INTO {table} ({', '.join(insert_columns)})
+            VALUES ({', '.join(f'%({col})s' for col in insert_columns)})
+            RETURNING *;
+        """
+    return query, params, respond(data)
+
+
+def registry_save(form, claim_id: str, data: dict, exists: bool):
+    fields = form.fields_in(data)
+    params = {**data, "claim_id": claim_id}
+    if exists:
+        query = form.update_sql(fields, "claim_id")
+    else:
+        query = form.insert_sql(("claim_id", *fields))
+    return query, params, form.views["saved"](data)
+
+
+def run(save, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        save()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--reflect", action="store_true", help="time reflect_forms() against the database")
+    args = parser.parse_args()
+
+    if args.reflect:
+        start = time.perf_counter()
+        count = reflect_forms()
+        print(f"reflect_forms: {count} tables in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for table in TABLES:
+        form = FORMS[table]
+        data = {column: f"value {i}" for i, column in enumerate(form.writable)}
+        data["user_name"] = "bench"
+        respond = inline_response(form.views["saved"])
+        writable = list(form.writable)
+
+        for exists in (True, False):
+            inline = inline_save(table, writable, respond, "C1", data, exists)
+            registry = registry_save(form, "C1", data, exists)
+            if inline[0].split() != registry[0].split() or inline[2] != registry[2]:
+                raise RuntimeError(f"{table}: inline and registry saves differ")
+            if any(registry[1][key] != value for key, value in inline[1].items()):
+                raise RuntimeError(f"{table}: inline and registry params differ")
+
+            print(f"{table} ({'update' if exists else 'insert'}, {len(form.writable)} fields)")
+            results = {}
+            for label, save, ttl in (
+                ("inline", lambda: inline_save(table, writable, respond, "C1", data, exists), None),
+                ("uncached", lambda: registry_save(form, "C1", data, exists), 0),
+                ("registry", lambda: registry_save(form, "C1", data, exists), float("inf")),
+            ):
+                if ttl is not None:
+                    form_sql_cache.ttl = ttl   # ttl <= 0 disables the cache
+                    form_sql_cache.invalidate()
+                before = form_sql_cache.stats()
+                run(save, 50)  # warm up
+                samples = run(save, args.iterations)
+                results[label] = statistics.median(samples)
+                line = f"  {label:<10} mean {statistics.mean(samples):7.1f} us   p50 {results[label]:7.1f} us"
+                if label == "registry":
+                    after = form_sql_cache.stats()
+                    hits, misses = after["hits"] - before["hits"], after["misses"] - before["misses"]
+                    line += f"   form_sql cache: {hits} hits, {misses} misses"
+                print(line)
+            print(f"  speedup    {results['inline'] / results['registry']:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Time to turn the large list payloads into a response body.
+
+Payloads are the rows returned by get_all_claims, get_all_invoices and
+get_all_cars (Decimal, date and datetime values straight from psycopg2).
+Each is rendered two ways:
+  jsonable_encoder   FastAPI's default: jsonable_encoder, then JSONResponse (json.dumps)
+  FastJSONResponse   utils/fast_json.py: orjson straight from the rows
+
+Both bodies are checked to decode to the same JSON before timing.
+
+Usage:
+    python benchmarks/bench_json_serialization.py [--iterations 50]
+
+Uses DATABASE_URL (and DB_SSLMODE) from .env.local / the environment.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+from db.connection import DBConnection  # noqa: E402
+from sql.combinedQueries import Queries  # noqa: E402
+from utils.fast_json import FastJSONResponse, orjson  # noqa: E402
+
+PAYLOADS = ("get_all_claims", "get_all_invoices", "get_all_cars")
+
+
+def default_render(rows) -> bytes:
+    return JSONResponse(jsonable_encoder(rows)).body
+
+
+def fast_render(rows) -> bytes:
+    return FastJSONResponse(rows).body
+
+
+def run(render, rows, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render(rows)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson is not installed: FastJSONResponse falls back to json.dumps")
+
+    with DBConnection.connection() as conn:
+        queries = Queries(conn)
+        payloads = {name: getattr(queries, name)() for name in PAYLOADS}
+        conn.rollback()
+
+    for name, rows in payloads.items():
+        body = fast_render(rows)
+        if json.loads(body) != json.loads(default_render(rows)):
+            raise RuntimeError(f"{name}: rendered bodies differ")
+        print(f"{name}: {len(rows)} rows, {len(body) / 1e3:.0f} KB")
+
+        results = {}
+        for label, render in (("jsonable_encoder", default_render), ("FastJSONResponse", fast_render)):
+            run(render, rows, 3)  # warm up
+            results[label] = statistics.median(run(render, rows, args.iterations))
+            print(f"  {label:<18} p50 {results[label]:8.2f} ms")
+        print(f"  speedup            {results['jsonable_encoder'] / results['FastJSONResponse']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-from  .connection import DBConnection
\ No newline at end of file
+from  .connection import DBConnection
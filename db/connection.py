@@ -1,9 +1,13 @@
 import os
+import threading
 import psycopg2
+import psycopg2.pool
 from psycopg2.extras import DictCursor
+from psycopg2.extensions import STATUS_READY, TRANSACTION_STATUS_UNKNOWN
 from dotenv import load_dotenv
 from pathlib import Path
 from contextlib import contextmanager
+from db.query_metrics import timing_factory
 import time
 
 # Load .env.local
@@ -12,78 +16,543 @@ ENV_PATH = BASE_DIR / ".env.local"
 load_dotenv(dotenv_path=ENV_PATH)
 
 
+class PoolTimeout(psycopg2.pool.PoolError):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers when it was opened and last known good."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        now = time.monotonic()
+        self.created_at = now
+        self.last_used_at = now      # last time a request gave it back
+        self.last_checked_at = now   # last time it was known to work (use or keepalive ping)
+        self.prepared_statements = set()   # names PREPAREd on this session (db/prepared.py)
+        self.pool = None             # pool it was checked out from by a request dependency
+        self.lease = None            # token of the dependency that must return it (see detach())
+        self.admission = None        # lane place held along with it (api/deps.py lane_db)
+        self.unverified = False      # reused from the pool and not queried yet in this checkout
+        self.replaced_by = None      # the connection that took over from this one (see reconnect())
+
+    def cursor(self, *args, **kwargs):
+        # Hand out timing cursors so every query is measured (db/query_metrics.py).
+        factory = kwargs.get("cursor_factory") or self.cursor_factory
+        kwargs["cursor_factory"] = timing_factory(factory)
+        return super().cursor(*args, **kwargs)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections.
+
+    Every request checks out its own connection, so transactions are never
+    shared between requests. At most `maxconn` connections are open at once;
+    callers beyond that wait up to `timeout` seconds for one to be returned.
+    """
+
+    def __init__(
+        self,
+        connect,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 10.0,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+        keepalive_interval: float = 60.0,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool sizes must satisfy 0 <= minconn <= maxconn and maxconn >= 1")
+
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.keepalive_interval = keepalive_interval
+
+        self._cond = threading.Condition()
+        self._idle = []          # LIFO: the most recently used connection is reused first
+        self._in_use = set()
+        self._checking = set()   # idle connections taken out by the keepalive thread
+        self._opening = 0        # connections being opened outside the lock
+        self._waiting = 0
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+
+        self._keepalive_thread = None
+        if keepalive_interval > 0:
+            self._keepalive_thread = threading.Thread(
+                target=self._keepalive_loop, name="db-pool-keepalive", daemon=True
+            )
+            self._keepalive_thread.start()
+
+    def getconn(self, timeout: float | None = None):
+        """Check out a connection, opening a new one if the pool is below maxconn."""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise psycopg2.pool.PoolError("Connection pool is closed")
+
+                    if self._idle:
+                        conn = self._idle.pop()
+                        self._in_use.add(conn)
+                        break
+
+                    if self._size_locked() < self.maxconn:
+                        self._opening += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout} seconds"
+                        )
+
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if conn is None:
+                return self._open_new()
+
+            if self._is_usable(conn):
+                # Its first query tells whether the server still has it (see reconnect()).
+                conn.unverified = True
+                return conn
+
+            # Too old or idle for too long: drop it and try again with the same deadline.
+            self._discard(conn)
+
+    def putconn(self, conn, close: bool = False):
+        """Return a connection to the pool, or close it if it is broken."""
+        with self._cond:
+            self._in_use.discard(conn)
+
+        if close or self._closed or conn.closed or self._is_broken(conn):
+            self._close_quietly(conn)
+            with self._cond:
+                self._cond.notify()
+            return
+
+        try:
+            # Never hand the next request an open or aborted transaction.
+            if conn.status != STATUS_READY:
+                conn.rollback()
+        except psycopg2.Error:
+            self._close_quietly(conn)
+            with self._cond:
+                self._cond.notify()
+            return
+
+        now = time.monotonic()
+        conn.last_used_at = now
+        conn.last_checked_at = now
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def replace(self, conn):
+        """Close a checked-out connection the server dropped and open a new one in its place."""
+        with self._cond:
+            self._in_use.discard(conn)
+            self._opening += 1
+        self._close_quietly(conn)
+        return self._open_new()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "min": self.minconn,
+                "max": self.maxconn,
+                "size": len(self._idle) + self._size_locked(),
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+            }
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def _open_new(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._opening -= 1
+            self._in_use.add(conn)
+        return conn
+
+    def _size_locked(self) -> int:
+        """Connections that are not sitting in the idle list. Caller holds the lock."""
+        return len(self._in_use) + len(self._checking) + self._opening
+
+    def _is_usable(self, conn) -> bool:
+        """
+        Cheap checkout validation, no round trip: the connection must be open,
+        younger than max_lifetime, and known good within the last max_idle seconds.
+        Idle connections are pinged by the keepalive thread instead.
+        """
+        if conn.closed != 0:
+            return False
+        now = time.monotonic()
+        created_at = getattr(conn, "created_at", now)
+        checked_at = getattr(conn, "last_checked_at", now)
+        if self.max_lifetime > 0 and now - created_at > self.max_lifetime:
+            return False
+        if self.max_idle > 0 and now - checked_at > self.max_idle:
+            return False
+        return True
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        """SELECT 1 outside a transaction (a single round trip); False if the session is gone."""
+        try:
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            finally:
+                conn.autocommit = False
+        except psycopg2.Error:
+            return False
+        conn.last_checked_at = time.monotonic()
+        return True
+
+    @staticmethod
+    def _is_broken(conn) -> bool:
+        """True when libpq lost the server mid-transaction (e.g. network drop)."""
+        try:
+            return conn.info.transaction_status == TRANSACTION_STATUS_UNKNOWN
+        except psycopg2.Error:
+            return True
+
+    # ----- KEEPALIVE -----
+
+    def _keepalive_loop(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                self._cond.wait(self.keepalive_interval)
+                if self._closed:
+                    return
+            try:
+                self.check_idle()
+            except Exception as e:
+                print("Connection pool keepalive failed:", e)
+
+    def check_idle(self):
+        """
+        Ping idle connections that have not been used for keepalive_interval,
+        close expired or surplus ones, and top the pool back up to minconn.
+        Runs on the keepalive thread so requests never pay for a ping.
+        """
+        now = time.monotonic()
+        to_close, to_ping = [], []
+
+        with self._cond:
+            keep = []
+            for conn in self._idle:
+                expired = self.max_lifetime > 0 and now - getattr(conn, "created_at", now) > self.max_lifetime
+                surplus = (
+                    self.max_idle > 0
+                    and len(keep) + self._size_locked() >= self.minconn
+                    and now - getattr(conn, "last_used_at", now) > self.max_idle
+                )
+                if conn.closed or expired or surplus:
+                    to_close.append(conn)
+                elif now - getattr(conn, "last_checked_at", now) >= self.keepalive_interval:
+                    to_ping.append(conn)
+                    self._checking.add(conn)
+                else:
+                    keep.append(conn)
+            self._idle = keep
+
+        for conn in to_close:
+            self._close_quietly(conn)
+
+        for conn in to_ping:
+            alive = self._ping(conn)
+            if not alive:
+                self._close_quietly(conn)
+
+            with self._cond:
+                self._checking.discard(conn)
+                if alive and not self._closed:
+                    # Put pinged connections at the bottom so LIFO order is kept.
+                    self._idle.insert(0, conn)
+                elif alive:
+                    self._close_quietly(conn)
+                self._cond.notify()
+
+        self._fill_to_min()
+
+    def _fill_to_min(self):
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) + self._size_locked() >= self.minconn:
+                    return
+                self._opening += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._opening -= 1
+                raise
+            with self._cond:
+                self._opening -= 1
+                self._idle.insert(0, conn)
+                self._cond.notify()
+
+    def _discard(self, conn):
+        with self._cond:
+            self._in_use.discard(conn)
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            if conn.closed == 0:
+                conn.close()
+        except psycopg2.Error:
+            pass
+
+
 class DBConnection:
-    _connection = None
+    _pool = None
+    _replica_pool = None
+    _pool_lock = threading.Lock()
     _max_retries = 3
     _retry_delay = 0.01  # seconds
 
     @classmethod
-    def _connect(cls):
-        """Create a new database connection."""
-        database_url = os.getenv("DATABASE_URL")
+    def _connect(cls, database_url: str | None = None, read_only: bool = False):
+        """Create a new database connection (to the primary unless a URL is given)."""
+        database_url = database_url or os.getenv("DATABASE_URL")
         if not database_url:
             raise RuntimeError("DATABASE_URL not found in .env.local")
 
-        try:
-            cls._connection = psycopg2.connect(
-                database_url,
-                sslmode="require",
-                cursor_factory=DictCursor
-            )
-            print("Database connected.")
-        except psycopg2.Error as e:
-            print("Error connecting to database:", e)
-            raise
+        extra = {}
+        if read_only:
+            # Guard against a write slipping onto the replica.
+            extra["options"] = "-c default_transaction_read_only=on"
 
-    @classmethod
-    def get_connection(cls):
-        """Return a live connection, reconnecting if necessary."""
         retries = 0
-        while retries < cls._max_retries:
+        while True:
             try:
-                if cls._connection is None or cls._connection.closed != 0:
-                    cls._connect()
-                else:
-                    # Test connection by ping
-                    with cls._connection.cursor() as cur:
-                        cur.execute("SELECT 1")
-                return cls._connection
-            except psycopg2.OperationalError:
-                print(f"Connection lost. Retrying in {cls._retry_delay} seconds...")
-                cls._connection = None
-                time.sleep(cls._retry_delay)
+                connection = psycopg2.connect(
+                    database_url,
+                    sslmode=os.getenv("DB_SSLMODE", "require"),
+                    cursor_factory=DictCursor,
+                    connection_factory=PooledConnection,
+                    # Let the OS notice dead peers on idle sockets.
+                    keepalives=1,
+                    keepalives_idle=30,
+                    keepalives_interval=10,
+                    keepalives_count=3,
+                    **extra,
+                )
+                print("Replica connected." if read_only else "Database connected.")
+                return connection
+            except psycopg2.OperationalError as e:
                 retries += 1
+                if retries >= cls._max_retries:
+                    print("Error connecting to database:", e)
+                    raise RuntimeError("Failed to connect to the database after multiple attempts.") from e
+                print(f"Connection failed. Retrying in {cls._retry_delay} seconds...")
+                time.sleep(cls._retry_delay)
 
-        raise RuntimeError("Failed to connect to the database after multiple attempts.")
+    @classmethod
+    def get_pool(cls) -> ConnectionPool:
+        """Return the process-wide pool, creating it on first use."""
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = ConnectionPool(
+                        cls._connect,
+                        minconn=int(os.getenv("DB_POOL_MIN", "1")),
+                        maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+                        timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                        max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+                        max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                        keepalive_interval=float(os.getenv("DB_POOL_KEEPALIVE", "60")),
+                    )
+        return cls._pool
+
+    @classmethod
+    def get_replica_pool(cls) -> ConnectionPool | None:
+        """
+        Return the read-replica pool, or None when DATABASE_REPLICA_URL is not set.
+        Replica connections are read-only.
+        """
+        replica_url = os.getenv("DATABASE_REPLICA_URL")
+        if not replica_url:
+            return None
+
+        if cls._replica_pool is None:
+            with cls._pool_lock:
+                if cls._replica_pool is None:
+                    cls._replica_pool = ConnectionPool(
+                        lambda: cls._connect(replica_url, read_only=True),
+                        minconn=int(os.getenv("DB_REPLICA_POOL_MIN", "0")),
+                        maxconn=int(os.getenv("DB_REPLICA_POOL_MAX", os.getenv("DB_POOL_MAX", "10"))),
+                        timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                        max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+                        max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                        keepalive_interval=float(os.getenv("DB_POOL_KEEPALIVE", "60")),
+                    )
+        return cls._replica_pool
+
+    @classmethod
+    def get_connection(cls, timeout: float | None = None):
+        """
+        Check out a live connection from the pool.
+        Every connection obtained here must be given back with release_connection().
+        """
+        return cls.get_pool().getconn(timeout)
+
+    @classmethod
+    def release_connection(cls, conn, close: bool = False):
+        """Return a connection obtained from get_connection() to the pool."""
+        cls.get_pool().putconn(conn, close=close)
 
     @classmethod
     @contextmanager
-    def get_cursor(cls):
+    def connection(cls):
         """
-        Context manager for a cursor that ensures the connection is alive.
+        Context manager that checks a connection out and always returns it.
         Usage:
-        with DBConnection.get_cursor() as cur:
-            cur.execute(...)
+        with DBConnection.connection() as conn:
+            Queries(conn).get_all_claims()
         """
         conn = cls.get_connection()
-        cursor = conn.cursor()
+        broken = False
         try:
-            yield cursor
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
         finally:
-            cursor.close()
+            cls.release_connection(conn, close=broken)
+
+    @classmethod
+    @contextmanager
+    def get_cursor(cls):
+        """
+        Context manager for a cursor on a pooled connection.
+        Usage:
+        with DBConnection.get_cursor() as cur:
+            cur.execute(...)
+        """
+        with cls.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Current pool occupancy: size, in use, idle and waiting callers."""
+        stats = cls.get_pool().stats()
+        replica = cls.get_replica_pool()
+        stats["replica"] = replica.stats() if replica is not None else None
+        return stats
 
     @classmethod
     def close_connection(cls):
-        """Closes the database connection if open."""
-        if cls._connection and cls._connection.closed == 0:
-            cls._connection.close()
-            cls._connection = None
-            print("Database connection closed.")
+        """Closes every pooled connection."""
+        with cls._pool_lock:
+            if cls._pool is not None:
+                cls._pool.closeall()
+                cls._pool = None
+                print("Database connections closed.")
+            if cls._replica_pool is not None:
+                cls._replica_pool.closeall()
+                cls._replica_pool = None
+
+
+# ----- READ-YOUR-WRITES -----
+
+# How long a client's reads stay on the primary after it wrote, so it never
+# reads its own change back from a replica that has not replayed it yet
+# (routing in api/deps.py).
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+
+# ----- CONNECTION HAND-OFF -----
+
+def current(conn):
+    """The connection now doing the work `conn` was checked out for (see reconnect())."""
+    while getattr(conn, "replaced_by", None) is not None:
+        conn = conn.replaced_by
+    return conn
+
 
+def reconnect(conn):
+    """
+    Replace a request's connection that turned out to be dropped by the
+    server (restart, failover, idle timeout) when its first query ran. The
+    new connection takes over the lease and lane place, and current(conn)
+    returns it to whoever still holds the old one.
+    """
+    new = conn.pool.replace(conn)
+    new.pool, new.lease, new.admission = conn.pool, conn.lease, conn.admission
+    conn.lease = conn.admission = None
+    conn.replaced_by = new
+    return new
+
+
+def detach(conn):
+    """
+    Take over a connection checked out by a request dependency (api/deps.py),
+    for work that outlives the route handler (a streamed response body). The
+    dependency no longer returns it, nor releases the lane place held with it
+    (lane_db); the new owner must call release(conn).
+    """
+    conn = current(conn)
+    conn.lease = None
+    admission = getattr(conn, "admission", None)
+    if admission is not None:
+        admission.detached = True
+
+
+def release(conn, close: bool = False):
+    """Return a detached connection to the pool it came from, then its lane place."""
+    conn = current(conn)
+    admission = getattr(conn, "admission", None)
+    conn.admission = None
+    conn.pool.putconn(conn, close=close)
+    if admission is not None:
+        admission.release()
 
 
 def split_car_name_and_model():
@@ -97,19 +566,3 @@ def split_car_name_and_model():
         print(curaims)
 
     print("Claims table retrieved successfully.")
-
-
-if __name__ == "__main__":
-    conn = DBConnection.get_connection()  # get your connection
-    try:
-        conn.rollback()  # kill any bad transaction instantly
-    except:
-        pass  # if already clean, ignore
-
-    cur = conn.cursor()
-    cur.execute("SELECT 1")  # now works
-
-
-
-
-        
@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Lane:
+    """
+    A bounded executor for blocking query calls.
+
+    Each lane has its own worker threads, so heavy report queries queue behind
+    each other instead of behind (or in front of) interactive form saves.
+    `slot()` additionally caps how many requests of the lane may hold a pooled
+    connection at the same time.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+        # metrics
+        self.admission_waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_wait_ms = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f"db-{self.name}",
+                    )
+        return self._executor
+
+    async def admit(self) -> "Admission":
+        """Admit one request into the lane; waits while the lane is at capacity."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        self.admission_waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.admission_waiting -= 1
+
+        self.admitted += 1
+        return Admission(self, asyncio.get_running_loop())
+
+    def _leave(self):
+        self.admitted -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a place in the lane for the duration of the block."""
+        admission = await self.admit()
+        try:
+            yield admission
+        finally:
+            admission.release()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking call on this lane's workers and await its result."""
+        submitted = time.monotonic()
+
+        def work():
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                waited = (time.monotonic() - submitted) * 1000
+                if waited > self.max_queue_wait_ms:
+                    self.max_queue_wait_ms = waited
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    if not ok:
+                        self.failed += 1
+
+        with self._lock:
+            self.queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, work)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "admission_waiting": self.admission_waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "max_queue_wait_ms": round(self.max_queue_wait_ms, 2),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class Admission:
+    """
+    One request's place in a lane. Normally released when the request's
+    dependencies are torn down; a streamed response takes it over together
+    with the connection (db.connection.detach) and releases it when done,
+    possibly from a worker thread.
+    """
+
+    def __init__(self, lane: Lane, loop):
+        self.lane = lane
+        self.detached = False
+        self._loop = loop
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self.lane._leave()
+        else:
+            self._loop.call_soon_threadsafe(self.lane._leave)
+
+
+# ----- LANES -----
+
+INTERACTIVE = "interactive"   # form saves, lookups, locks
+REPORTS = "reports"           # full-table lists and exports
+
+LANES = {
+    INTERACTIVE: Lane(INTERACTIVE, int(os.getenv("DB_LANE_INTERACTIVE_WORKERS", "16"))),
+    REPORTS: Lane(REPORTS, int(os.getenv("DB_LANE_REPORTS_WORKERS", "2"))),
+}
+
+
+def get_lane(name: str) -> Lane:
+    try:
+        return LANES[name]
+    except KeyError:
+        raise ValueError(f"Unknown lane: {name}")
+
+
+def lane_stats() -> dict:
+    return {name: lane.stats() for name, lane in LANES.items()}
@@ -0,0 +1,129 @@
+"""
+Named server-side prepared statements for fixed, hot-path SQL.
+
+Postgres parses and plans a statement every time its text is sent. For the
+large claim queries that is a noticeable part of each call. Statements run
+through `execute()` are instead PREPAREd once per connection and afterwards
+only EXECUTEd with their parameters, so the server reuses the parse tree and
+(after a few runs) a cached generic plan.
+
+Usage:
+    query = "SELECT * FROM users WHERE username = %s;"
+    with self.conn.cursor() as cur:
+        prepared.execute(cur, "get_user_by_username", query, (username,))
+        row = cur.fetchone()
+
+The SQL keeps the usual psycopg2 `%s` placeholders; they are rewritten to
+`$1, $2, ...` when the statement is registered. A new or reconnected
+connection starts with nothing prepared, so statements are prepared again
+on first use. A statement whose result columns changed under it (ALTER
+TABLE on a table it reads) is dropped and prepared again.
+"""
+
+import re
+import threading
+import weakref
+from psycopg2 import errors
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+_statements = {}                      # name -> SQL with $n placeholders
+_statements_lock = threading.Lock()
+_fallback = weakref.WeakKeyDictionary()   # prepared names for non-pooled connections
+_stale = weakref.WeakKeyDictionary()      # conn -> names to DEALLOCATE before preparing again
+
+_NAME_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _to_positional(sql: str) -> str:
+    counter = iter(range(1, 10_000))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", sql.strip().rstrip(";"))
+
+
+def register(name: str, sql: str) -> str:
+    """Register a statement under `name`. Re-registering the same SQL is a no-op."""
+    if not _NAME_RE.match(name):
+        raise ValueError(f"Invalid prepared statement name: {name}")
+
+    text = _to_positional(sql)
+    with _statements_lock:
+        existing = _statements.get(name)
+        if existing is not None and existing != text:
+            raise ValueError(f"Prepared statement {name} is already registered with different SQL")
+        _statements[name] = text
+    return name
+
+
+def _prepared_names(conn) -> set:
+    names = getattr(conn, "prepared_statements", None)
+    if names is None:
+        names = _fallback.setdefault(conn, set())
+    return names
+
+
+def _prepare(cur, names: set, stale: set, name: str):
+    if name in stale:
+        cur.execute(f"DEALLOCATE {name}")
+        stale.discard(name)
+    cur.execute(f"PREPARE {name} AS {_statements[name]}")
+    names.add(name)
+
+
+def execute(cur, name: str, sql: str, params: tuple = ()):
+    """
+    Execute a registered statement on `cur`, preparing it on this connection
+    first if needed. `sql` is registered on first use.
+    """
+    if name not in _statements:
+        register(name, sql)
+
+    conn = cur.connection
+    names = _prepared_names(conn)
+    stale = _stale.setdefault(conn, set())
+    connection_was_idle = conn.info.transaction_status == TRANSACTION_STATUS_IDLE
+
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        execute_sql = f"EXECUTE {name} ({placeholders})"
+    else:
+        execute_sql = f"EXECUTE {name}"
+
+    if name not in names:
+        _prepare(cur, names, stale, name)
+
+    try:
+        cur.execute(execute_sql, params or None)
+    except errors.InvalidSqlStatementName:
+        # The server no longer knows the statement (e.g. DISCARD ALL by a
+        # proxy). Forget everything we thought was prepared on this connection.
+        names.clear()
+        stale.clear()
+        if not connection_was_idle:
+            # Rolling back would throw away earlier work in this transaction.
+            raise
+        conn.rollback()
+        _prepare(cur, names, stale, name)
+        cur.execute(execute_sql, params or None)
+    except errors.FeatureNotSupported:
+        # "cached plan must not change result type": a table the statement
+        # reads was altered (e.g. a migration added a column to claims) after
+        # it was prepared. It has to be dropped and prepared again.
+        names.discard(name)
+        stale.add(name)
+        if not connection_was_idle:
+            raise
+        conn.rollback()
+        _prepare(cur, names, stale, name)
+        cur.execute(execute_sql, params or None)
+
+
+def deallocate_all(conn):
+    """Drop every prepared statement on `conn` (and our record of them)."""
+    with conn.cursor() as cur:
+        cur.execute("DEALLOCATE ALL")
+    _prepared_names(conn).clear()
+    _stale.pop(conn, None)
+
+
+def registered() -> dict:
+    with _statements_lock:
+        return dict(_statements)
@@ -0,0 +1,243 @@
+"""
+Always-on per-query latency metrics.
+
+Every cursor handed out by a pooled connection is a timing cursor: each
+execute() records its wall time and row count against the ClaimFormQueries
+method that issued it, and fetches add (sampled) result bytes. Latencies go
+into fixed log-scale histograms, so recording is a few dict/array updates and
+p50/p95/p99 can be read at any time without keeping samples.
+
+Usage:
+    @instrumented                    # tags queries with the calling method
+    class ClaimFormQueries: ...
+
+    query_stats()                    # {method: {count, p50_ms, p95_ms, ...}}
+
+Set QUERY_METRICS=0 to hand out plain cursors instead.
+"""
+
+import os
+import math
+import time
+import functools
+import contextlib
+import threading
+import contextvars
+from psycopg2.extras import DictCursor, RealDictCursor
+
+ENABLED = os.getenv("QUERY_METRICS", "1") != "0"
+
+# Result bytes are estimated from every Nth fetched row and scaled up.
+BYTES_SAMPLE_EVERY = max(1, int(os.getenv("QUERY_METRICS_BYTES_SAMPLE_EVERY", "10")))
+
+UNTAGGED = "<untagged>"
+
+_current_method = contextvars.ContextVar("query_method", default=UNTAGGED)
+
+
+# ----- HISTOGRAM -----
+
+# Buckets grow by 2^(1/4) (~19%) from 10 microseconds; the last bucket
+# catches everything above ~100 seconds.
+_MIN_SECONDS = 1e-5
+_STEPS_PER_DOUBLING = 4
+_BUCKETS = _STEPS_PER_DOUBLING * 24
+
+
+def _bucket(seconds: float) -> int:
+    if seconds <= _MIN_SECONDS:
+        return 0
+    index = int(math.log2(seconds / _MIN_SECONDS) * _STEPS_PER_DOUBLING) + 1
+    return min(index, _BUCKETS - 1)
+
+
+def _bucket_upper(index: int) -> float:
+    return _MIN_SECONDS * 2 ** (index / _STEPS_PER_DOUBLING)
+
+
+class _MethodStats:
+    __slots__ = ("count", "errors", "total", "max", "rows", "bytes", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.buckets = [0] * _BUCKETS
+
+    def quantile(self, q: float) -> float:
+        target = q * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(_bucket_upper(index), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        ms = lambda s: round(s * 1000, 3)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": ms(self.total / self.count) if self.count else 0.0,
+            "p50_ms": ms(self.quantile(0.50)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99)),
+            "max_ms": ms(self.max),
+            "total_ms": ms(self.total),
+            "rows": self.rows,
+            "bytes": self.bytes,
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+_fetches = 0
+
+
+def _get(method: str) -> _MethodStats:
+    stats = _stats.get(method)
+    if stats is None:
+        stats = _stats.setdefault(method, _MethodStats())
+    return stats
+
+
+def record(method: str, seconds: float, rows: int, failed: bool = False):
+    with _stats_lock:
+        stats = _get(method)
+        stats.count += 1
+        stats.total += seconds
+        if seconds > stats.max:
+            stats.max = seconds
+        if rows > 0:
+            stats.rows += rows
+        if failed:
+            stats.errors += 1
+        stats.buckets[_bucket(seconds)] += 1
+
+
+def _record_bytes(rows):
+    """
+    Estimate the size of fetched rows from every Nth row (scaled up by N).
+    The starting offset rotates, so single-row fetches are sampled 1 in N.
+    """
+    global _fetches
+    offset = _fetches % BYTES_SAMPLE_EVERY
+    _fetches += 1   # unlocked: an occasional lost increment only shifts the sample
+
+    size = 0
+    for row in rows[offset::BYTES_SAMPLE_EVERY]:
+        values = row.values() if isinstance(row, dict) else row
+        for value in values:
+            if value is None:
+                continue
+            if isinstance(value, (str, bytes, bytearray, memoryview)):
+                size += len(value)
+            else:
+                size += 8
+    if size:
+        with _stats_lock:
+            _get(_current_method.get()).bytes += size * BYTES_SAMPLE_EVERY
+
+
+def query_stats() -> dict:
+    """Per-method latency summary, slowest total time first."""
+    with _stats_lock:
+        items = [(name, stats.summary()) for name, stats in _stats.items()]
+    items.sort(key=lambda item: item[1]["total_ms"], reverse=True)
+    return dict(items)
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+# ----- CURSORS -----
+
+class _TimingMixin:
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, vars)
+            failed = False
+            return result
+        finally:
+            record(_current_method.get(), time.perf_counter() - start, self.rowcount, failed)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _record_bytes((row,))
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size)
+        _record_bytes(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        _record_bytes(rows)
+        return rows
+
+
+class TimingDictCursor(_TimingMixin, DictCursor):
+    pass
+
+
+class TimingRealDictCursor(_TimingMixin, RealDictCursor):
+    pass
+
+
+_TIMING_FACTORIES = {
+    DictCursor: TimingDictCursor,
+    RealDictCursor: TimingRealDictCursor,
+}
+
+
+def timing_factory(cursor_factory):
+    """The timing variant of a cursor class (or the class itself if unknown)."""
+    if not ENABLED:
+        return cursor_factory
+    return _TIMING_FACTORIES.get(cursor_factory, cursor_factory)
+
+
+# ----- METHOD TAGGING -----
+
+def current_method() -> str:
+    return _current_method.get()
+
+
+@contextlib.contextmanager
+def tag(name: str):
+    """Attribute queries run inside the block to `name` (e.g. a streamed fetch)."""
+    token = _current_method.set(name)
+    try:
+        yield
+    finally:
+        _current_method.reset(token)
+
+
+def _tagged(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        token = _current_method.set(name)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _current_method.reset(token)
+    return wrapper
+
+
+def instrumented(cls):
+    """Class decorator: tag queries run inside each public method with its name."""
+    if not ENABLED:
+        return cls
+    for name, attr in list(vars(cls).items()):
+        if not name.startswith("_") and callable(attr):
+            setattr(cls, name, _tagged(name, attr))
+    return cls
@@ -0,0 +1,140 @@
+"""
+Unit of work: one transaction, one commit, per top-level query call.
+
+Query methods decorated with @transactional join the connection's current
+unit of work, or start one if there is none. Only the outermost call commits,
+so a write path such as upsert_rental_agreement, which calls
+insert_fleet_history, update_is_available, update_claim_status and
+insert_claim_change, now commits once. If any step fails, nothing is applied.
+
+Usage:
+    class ClaimFormQueries:
+        @transactional
+        def update_claim_status(self, claim_id, status):
+            ...                      # no self.conn.commit()
+
+    with unit_of_work(conn):         # group several calls into one commit
+        queries.set_claim_lock(...)
+        queries.add_update(...)
+
+Inside a unit of work, a failing step calls rollback(conn). A nested step
+then only marks the unit as failed. The outermost level rolls back instead
+of committing and raises UnitOfWorkFailed, and earlier steps are never
+half-applied. Work that must
+happen after the data is durable (e.g. refreshing a materialized view) is
+registered with on_commit().
+"""
+
+import functools
+import weakref
+import psycopg2
+from contextlib import contextmanager
+
+
+class UnitOfWorkFailed(RuntimeError):
+    """A step inside the unit of work failed, so none of it was committed."""
+
+
+class _UnitOfWork:
+    __slots__ = ("depth", "failed", "after_commit")
+
+    def __init__(self):
+        self.depth = 0
+        self.failed = False
+        self.after_commit = []
+
+
+_states = weakref.WeakKeyDictionary()   # connection -> _UnitOfWork
+
+
+def _state(conn) -> _UnitOfWork:
+    state = _states.get(conn)
+    if state is None:
+        state = _states.setdefault(conn, _UnitOfWork())
+    return state
+
+
+def _reset(state: _UnitOfWork):
+    state.failed = False
+    state.after_commit = []
+
+
+@contextmanager
+def unit_of_work(conn):
+    """Join the connection's unit of work, or start one and commit it on exit."""
+    state = _state(conn)
+    outermost = state.depth == 0
+    state.depth += 1
+    try:
+        yield conn
+    except BaseException as e:
+        state.depth -= 1
+        if outermost:
+            conn.rollback()
+            _reset(state)
+        elif isinstance(e, psycopg2.Error):
+            # The transaction is aborted even if a caller swallows the error.
+            state.failed = True
+        raise
+
+    state.depth -= 1
+    if not outermost:
+        return
+
+    callbacks = state.after_commit
+    failed = state.failed
+    _reset(state)
+
+    if failed:
+        # A nested step failed but its caller carried on; never report
+        # success for work that was not committed.
+        conn.rollback()
+        raise UnitOfWorkFailed("A step of this operation failed; no changes were saved.")
+
+    conn.commit()
+    # Depth is back to 0 here, so callbacks run as their own units of work.
+    _run_after_commit(callbacks)
+
+
+def _run_after_commit(callbacks):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"After-commit callback failed: {e}")
+
+
+def transactional(method):
+    """Run a query method inside the connection's unit of work."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with unit_of_work(self.conn):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def rollback(conn):
+    """
+    Abandon the current unit of work. The top level rolls back immediately,
+    as before; a nested step only marks the unit failed so the outermost
+    level rolls back everything instead of committing.
+    """
+    state = _state(conn)
+    if state.depth > 1:
+        state.failed = True
+        return
+    conn.rollback()
+    _reset(state)
+
+
+def on_commit(conn, callback):
+    """Run `callback` once the current unit of work commits (immediately if none is open)."""
+    state = _state(conn)
+    if state.depth == 0:
+        callback()
+    else:
+        state.after_commit.append(callback)
+
+
+def in_unit_of_work(conn) -> bool:
+    return _state(conn).depth > 0
@@ -1,8 +1,14 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from utils.compression import CompressionMiddleware
+from utils.fast_json import FastJSONResponse
+from utils.blobs import backend as blob_store
 from api import forms_router, login_router , post_router
 
-app = FastAPI(title="My App")
+# Images stay inline in their rows if the blob store cannot be written here
+blob_store.check_writable()
+
+app = FastAPI(title="My App", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,6 +18,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for large JSON (multi-MB lists, forms with inline images)
+app.add_middleware(CompressionMiddleware)
+
 
 
 # Include routers and protect with token
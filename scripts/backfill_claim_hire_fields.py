@@ -0,0 +1,54 @@
+"""
+One-off backfill of claims.hire_start_date, hire_end_date and
+latest_vehicle_reg (sql/migrations/002_claims_hire_fields.sql).
+
+Walks claims in claim_id order and recomputes each batch with
+ClaimFormQueries.refresh_claim_hire_fields, committing per batch, so it can
+be stopped and re-run safely.
+
+Usage:
+    python scripts/backfill_claim_hire_fields.py [--batch-size 500]
+
+Uses DATABASE_URL (and DB_SSLMODE) from .env.local / the environment.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db.connection import DBConnection
+from sql.combinedQueries import Queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    total = 0
+    last_id = ""
+
+    with DBConnection.connection() as conn:
+        queries = Queries(conn)
+        while True:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT claim_id FROM claims WHERE claim_id > %s ORDER BY claim_id LIMIT %s;",
+                    (last_id, args.batch_size),
+                )
+                claim_ids = [row[0] for row in cur.fetchall()]
+            if not claim_ids:
+                break
+
+            total += queries.refresh_claim_hire_fields(claim_ids)
+            last_id = claim_ids[-1]
+            print(f"{total} claims updated (up to {last_id})")
+
+    print(f"Done: {total} claims in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
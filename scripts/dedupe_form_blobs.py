@@ -0,0 +1,83 @@
+"""
+One-off deduplication of the signatures, drawings and images on form rows.
+
+1. Moves every payload still stored inline into the blob store (the same
+   pass as scripts/migrate_form_blobs.py). Identical payloads hash to the same
+   blob, so each distinct image ends up stored once however many rows use it.
+2. Prints the storage report (GET /api/blobs-report): bytes referenced by
+   rows vs bytes actually stored.
+3. With --gc, deletes blobs no row references any more (replaced images,
+   rolled-back saves) that are older than --grace-hours.
+
+Usage:
+    python scripts/dedupe_form_blobs.py [--batch-size 200] [--gc] [--grace-hours 24] [--dry-run]
+
+Uses DATABASE_URL (and DB_SSLMODE) and BLOB_STORE_DIR like the app.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db.connection import DBConnection
+from sql.combinedQueries import Queries
+from sql.queries.claimFormQueries import BLOB_COLUMNS
+from utils.blobs import backend
+from migrate_form_blobs import migrate_table
+
+
+def collect_garbage(referenced: set, grace_hours: float, dry_run: bool) -> tuple[int, int]:
+    cutoff = time.time() - grace_hours * 3600
+    count = size = 0
+    for digest, blob_size, mtime in backend.scan():
+        if digest in referenced or mtime > cutoff:
+            continue
+        if not dry_run:
+            backend.delete(digest)
+        count += 1
+        size += blob_size
+    return count, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--gc", action="store_true", help="delete unreferenced blobs")
+    parser.add_argument("--grace-hours", type=float, default=24.0)
+    parser.add_argument("--dry-run", action="store_true", help="report without writing or deleting")
+    args = parser.parse_args()
+
+    if not args.dry_run and not backend.check_writable():
+        sys.exit(f"Blob store {backend.root} is not writable")
+
+    start = time.perf_counter()
+
+    with DBConnection.connection() as conn:
+        for table in BLOB_COLUMNS:
+            migrate_table(conn, table, args.batch_size, args.dry_run)
+
+        queries = Queries(conn)
+        report = queries.get_blob_storage_report()
+        print(
+            f"{report['references']} references to {report['unique_blobs']} blobs: "
+            f"{report['referenced_bytes'] / 1e6:.1f} MB referenced, "
+            f"{report['stored_bytes'] / 1e6:.1f} MB stored, "
+            f"{report['bytes_saved'] / 1e6:.1f} MB saved by deduplication"
+        )
+        if report["inline_values"]:
+            print(f"{report['inline_values']} values ({report['inline_bytes'] / 1e6:.1f} MB) remain inline")
+
+        if args.gc:
+            referenced = queries.get_referenced_blob_digests()
+            conn.rollback()
+            count, size = collect_garbage(referenced, args.grace_hours, args.dry_run)
+            action = "Would delete" if args.dry_run else "Deleted"
+            print(f"{action} {count} unreferenced blobs ({size / 1e6:.1f} MB)")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+One-off move of inline signatures, drawings and images into the blob store
+(utils/blobs.py). Rows keep a "blob:sha256:<hex>:<size>" reference instead.
+
+Walks every table in BLOB_COLUMNS in key order, storing each large inline
+value and rewriting the row, committing per batch. Values already stored
+are skipped, so it can be stopped and re-run safely.
+
+Usage:
+    python scripts/migrate_form_blobs.py [--batch-size 200] [--dry-run]
+
+Uses DATABASE_URL (and DB_SSLMODE) from .env.local / the environment, and
+BLOB_STORE_DIR / BLOB_MIN_BYTES like the app: run it where the app's blob
+directory is mounted.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db.connection import DBConnection
+from sql.queries.claimFormQueries import BLOB_COLUMNS
+from utils.blobs import BLOB_MIN_BYTES, REF_PREFIX, backend, to_ref
+
+# Unique key to walk and update each table by.
+TABLE_KEYS = {
+    "accident_claims": "claim_id",
+    "pre_inspection_forms": "inspection_id",
+    "cancellation_forms": "claim_id",
+    "storage_forms": "claim_id",
+    "rental_agreements": "rental_agreement_id",
+    "hire_checklist": "inspection_id",
+}
+
+
+def migrate_table(conn, table: str, batch_size: int, dry_run: bool) -> tuple[int, int]:
+    key = TABLE_KEYS[table]
+    columns = BLOB_COLUMNS[table]
+    inline = " OR ".join(
+        f"(octet_length({col}) >= %(min)s AND {col} NOT LIKE %(prefix)s)" for col in columns
+    )
+    select = f"""
+        SELECT {key}, {', '.join(columns)}
+        FROM {table}
+        WHERE ({inline}) AND (%(last)s IS NULL OR {key} > %(last)s)
+        ORDER BY {key}
+        LIMIT %(limit)s;
+    """
+    update = f"UPDATE {table} SET {', '.join(f'{col} = %s' for col in columns)} WHERE {key} = %s;"
+
+    rows_done = 0
+    bytes_moved = 0
+    last = None
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(select, {
+                "min": BLOB_MIN_BYTES, "prefix": REF_PREFIX + "%",
+                "last": last, "limit": batch_size,
+            })
+            rows = cur.fetchall()
+        if not rows:
+            break
+
+        with conn.cursor() as cur:
+            for row in rows:
+                values = list(row[1:])
+                refs = [value if dry_run else to_ref(value) for value in values]
+                bytes_moved += sum(
+                    len(value) for value in values
+                    if isinstance(value, str) and len(value) >= BLOB_MIN_BYTES and not value.startswith(REF_PREFIX)
+                )
+                if not dry_run:
+                    cur.execute(update, (*refs, row[0]))
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+
+        rows_done += len(rows)
+        last = rows[-1][0]
+        print(f"{table}: {rows_done} rows, {bytes_moved / 1e6:.1f} MB (up to {last})")
+
+    return rows_done, bytes_moved
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="report what would move without writing")
+    args = parser.parse_args()
+
+    if not args.dry_run and not backend.check_writable():
+        sys.exit(f"Blob store {backend.root} is not writable")
+
+    start = time.perf_counter()
+    total_rows = total_bytes = 0
+
+    with DBConnection.connection() as conn:
+        for table in BLOB_COLUMNS:
+            rows, moved = migrate_table(conn, table, args.batch_size, args.dry_run)
+            total_rows += rows
+            total_bytes += moved
+
+    action = "Would move" if args.dry_run else "Moved"
+    print(f"{action} {total_bytes / 1e6:.1f} MB from {total_rows} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
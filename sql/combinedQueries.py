@@ -2,7 +2,68 @@ from psycopg2.extras import RealDictCursor
 from datetime import datetime, timezone
 from typing import Optional
 from sql.queries import ClaimFormQueries
+import psycopg2
+from db.connection import current, reconnect
+from db.lanes import get_lane, INTERACTIVE
 
 class Queries(ClaimFormQueries):
     def __init__(self, conn):
-       ClaimFormQueries.__init__(self, conn)
\ No newline at end of file
+       ClaimFormQueries.__init__(self, conn)
+
+
+class AsyncQueries:
+    """
+    Awaitable view of Queries for async routes.
+
+    Exposes the same methods as Queries, but each call runs the blocking
+    psycopg2 query on a worker thread of the given lane (see db/lanes.py),
+    so a slow query no longer stalls the event loop for every other request.
+
+    Usage:
+    queries = AsyncQueries(conn)
+    claim = await queries.get_claim_by_id(claim_id)
+    """
+
+    queries_class = Queries
+
+    def __init__(self, conn, lane: str = INTERACTIVE):
+        self.conn = conn
+        self.sync = self.queries_class(conn)
+        self.lane = get_lane(lane)
+
+    def _call(self, name, args, kwargs):
+        conn = current(self.conn)
+        if conn is not self.conn:
+            self.conn = self.sync.conn = conn
+        if not getattr(conn, "unverified", False):
+            return getattr(self.sync, name)(*args, **kwargs)
+
+        # First call on a connection reused from the pool. If the server
+        # dropped it while it sat idle, the call failed on its first
+        # statement (often inside an except that swallows it): reconnect and
+        # run it once more.
+        conn.unverified = False
+        try:
+            result = getattr(self.sync, name)(*args, **kwargs)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if not conn.closed or conn.pool is None:
+                raise
+        else:
+            if not conn.closed or conn.pool is None:
+                return result
+        print(f"Database connection was dropped before {name}, reconnecting")
+        self.conn = self.sync.conn = reconnect(conn)
+        return getattr(self.sync, name)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self.sync, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self.lane.run(self._call, name, args, kwargs)
+
+        call.__name__ = name
+        call.__doc__ = attr.__doc__
+        setattr(self, name, call)
+        return call
@@ -0,0 +1,31 @@
+-- Indexes for the keyset-paginated claims list (GET /api/claims?limit=...).
+-- Each sort key is indexed as (key expression, claim_id) over live claims,
+-- matching CLAIM_SORT_KEYS in sql/queries/claimFormQueries.py, so a page is
+-- an index range scan of `limit` rows whatever the size of the table.
+--
+-- Apply with: psql "$DATABASE_URL" -f sql/migrations/001_claims_keyset_indexes.sql
+-- (CONCURRENTLY: run outside a transaction block.)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_live_claim_id_idx
+    ON claims (claim_id)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_live_claimant_name_idx
+    ON claims ((COALESCE(claimant_name, '')), claim_id)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_live_claim_start_date_idx
+    ON claims ((COALESCE(claim_start_date, '-infinity'::date)), claim_id)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_live_invoice_date_idx
+    ON claims ((COALESCE(invoice_date, '-infinity'::date)), claim_id)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_live_pay_date_idx
+    ON claims ((COALESCE(pay_date, '-infinity'::date)), claim_id)
+    WHERE recently_deleted = FALSE;
+
+-- Latest invoice per claim for the page rows.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS invoice_claim_id_datetime_idx
+    ON invoice (claim_id, invoice_datetime DESC);
@@ -0,0 +1,24 @@
+-- Stored hire fields on claims (previously derived from rental_agreements
+-- on every read). Kept up to date by ClaimFormQueries.refresh_claim_hire_fields
+-- on rental agreement writes. Populate existing rows once with
+--     python scripts/backfill_claim_hire_fields.py
+--
+-- Apply with: psql "$DATABASE_URL" -f sql/migrations/002_claims_hire_fields.sql
+-- (CONCURRENTLY: run outside a transaction block.)
+
+ALTER TABLE claims
+    ADD COLUMN IF NOT EXISTS hire_start_date date,
+    ADD COLUMN IF NOT EXISTS hire_end_date date,
+    ADD COLUMN IF NOT EXISTS latest_vehicle_reg text;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_live_hire_start_date_idx
+    ON claims (hire_start_date)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_live_hire_end_date_idx
+    ON claims (hire_end_date)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_live_latest_vehicle_reg_idx
+    ON claims (latest_vehicle_reg)
+    WHERE recently_deleted = FALSE;
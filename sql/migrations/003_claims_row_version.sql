@@ -0,0 +1,60 @@
+-- Per-claim version stamp behind the ETags on GET /api/claims/{id} and the
+-- per-claim form reads. Triggers bump claims.row_version on every write to
+-- the claim itself and to the tables those reads include, so every write
+-- path is covered, including ones added later. A table added to one of those
+-- reads (e.g. a bundle section) must be added to the list below too; the
+-- script can be re-run to install the new triggers.
+--
+-- Apply with: psql "$DATABASE_URL" -f sql/migrations/003_claims_row_version.sql
+
+ALTER TABLE claims
+    ADD COLUMN IF NOT EXISTS row_version bigint NOT NULL DEFAULT 1;
+
+-- Writes to claims: bump in place unless the statement already did.
+CREATE OR REPLACE FUNCTION claims_bump_row_version() RETURNS trigger AS $$
+BEGIN
+    IF NEW.row_version IS NOT DISTINCT FROM OLD.row_version THEN
+        NEW.row_version := OLD.row_version + 1;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS claims_row_version ON claims;
+CREATE TRIGGER claims_row_version
+    BEFORE UPDATE ON claims
+    FOR EACH ROW EXECUTE FUNCTION claims_bump_row_version();
+
+-- Writes to per-claim child rows: bump the owning claim (old and new owner).
+CREATE OR REPLACE FUNCTION claim_child_bump_row_version() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE claims SET row_version = row_version + 1 WHERE claim_id = OLD.claim_id;
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.claim_id IS DISTINCT FROM OLD.claim_id) THEN
+        UPDATE claims SET row_version = row_version + 1 WHERE claim_id = NEW.claim_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    child text;
+BEGIN
+    FOREACH child IN ARRAY ARRAY[
+        'invoice', 'accident_claims', 'rental_agreements', 'storage_forms', 'pre_inspection_forms',
+        -- also returned by GET /api/claims/{id}/bundle
+        'cancellation_forms', 'claim_documents', 'claim_changes_history'
+    ] LOOP
+        IF to_regclass(child) IS NOT NULL THEN
+            EXECUTE format('DROP TRIGGER IF EXISTS claim_row_version ON %I', child);
+            EXECUTE format(
+                'CREATE TRIGGER claim_row_version AFTER INSERT OR UPDATE OR DELETE ON %I '
+                'FOR EACH ROW EXECUTE FUNCTION claim_child_bump_row_version()',
+                child
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
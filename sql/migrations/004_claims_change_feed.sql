@@ -0,0 +1,49 @@
+-- Change feed behind GET /api/claims/changes. Every insert or update of a
+-- claim (including the row_version bumps from 003 when its invoice or forms
+-- change) stamps claims.change_xid with the writing transaction's id. Hard
+-- deletes leave a row in claim_tombstones.
+--
+-- Readers use the xmin of their snapshot as the next cursor. Transaction
+-- ids below it belong to finished transactions, so a change committed late
+-- by an older transaction is picked up by the next poll instead of being
+-- skipped.
+--
+-- Apply with: psql "$DATABASE_URL" -f sql/migrations/004_claims_change_feed.sql
+-- (needs PostgreSQL 13+ for xid8)
+
+ALTER TABLE claims
+    ADD COLUMN IF NOT EXISTS change_xid xid8 NOT NULL DEFAULT '0';
+
+CREATE INDEX IF NOT EXISTS claims_change_xid_idx ON claims (change_xid);
+
+CREATE TABLE IF NOT EXISTS claim_tombstones (
+    claim_id text NOT NULL,
+    change_xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+    deleted_at timestamptz NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS claim_tombstones_change_xid_idx ON claim_tombstones (change_xid);
+
+CREATE OR REPLACE FUNCTION claims_stamp_change() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS claims_change_xid ON claims;
+CREATE TRIGGER claims_change_xid
+    BEFORE INSERT OR UPDATE ON claims
+    FOR EACH ROW EXECUTE FUNCTION claims_stamp_change();
+
+CREATE OR REPLACE FUNCTION claims_record_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO claim_tombstones (claim_id) VALUES (OLD.claim_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS claims_tombstone ON claims;
+CREATE TRIGGER claims_tombstone
+    AFTER DELETE ON claims
+    FOR EACH ROW EXECUTE FUNCTION claims_record_tombstone();
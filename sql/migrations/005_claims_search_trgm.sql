@@ -0,0 +1,29 @@
+-- Trigram indexes behind GET /api/claims-search?q=. Prefix (ILIKE 'q%'),
+-- substring and fuzzy (%, <%) matches on claim_id, claimant_name, ref_no and
+-- vehicle registrations are all answered from these GIN indexes.
+-- Registrations are matched without spaces and in upper case ("ab12 cde"
+-- finds "AB12CDE"), so they are indexed on that normalised form.
+--
+-- Apply with: psql "$DATABASE_URL" -f sql/migrations/005_claims_search_trgm.sql
+-- (CONCURRENTLY: run outside a transaction block.)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_claim_id_trgm_idx
+    ON claims USING gin (claim_id gin_trgm_ops)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_claimant_name_trgm_idx
+    ON claims USING gin (claimant_name gin_trgm_ops)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_ref_no_trgm_idx
+    ON claims USING gin (ref_no gin_trgm_ops)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS claims_latest_vehicle_reg_trgm_idx
+    ON claims USING gin ((upper(replace(latest_vehicle_reg, ' ', ''))) gin_trgm_ops)
+    WHERE recently_deleted = FALSE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS accident_claims_client_registration_trgm_idx
+    ON accident_claims USING gin ((upper(replace(client_registration, ' ', ''))) gin_trgm_ops);
@@ -1,6 +1,9 @@
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 import json
+import base64
+import itertools
+import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from psycopg2 import errors
@@ -9,6 +12,37 @@ import inspect
 from fastapi import HTTPException
 import json
 from datetime import datetime,date
+from db import prepared
+from db.unit_of_work import transactional, rollback, on_commit
+from db.query_metrics import instrumented, current_method, tag
+from db.connection import READ_YOUR_WRITES_SECONDS
+from utils.cache import TTLCache
+from utils.blobs import store_blobs, to_ref, REF_PREFIX
+from sql.queries.formRegistry import form_for, BLOB_COLUMNS
+
+_stream_ids = itertools.count()   # server-side cursor names, unique per process
+
+# Rows fetched per round trip by the server-side cursors behind stream=True.
+STREAM_BATCH_SIZE = max(1, int(os.getenv("DB_STREAM_BATCH_SIZE", "500")))
+
+# get_all_claims / get_claims_page results, dropped whenever a write to claims
+# or invoices commits (see _claims_changed). The TTL is only a safety net, e.g.
+# for writes made by other instances or directly in the database. With a read
+# replica, results are not stored until it has had time to catch up.
+claims_list_cache = TTLCache(
+    "claims_list",
+    ttl=float(os.getenv("CLAIMS_CACHE_TTL", "30")),
+    maxsize=int(os.getenv("CLAIMS_CACHE_MAX_ENTRIES", "256")),
+    settle=READ_YOUR_WRITES_SECONDS if os.getenv("DATABASE_REPLICA_URL") else 0.0,
+)
+
+# GET /summary/{claim_id} results, opened on every list row hover. Dropped when
+# a write to the claim, its invoices or the forms the summary shows commits.
+claim_summary_cache = TTLCache(
+    "claim_summary",
+    ttl=float(os.getenv("CLAIM_SUMMARY_CACHE_TTL", "10")),
+    maxsize=int(os.getenv("CLAIM_SUMMARY_CACHE_MAX_ENTRIES", "1024")),
+)
 
 def parse_date(d):
     if d and isinstance(d, str) and d.strip():  # non-empty string
@@ -17,36 +51,279 @@ def parse_date(d):
         return d.date()
     return None  # for None, empty string, or other invalid
 
+# ----- CLAIM PAYLOAD -----
+
+# Columns of claims returned by the claim list and detail reads, in payload
+# order. Bookkeeping columns (row_version behind the ETags, change_xid behind
+# the change feed) stay internal; a new claims column is exposed by adding it
+# here.
+CLAIM_COLUMNS = (
+    "claim_id", "claimant_name", "claim_type", "council", "status", "ref_no",
+    "claim_start_date", "invoice_date", "pay_date", "payment",
+    "is_disputed", "dispute_reason",
+    "closed_by", "closed_date", "reason",
+    "locked_by", "lock_expires_at", "lock_updated_at",
+    "recently_deleted", "recently_deleted_date", "deleted_by",
+    "updates",
+)
+
+# Stored by refresh_claim_hire_fields(); last in the payload, where the
+# derived fields used to be.
+CLAIM_HIRE_COLUMNS = ("hire_end_date", "hire_start_date", "latest_vehicle_reg")
+
+
+def claim_payload_sql(t: str = "c") -> str:
+    """SELECT list of a claim payload: claims (alias `t`) and its latest invoice (alias "i")."""
+    return ",\n            ".join((
+        *(f"{t}.{column}" for column in CLAIM_COLUMNS),
+        "i.id AS invoice_id",
+        "i.invoice_datetime",
+        "i.info",
+        *(f"{t}.{column}" for column in CLAIM_HIRE_COLUMNS),
+    ))
+
+
+# ----- CLAIMS LIST PAGINATION -----
+
+# Sortable columns: (key expression, cursor cast, key used for NULL).
+# NULLs are folded into a sentinel so (key, claim_id) is a total order that
+# a row comparison and an expression index can both use. See
+# sql/migrations/001_claims_keyset_indexes.sql.
+CLAIM_SORT_KEYS = {
+    "claim_id": ("{t}.claim_id", None, None),
+    "claimant_name": ("COALESCE({t}.claimant_name, '')", "text", ""),
+    "claim_start_date": ("COALESCE({t}.claim_start_date, '-infinity'::date)", "date", "-infinity"),
+    "invoice_date": ("COALESCE({t}.invoice_date, '-infinity'::date)", "date", "-infinity"),
+    "pay_date": ("COALESCE({t}.pay_date, '-infinity'::date)", "date", "-infinity"),
+}
+
+CLAIM_DATE_FILTERS = ("claim_start_date", "invoice_date", "pay_date")
+
+# Hire fields derived from a rental agreement (alias "ra"). They are stored on
+# claims by refresh_claim_hire_fields() whenever the agreement is written, so
+# reads select plain columns instead of expanding change_vehicle_history.
+CLAIM_HIRE_FIELDS = """
+            -- hire_end_date: there are 3 cases:
+            -- 1. If hire_vehicle_date_in IS NULL => NULL
+            -- 2. If ANY change_vehicle_history date_in is '' (empty string) => NULL
+            -- 3. Otherwise, GREATEST of all available date_in values
+            CASE
+                WHEN ra.hire_vehicle_date_in IS NULL THEN NULL
+                WHEN EXISTS (
+                    SELECT 1
+                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
+                    WHERE j->>'date_in' = ''
+                ) THEN NULL
+                ELSE GREATEST(
+                    ra.hire_vehicle_date_in,
+                    (
+                        SELECT MAX((NULLIF(j->>'date_in',''))::date)
+                        FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
+                        WHERE NULLIF(j->>'date_in','') IS NOT NULL
+                    )
+                )
+            END AS hire_end_date,
+
+            -- hire_start_date: earliest of hire_vehicle_date_out and JSON date_out
+            LEAST(
+                ra.hire_vehicle_date_out,
+                (
+                    SELECT MIN((NULLIF(j->>'date_out',''))::date)
+                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
+                    WHERE NULLIF(j->>'date_out','') IS NOT NULL
+                )
+            ) AS hire_start_date,
+
+            -- latest vehicle reg: main hire vehicle or change_vehicle_history
+            (
+                SELECT vehicle_reg
+                FROM (
+                    SELECT
+                        ra.hire_vehicle_reg AS vehicle_reg,
+                        ra.hire_vehicle_date_out AS date_out
+                    WHERE NULLIF(ra.hire_vehicle_reg, '') IS NOT NULL
+                    AND ra.hire_vehicle_date_out IS NOT NULL
+
+                    UNION ALL
+
+                    SELECT
+                        j->>'vehicle_reg' AS vehicle_reg,
+                        (NULLIF(j->>'date_out', ''))::date AS date_out
+                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
+                    WHERE NULLIF(j->>'date_out', '') IS NOT NULL
+                    AND NULLIF(j->>'vehicle_reg', '') IS NOT NULL
+                ) AS all_vehicles
+                ORDER BY date_out DESC
+                LIMIT 1
+            ) AS latest_vehicle_reg"""
+
+# ----- CLAIM SEARCH -----
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _normalise_reg(expr: str) -> str:
+    return f"upper(replace({expr}, ' ', ''))"
+
+def _match_score(expr: str, similarity: str, contains: bool = False) -> str:
+    """exact > prefix > (substring) > fuzzy, plus trigram similarity to order within a tier."""
+    tiers = f"WHEN {expr} ILIKE %(exact)s THEN 3 WHEN {expr} ILIKE %(prefix)s THEN 2"
+    if contains:
+        tiers += f" WHEN {expr} ILIKE %(contains)s THEN 1"
+    return f"(CASE {tiers} ELSE 0 END + COALESCE({similarity}, 0))"
+
+def _reg_score(expr: str) -> str:
+    return (
+        f"(CASE WHEN {expr} = %(reg)s THEN 3 WHEN {expr} LIKE %(reg_prefix)s THEN 2 ELSE 0 END"
+        f" + COALESCE(similarity({expr}, %(reg)s), 0))"
+    )
+
+def encode_claims_cursor(sort: str, order: str, value, claim_id: str) -> str:
+    _, _, null_value = CLAIM_SORT_KEYS[sort]
+    if value is None:
+        value = null_value
+    elif isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps([sort, order, value, claim_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_claims_cursor(cursor: str, sort: str, order: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, claim_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("Cursor was issued for a different sort order")
+    return value, claim_id
+
+# ----- FORM BLOBS -----
+
+# Form columns, writable fields, ?fields= allowlists and response views are
+# declared in the form registry (sql/queries/formRegistry.py).
+def _blob_values_sql() -> str:
+    """(table_name, column_name, value) for every BLOB_COLUMNS value, as one SELECT."""
+    return "\nUNION ALL\n".join(
+        f"SELECT '{table}' AS table_name, '{column}' AS column_name, {column}::text AS value FROM {table}"
+        for table, columns in BLOB_COLUMNS.items()
+        for column in columns
+    )
+
+# ----- CLAIM BUNDLE -----
+
+# Sections of GET /claims/{id}/bundle, each a JSON-valued subquery over the
+# claim row "c". They mirror the per-form endpoints, so the frontend can open
+# a claim with one request and one statement instead of ten.
+CLAIM_BUNDLE_SECTIONS = {
+    "claim": f"""(
+        -- the claim payload of get_claim_by_id, with the status it derives
+        SELECT jsonb_build_object(
+            {", ".join(f"'{column}', c.{column}" for column in (*CLAIM_COLUMNS, *CLAIM_HIRE_COLUMNS))}
+        ) || jsonb_build_object(
+            'invoice_id', i.id,
+            'invoice_datetime', i.invoice_datetime,
+            'info', i.info,
+            'status', CASE
+                WHEN i.invoice_datetime IS NOT NULL THEN 'invoice sent'
+                WHEN c.hire_end_date IS NOT NULL THEN 'hire end'
+                WHEN c.pay_date IS NOT NULL THEN 'client paid'
+                WHEN c.hire_start_date IS NOT NULL THEN 'hire start'
+                ELSE 'claim created'
+            END
+        )
+        FROM (SELECT 1) one
+        LEFT JOIN LATERAL (
+            SELECT id, invoice_datetime, info
+            FROM invoice
+            WHERE invoice.claim_id = c.claim_id
+            ORDER BY invoice_datetime DESC
+            LIMIT 1
+        ) i ON TRUE
+    )""",
+    "accident_claim": """(
+        SELECT to_jsonb(a) - 'checklist_vd' || jsonb_build_object('checklist_v.d', a.checklist_vd)
+        FROM accident_claims a WHERE a.claim_id = c.claim_id LIMIT 1
+    )""",
+    "pre_inspection_forms": """COALESCE((
+        SELECT json_agg(p ORDER BY p.inspection_id)
+        FROM pre_inspection_forms p WHERE p.claim_id = c.claim_id
+    ), '[]')""",
+    "rental_agreement": """(
+        SELECT to_json(r) FROM rental_agreements r WHERE r.claim_id = c.claim_id LIMIT 1
+    )""",
+    "storage_form": """(
+        SELECT to_json(s) FROM storage_forms s WHERE s.claim_id = c.claim_id LIMIT 1
+    )""",
+    "cancellation_form": """(
+        SELECT to_json(f) FROM cancellation_forms f WHERE f.claim_id = c.claim_id LIMIT 1
+    )""",
+    "documents": """COALESCE((
+        SELECT d.documents FROM claim_documents d WHERE d.claim_id = c.claim_id LIMIT 1
+    ), '{}')""",
+    "invoices": """COALESCE((
+        SELECT json_agg(v ORDER BY v.invoice_datetime DESC) FROM (
+            SELECT id, claim_id, invoice_datetime, info,
+            docs, storage_bill, rent_bill, user_name, payment_date, payment_amount
+            FROM invoice WHERE claim_id = c.claim_id
+        ) v
+    ), '[]')""",
+    "updates": "COALESCE(c.updates, '[]')",
+    "history": """COALESCE((
+        SELECT json_agg(h ORDER BY h.id DESC)
+        FROM claim_changes_history h WHERE h.claim_id = c.claim_id
+    ), '[]')""",
+}
+
+@instrumented
 class ClaimFormQueries:
     def __init__(self, conn):
         self.conn = conn
 
-    def upsert_accident_claim(self, claim_id: str, data: dict) -> dict | None:
-        updatable_columns = [
-            "checklist_vd", "checklist_pi", "checklist_dvla", "checklist_badge", "checklist_recovery",
-            "checklist_hire", "checklist_ni_no", "checklist_storage", "checklist_plate",
-            "checklist_licence", "checklist_logbook",
-            "date_of_claim", "accident_date", "accident_time", "accident_location", "accident_description",
-            "owner_full_name", "owner_email", "owner_telephone", "owner_address",
-            "owner_postcode", "owner_dob", "owner_ni_number", "owner_occupation",
-            "driver_full_name", "driver_email", "driver_telephone", "driver_address",
-            "driver_postcode", "driver_dob", "driver_ni_number", "driver_occupation",
-            "client_vehicle_make", "client_vehicle_model", "client_registration",
-            "client_policy_no", "client_cover_type", "client_policy_holder",
-            "third_party_name", "third_party_email", "third_party_telephone",
-            "third_party_address", "third_party_postcode", "third_party_dob",
-            "third_party_ni_number", "third_party_occupation",
-            "third_party_vehicle_make", "third_party_vehicle_model",
-            "third_party_registration", "third_party_policy_no", "third_party_policy_holder",
-            "fault_opinion", "fault_reason", "road_conditions", "weather_conditions",
-            "witness1_name", "witness1_address", "witness1_postcode", "witness1_telephone",
-            "witness2_name", "witness2_address", "witness2_postcode", "witness2_telephone",
-            "loss_of_earnings", "employer_details",
-            "print_name", "declaration_date", "client_signature",
-            "circumstance_drawing", "direction_before_drawing", "direction_after_drawing"
-        ]
+    def _rollback(self):
+        # Abandon the unit of work this call belongs to (see db/unit_of_work.py).
+        rollback(self.conn)
 
-        fields_to_update = [col for col in updatable_columns if col in data]
+    def _claims_changed(self):
+        # Drop cached claims lists once this write commits (not if it rolls back).
+        on_commit(self.conn, claims_list_cache.invalidate)
+        self._claim_summary_changed()
+
+    def _claim_summary_changed(self):
+        on_commit(self.conn, claim_summary_cache.invalidate)
+
+    def _stream(self, query: str, params=None):
+        """
+        Run `query` on a server-side cursor and return an iterator of row-dict
+        batches (see api/streaming.py). The cursor is declared here, so SQL
+        errors surface before a response starts; rows are fetched lazily.
+        """
+        method = current_method()
+        cur = self.conn.cursor(name=f"stream_{next(_stream_ids)}")
+        try:
+            cur.execute(query, params)
+        except Exception:
+            cur.close()
+            raise
+        return self._stream_batches(cur, method)
+
+    @staticmethod
+    def _stream_batches(cur, method: str):
+        with cur:
+            columns = None
+            while True:
+                with tag(method):
+                    rows = cur.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    return
+                if columns is None:
+                    columns = [desc[0] for desc in cur.description]
+                yield [dict(zip(columns, row)) for row in rows]
+
+    @transactional
+    def upsert_accident_claim(self, claim_id: str, data: dict) -> dict | None:
+        form = form_for(self.conn, "accident_claims")
+        data = form.coerce(store_blobs(data, form.blobs))
+        fields_to_update = form.fields_in(data)
         if not fields_to_update and claim_id not in data:
             return None
 
@@ -80,37 +357,25 @@ class ClaimFormQueries:
                 else:
                     changed_fields = [col for col in fields_to_update if data.get(col) is not None and data.get(col) != "" and data.get(col) != 'No' and data.get(col) != [] and data.get(col) != False]
 
-                params = {"claim_id": claim_id, **{k: data[k] for k in fields_to_update}}
+                # psycopg2 only reads the named parameters the statement uses
+                params = {**data, "claim_id": claim_id}
 
                 if record_exists:
                     # 2a. UPDATE existing entry
                     if not changed_fields:
                         return old_dict # No changes to apply
-                    set_clause = ", ".join(f"{col} = %({col})s" for col in fields_to_update)
-                    query = f"""
-                        UPDATE accident_claims 
-                        SET {set_clause}
-                        WHERE claim_id = %(claim_id)s
-                        RETURNING *;
-                    """
+                    query = form.update_sql(fields_to_update, "claim_id")
                 else:
                     # 2b. INSERT new entry
-                    insert_columns = ["claim_id"] + fields_to_update
+                    insert_columns = ("claim_id", *fields_to_update)
                     if "user_name" in data:
-                        insert_columns.append("user_name")
-                        params["user_name"] = data["user_name"]
-                    
-                    values_placeholders = ", ".join(f"%({col})s" for col in insert_columns)
-                    query = f"""
-                        INSERT INTO accident_claims ({', '.join(insert_columns)})
-                        VALUES ({values_placeholders})
-                        RETURNING *;
-                    """
+                        insert_columns += ("user_name",)
+                    query = form.insert_sql(insert_columns)
 
                 cur.execute(query, params)
+                self._claim_summary_changed()
                 row = cur.fetchone()
                 if row:
-                    self.conn.commit()
                     if changed_fields:
                         self.insert_claim_change(claim_id, user_name, current_date, "RTA Form", changed_fields)
                     
@@ -119,9 +384,10 @@ class ClaimFormQueries:
                 return None
         except Exception as e:
             print(f"Error in upsert_accident_claim: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
         
+    @transactional
     def upsert_pre_inspection_form(
         self,
         claim_id: str,
@@ -129,21 +395,9 @@ class ClaimFormQueries:
         inspection_id: str = None
     ) -> dict | None:
 
-        updatable_columns = [
-            "condition_1", "condition_2", "condition_3", "condition_4", "condition_5",
-            "condition_6", "condition_7", "condition_8", "condition_9", "condition_10",
-            "condition_11", "condition_12", "condition_13", "condition_14", "condition_15",
-            "condition_16", "condition_17", "condition_18", "condition_19", "condition_20",
-            "condition_21", "condition_22", "condition_23", "condition_24", "condition_25",
-            "condition_26", "condition_27", "condition_28", "condition_29", "condition_30",
-            "date", "customer", "detailer", "order_number",
-            "year", "make", "model",
-            "notes", "recommendations",
-            "customer_signature", "detailer_signature",
-            "base_vehicle_image", "annotated_vehicle_image"
-        ]
-
-        fields_to_update = [col for col in updatable_columns if col in data]
+        form = form_for(self.conn, "pre_inspection_forms")
+        data = form.coerce(store_blobs(data, form.blobs))
+        fields_to_update = form.fields_in(data)
 
         changed_fields = []
         user_name = data.get("user_name", "Unknown")
@@ -178,10 +432,7 @@ class ClaimFormQueries:
                 else:
                     changed_fields = [col for col in fields_to_update if data.get(col) is not None and data.get(col) != "" and data.get(col) != 'No' and data.get(col) != [] and data.get(col) != False]
 
-                params = {
-                    "claim_id": claim_id,
-                    **{col: data[col] for col in fields_to_update}
-                }
+                params = {**data, "claim_id": claim_id}
                 if inspection_id:
                     params["inspection_id"] = inspection_id
 
@@ -189,37 +440,21 @@ class ClaimFormQueries:
                     # 2a. UPDATE existing entry
                     if not changed_fields:
                         return old_dict
-                    set_clause = ", ".join(f"{col} = %({col})s" for col in fields_to_update)
-                    query = f"""
-                        UPDATE pre_inspection_forms
-                        SET {set_clause}
-                        WHERE inspection_id = %(inspection_id)s
-                        RETURNING *;
-                    """
+                    query = form.update_sql(fields_to_update, "inspection_id")
                 else:
                     # 2b. INSERT new entry
-                    insert_columns = ["claim_id"] + fields_to_update
+                    insert_columns = ("claim_id", *fields_to_update)
                     if inspection_id:
-                        insert_columns.append("inspection_id")
-
+                        insert_columns += ("inspection_id",)
                     if "user_name" in data:
-                        insert_columns.append("user_name")
-                        params["user_name"] = data["user_name"]
-
-                    values_placeholders = ", ".join(f"%({col})s" for col in insert_columns)
-                    query = f"""
-                        INSERT INTO pre_inspection_forms ({', '.join(insert_columns)})
-                        VALUES ({values_placeholders})
-                        RETURNING *;
-                    """
+                        insert_columns += ("user_name",)
+                    query = form.insert_sql(insert_columns)
 
                 cur.execute(query, params)
                 row = cur.fetchone()
                 if not row:
-                    self.conn.commit()
                     return None
 
-                self.conn.commit()
                 if changed_fields:
                     self.insert_claim_change(claim_id, user_name, current_date, f"Hire Vehicle Form {inspection_id}", changed_fields)
 
@@ -228,16 +463,15 @@ class ClaimFormQueries:
 
         except Exception as e:
             print(f"Error in upsert_pre_inspection_form: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
 
+    @transactional
     def upsert_cancellation_form(self, claim_id: str, data: dict) -> dict | None:
-        updatable_columns = [
-            "name", "address", "postcode", "email",
-            "cancellation_date", "cancellation_signature"
-        ]
+        form = form_for(self.conn, "cancellation_forms")
 
-        fields_to_update = [col for col in updatable_columns if col in data]
+        data = form.coerce(store_blobs(data, form.blobs))
+        fields_to_update = form.fields_in(data)
         if not fields_to_update:
             return None
 
@@ -271,37 +505,23 @@ class ClaimFormQueries:
                 else:
                     changed_fields = [col for col in fields_to_update if data.get(col) is not None and data.get(col) != "" and data.get(col) != 'No' and data.get(col) != [] and data.get(col) != False]
 
-                params = {"claim_id": claim_id, **{k: data[k] for k in fields_to_update}}
+                params = {**data, "claim_id": claim_id}
 
                 if record_exists:
                     # 2a. UPDATE existing entry
                     if not changed_fields:
                         return old_dict
-                    set_clause = ", ".join(f"{col} = %({col})s" for col in fields_to_update)
-                    query = f"""
-                        UPDATE cancellation_forms 
-                        SET {set_clause}
-                        WHERE claim_id = %(claim_id)s
-                        RETURNING *;
-                    """
+                    query = form.update_sql(fields_to_update, "claim_id")
                 else:
                     # 2b. INSERT new entry
-                    insert_columns = ["claim_id"] + fields_to_update
+                    insert_columns = ("claim_id", *fields_to_update)
                     if "user_name" in data:
-                        insert_columns.append("user_name")
-                        params["user_name"] = data["user_name"]
-
-                    values_placeholders = ", ".join(f"%({col})s" for col in insert_columns)
-                    query = f"""
-                        INSERT INTO cancellation_forms ({', '.join(insert_columns)})
-                        VALUES ({values_placeholders})
-                        RETURNING *;
-                    """
+                        insert_columns += ("user_name",)
+                    query = form.insert_sql(insert_columns)
 
                 cur.execute(query, params)
                 row = cur.fetchone()
                 if row:
-                    self.conn.commit()
                     if changed_fields:
                         self.insert_claim_change(claim_id, user_name, current_date, "Cancellation Form", changed_fields)
                         
@@ -310,20 +530,15 @@ class ClaimFormQueries:
             return None
         except Exception as e:
             print(f"Error in upsert_cancellation_form: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
 
+    @transactional
     def upsert_storage_form(self, claim_id: str, data: dict) -> dict | None:
-        updatable_columns = [
-            "name", "postcode", "address1", "address2",
-            "vehicle_make", "vehicle_model", "registration_number",
-            "date_of_recovery", "storage_start_date", "storage_end_date",
-            "number_of_days", "charges_per_day", "total_storage_charge",
-            "recovery_charge", "subtotal", "vat_amount", "invoice_total",
-            "client_date", "owner_date", "client_signature", "owner_signature" , "storage_location_key"
-        ]
+        form = form_for(self.conn, "storage_forms")
 
-        fields_to_update = [col for col in updatable_columns if col in data]
+        data = form.coerce(store_blobs(data, form.blobs))
+        fields_to_update = form.fields_in(data)
         if not fields_to_update:
             print("No fields to update in storage form")
             return None
@@ -364,37 +579,24 @@ class ClaimFormQueries:
                 else:
                     changed_fields = [col for col in fields_to_update if data.get(col) is not None and data.get(col) != "" and data.get(col) != 'No' and data.get(col) != [] and data.get(col) != False]
 
-                params = {"claim_id": claim_id, **{k: cleaned_data[k] for k in fields_to_update}}
+                params = {**cleaned_data, "claim_id": claim_id}
 
                 if record_exists:
                     # 2a. UPDATE existing entry
                     if not changed_fields:
                         return old_dict
-                    set_clause = ", ".join(f"{col} = %({col})s" for col in fields_to_update)
-                    query = f"""
-                        UPDATE storage_forms 
-                        SET {set_clause}
-                        WHERE claim_id = %(claim_id)s
-                        RETURNING *;
-                    """
+                    query = form.update_sql(fields_to_update, "claim_id")
                 else:
                     # 2b. INSERT new entry
-                    insert_columns = ["claim_id"] + fields_to_update
+                    insert_columns = ("claim_id", *fields_to_update)
                     if "user_name" in data:
-                        insert_columns.append("user_name")
-                        params["user_name"] = cleaned_data.get("user_name", data["user_name"])
-
-                    values_placeholders = ", ".join(f"%({col})s" for col in insert_columns)
-                    query = f"""
-                        INSERT INTO storage_forms ({', '.join(insert_columns)})
-                        VALUES ({values_placeholders})
-                        RETURNING *;
-                    """
+                        insert_columns += ("user_name",)
+                    query = form.insert_sql(insert_columns)
 
                 cur.execute(query, params)
+                self._claim_summary_changed()
                 row = cur.fetchone()
                 if row:
-                    self.conn.commit()
                     if changed_fields:
                         self.insert_claim_change(claim_id, user_name, current_date, "Storage Form", changed_fields)
                         
@@ -403,11 +605,12 @@ class ClaimFormQueries:
             return None
         except Exception as e:
             print(f"Error in upsert_storage_form: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
 
 
 
+    @transactional
     def insert_claim(
         self,
         claimant_name: str | None,
@@ -421,12 +624,13 @@ class ClaimFormQueries:
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (claim_id, claimant_name, claim_type, council))
+            self._claims_changed()
             self.insert_invoice(claim_id)
-            self.conn.commit()
         return True
     
 
 
+    @transactional
     def delete_claim(self, claim_id: str) -> bool:
         query = """
             DELETE FROM claims
@@ -435,16 +639,17 @@ class ClaimFormQueries:
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (claim_id,))
+                self._claims_changed()
                 if cur.rowcount == 0:
                     return False
-                self.conn.commit()
             return True
         except Exception as e:
             print(f"Error in delete_claim: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
         
     
+    @transactional
     def update_claim_dynamic(self, claim_id: str, update_data: Dict[str, Any], updated_by: str = None) -> bool:
         fields = []
         values = []
@@ -466,9 +671,9 @@ class ClaimFormQueries:
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, tuple(values))
+                self._claims_changed()
                 
                 if cur.rowcount > 0:
-                    self.conn.commit()
                     
                     # Log the changes if an updated_by user was provided
                     if updated_by:
@@ -486,11 +691,12 @@ class ClaimFormQueries:
                 
                 return False
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             print(f"Error updating claim dynamic: {e}")
             raise
 
 
+    @transactional
     def upsert_rental_agreement(self, claim_id: str, data: dict) -> dict | None:
         
         def get_existing_rental():
@@ -558,38 +764,6 @@ class ClaimFormQueries:
                 print("reg", reg)
                 self.update_fleet_history_hire_end(old_in, claim_id, reg, old_out, miles_in_val, miles_out_val)
 
-        def recalculate_car_availability(reg_no: str):
-            if not reg_no:
-                return
-
-            query = """
-                SELECT 1
-                FROM rental_agreements r
-                WHERE (
-                    -- 1. NATIVE COLUMNS: Only check for IS NOT NULL and IS NULL
-                    r.hire_vehicle_reg = %s 
-                    AND r.hire_vehicle_date_out IS NOT NULL 
-                    AND r.hire_vehicle_date_in IS NULL
-                )
-                OR EXISTS (
-                    -- 2. JSON COLUMNS: Check for NULL, empty strings '', and "null" strings
-                    SELECT 1
-                    FROM jsonb_array_elements(r.change_vehicle_history) AS ch
-                    WHERE ch->>'vehicle_reg' = %s
-                    AND ch->>'date_out' IS NOT NULL 
-                    AND ch->>'date_out' != ''
-                    AND (ch->>'date_in' IS NULL OR ch->>'date_in' = '' OR ch->>'date_in' = 'null')
-                )
-                LIMIT 1;
-            """
-            with self.conn.cursor() as cur:
-                cur.execute(query, (reg_no, reg_no))
-                is_currently_hired = cur.fetchone() is not None
-
-            # If it is currently hired out, it's NOT available.
-            is_available = not is_currently_hired
-            self.update_is_available(reg_no, is_available)
-            print(f"[DEBUG] Recalculated availability for {reg_no}: {is_available}")
         # ---------------------------
         # START MAIN EXECUTION
         # ---------------------------
@@ -655,35 +829,10 @@ class ClaimFormQueries:
                 )
 
         # --- PREPARE DATA FOR DB ---
-        updatable_columns = [
-            "hirer_name", "title", "permanent_address",
-            "additional_driver_name", "licence_no",
-            "new_date_issued", "new_expiry_date", "new_dob", "new_date_test_passed", "new_occupation", "new_licence_no",
-            "date_issued", "expiry_date", "dob", "date_test_passed", "occupation",
-            "daily_rate", "policy_excess", "deposit", "refuelling_charge",
-            "insurance_company", "policy_no", "insurance_dates",
-            "own_insurance_confirm", "insurance_date", "insurance_time",
-            "motoring_offence_3yrs", "disqualified_5yrs", "accident_3yrs",
-            "insurance_declined_5yrs", "dishonesty_conviction",
-            "medical_condition1", "medical_condition2", "medical_details",
-            "additional_driver_auth",
-            "hire_vehicle_reg", "hire_vehicle_make", "hire_vehicle_model", "hire_vehicle_group",
-            "hire_vehicle_date_out", "hire_vehicle_date_in",
-            "hire_vehicle_fuel_out", "hire_vehicle_fuel_in", "hire_vehicle_rate_per_day",
-            "change_vehicle_reg", "change_vehicle_make", "change_vehicle_model", "change_vehicle_group",
-            "change_vehicle_date_out", "change_vehicle_date_in",
-            "change_vehicle_fuel_out", "change_vehicle_fuel_in",
-            "admin_fee", "delivery_charge", "cdw_per_day",
-            "days_out", "days_in", "total_days",
-            "rate_per_day", "refuelling_total",
-            "subtotal", "vat", "total_cost",
-            "declaration_date", "liability_date",
-            "hirer_signature_terms", "company_signature",
-            "hirer_signature_insurance", "declaration_signature", "liability_signature",
-            "change_vehicle_history", "hire_vehicle_miles_out", "hire_vehicle_miles_in"
-        ]
+        form = form_for(self.conn, "rental_agreements")
 
-        fields_to_update = [col for col in updatable_columns if col in data]
+        data = form.coerce(store_blobs(data, form.blobs))
+        fields_to_update = form.fields_in(data)
         if not fields_to_update:
             return None
 
@@ -692,12 +841,9 @@ class ClaimFormQueries:
         current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Prepare parameters for the dynamically built query
-        params = {"claim_id": claim_id}
-        for k in fields_to_update:
-            if k == "change_vehicle_history" and k in data:
-                params[k] = json.dumps(data[k])
-            else:
-                params[k] = data[k]
+        params = {**data, "claim_id": claim_id}
+        if "change_vehicle_history" in fields_to_update:
+            params["change_vehicle_history"] = json.dumps(data["change_vehicle_history"])
 
         try:
             with self.conn.cursor() as cur:
@@ -751,26 +897,13 @@ class ClaimFormQueries:
 
                 if record_exists:
                     # 2a. UPDATE existing entry
-                    set_clause = ", ".join(f"{col} = %({col})s" for col in fields_to_update)
-                    query = f"""
-                        UPDATE rental_agreements 
-                        SET {set_clause}
-                        WHERE claim_id = %(claim_id)s
-                        RETURNING *;
-                    """
+                    query = form.update_sql(fields_to_update, "claim_id")
                 else:
                     # 2b. INSERT new entry
-                    insert_columns = ["claim_id"] + fields_to_update
+                    insert_columns = ("claim_id", *fields_to_update)
                     if "user_name" in data:
-                        insert_columns.append("user_name")
-                        params["user_name"] = data["user_name"]
-
-                    values_placeholders = ", ".join(f"%({col})s" for col in insert_columns)
-                    query = f"""
-                        INSERT INTO rental_agreements ({', '.join(insert_columns)})
-                        VALUES ({values_placeholders})
-                        RETURNING *;
-                    """
+                        insert_columns += ("user_name",)
+                    query = form.insert_sql(insert_columns)
 
                 cur.execute(query, params)
                 row = cur.fetchone()
@@ -838,10 +971,10 @@ class ClaimFormQueries:
                 # ---------------------------
                 # Combine both old regs (in case a car was removed/changed) and new regs
                 all_regs_to_recalculate = old_regs.union(new_regs)
-                
-                for r in all_regs_to_recalculate:
-                    # Dynamically check true state across the DB for each affected car
-                    recalculate_car_availability(r)
+
+                # Recompute the true state of every affected car in one statement
+                availability = self.recalculate_availability(list(all_regs_to_recalculate))
+                print(f"[DEBUG] Recalculated availability: {availability}")
 
 
                 # ---------------------------
@@ -885,14 +1018,14 @@ class ClaimFormQueries:
                     elif latest_entry.get("date_out") and latest_entry.get("date_in"):
                         self.update_claim_status(claim_id, "hire end")
 
+                self.refresh_claim_hire_fields([claim_id])
 
-                self.conn.commit()
-                self.refresh_rental_agreements_view()
+                on_commit(self.conn, self.refresh_rental_agreements_view)
                 return result
 
         except Exception as e:
             print(f"Error in upsert_rental_agreement: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
 
 
@@ -924,7 +1057,7 @@ class ClaimFormQueries:
             WHERE c.reg_no = %s;
         """
         with self.conn.cursor() as cur:
-            cur.execute(query, (vehicle_reg,))
+            prepared.execute(cur, "check_is_available", query, (vehicle_reg,))
             row = cur.fetchone()
 
             if not row:
@@ -941,6 +1074,7 @@ class ClaimFormQueries:
                 "claim_id": claim_id
             }
 
+    @transactional
     def upsert_claim_documents(self, claim_id: str, documents: dict) -> None:
         query = """
         INSERT INTO claim_documents (claim_id, documents)
@@ -953,12 +1087,12 @@ class ClaimFormQueries:
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (claim_id, json.dumps(documents)))
-                self.conn.commit()
         except Exception as e:
             print(f"Error in upsert_claim_documents: {e}")
-            self.conn.rollback()
+            self._rollback()
 
 
+    @transactional
     def delete_claim_document(self, claim_id: str, doc_name: str) -> bool:
         query = """
         UPDATE claim_documents
@@ -970,13 +1104,13 @@ class ClaimFormQueries:
             with self.conn.cursor() as cur:
                 cur.execute(query, (doc_name, claim_id))
                 result = cur.fetchone()
-                self.conn.commit()
                 return bool(result)
         except Exception as e:
             print(f"Error in delete_claim_document: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
 
+    @transactional
     def create_user(self, username: str, password: str, role: str) -> dict | None:
         query = """
             INSERT INTO users (username, password, role)
@@ -987,16 +1121,16 @@ class ClaimFormQueries:
             with self.conn.cursor() as cur:
                 cur.execute(query, (username, password, role))
                 row = cur.fetchone()
-                self.conn.commit()
                 if row:
                     columns = [desc[0] for desc in cur.description]
                     return dict(zip(columns, row))
             return None
         except Exception as e:
             print(f"Error in create_user: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
         
+    @transactional
     def delete_user(self, user_id: int) -> bool:
         query = """
             DELETE FROM users
@@ -1007,11 +1141,10 @@ class ClaimFormQueries:
             with self.conn.cursor() as cur:
                 cur.execute(query, (user_id,))
                 row = cur.fetchone()
-                self.conn.commit()
                 return row is not None
         except Exception as e:
             print(f"Error in delete_user: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
 
     def get_all_non_admin_users(self) -> list[dict]:
@@ -1034,8 +1167,8 @@ class ClaimFormQueries:
     #  Read-only methods  no need for try/except + rollback
     # ────────────────────────────────────────────────
 
-    def get_accident_claim(self, claim_id: str) -> dict | None:
-        query = "SELECT * FROM accident_claims WHERE claim_id = %s;"
+    def get_accident_claim(self, claim_id: str, fields: list[str] | None = None) -> dict | None:
+        query = f"SELECT {form_for(self.conn, 'accident_claims').select_list(fields)} FROM accident_claims WHERE claim_id = %s;"
         with self.conn.cursor() as cur:
             cur.execute(query, (claim_id,))
             row = cur.fetchone()
@@ -1044,12 +1177,12 @@ class ClaimFormQueries:
                 return dict(zip(columns, row))
         return None
 
-    def get_pre_inspection_form(self, claim_id: str) -> list[dict]:  # Changed to list
+    def get_pre_inspection_form(self, claim_id: str, fields: list[str] | None = None) -> list[dict]:  # Changed to list
         """
         Get ALL pre-inspection forms by claim_id (multiple rows)
         """
-        query = """
-        SELECT * FROM pre_inspection_forms 
+        query = f"""
+        SELECT {form_for(self.conn, 'pre_inspection_forms').select_list(fields)} FROM pre_inspection_forms 
         WHERE claim_id = %s 
         ORDER BY inspection_id ASC;
         """
@@ -1080,8 +1213,8 @@ class ClaimFormQueries:
                 return dict(zip(columns, row))
         return None
 
-    def get_storage_form(self, claim_id: str) -> dict | None:
-        query = "SELECT * FROM storage_forms WHERE claim_id = %s;"
+    def get_storage_form(self, claim_id: str, fields: list[str] | None = None) -> dict | None:
+        query = f"SELECT {form_for(self.conn, 'storage_forms').select_list(fields)} FROM storage_forms WHERE claim_id = %s;"
         with self.conn.cursor() as cur:
             cur.execute(query, (claim_id,))
             row = cur.fetchone()
@@ -1090,8 +1223,8 @@ class ClaimFormQueries:
                 return dict(zip(columns, row))
         return None
 
-    def get_rental_agreement(self, claim_id: str) -> dict | None:
-        query = "SELECT * FROM rental_agreements WHERE claim_id = %s;"
+    def get_rental_agreement(self, claim_id: str, fields: list[str] | None = None) -> dict | None:
+        query = f"SELECT {form_for(self.conn, 'rental_agreements').select_list(fields)} FROM rental_agreements WHERE claim_id = %s;"
         with self.conn.cursor() as cur:
             cur.execute(query, (claim_id,))
             row = cur.fetchone()
@@ -1100,72 +1233,15 @@ class ClaimFormQueries:
                 return dict(zip(columns, row))
         return None
     
-    def get_all_claims(self) -> list[dict]:
-        query = """
+    def get_all_claims(self, stream: bool = False, versioned: bool = False) -> list[dict]:
+        """
+        Every live claim. With versioned=True, (cache entry version, rows) so
+        the route can set an ETag (utils/etag.py cache_etag).
+        """
+        query = f"""
         SELECT
-            c.*,
-            
-            -- latest invoice
-            i.id AS invoice_id,
-            i.invoice_datetime,
-            i.info,
-
-            -- hire_end_date: there are 3 cases:
-            -- 1. If hire_vehicle_date_in IS NULL => NULL
-            -- 2. If ANY change_vehicle_history date_in is '' (empty string) => NULL
-            -- 3. Otherwise, GREATEST of all available date_in values
-            CASE
-                WHEN ra.hire_vehicle_date_in IS NULL THEN NULL
-                WHEN EXISTS (
-                    SELECT 1
-                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
-                    WHERE j->>'date_in' = ''
-                ) THEN NULL
-                ELSE GREATEST(
-                    ra.hire_vehicle_date_in,
-                    (
-                        SELECT MAX((NULLIF(j->>'date_in',''))::date)
-                        FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
-                        WHERE NULLIF(j->>'date_in','') IS NOT NULL
-                    )
-                )
-            END AS hire_end_date,
-
-            -- hire_start_date: earliest of hire_vehicle_date_out and JSON date_out
-            LEAST(
-                ra.hire_vehicle_date_out,
-                (
-                    SELECT MIN((NULLIF(j->>'date_out',''))::date)
-                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
-                    WHERE NULLIF(j->>'date_out','') IS NOT NULL
-                )
-            ) AS hire_start_date,
-
-            -- latest vehicle reg: checks BOTH main hire vehicle AND change_vehicle_history
-            (
-                SELECT vehicle_reg
-                FROM (
-                    -- Main hire vehicle from rental_agreements
-                    SELECT 
-                        ra.hire_vehicle_reg AS vehicle_reg,
-                        ra.hire_vehicle_date_out AS date_out
-                    WHERE NULLIF(ra.hire_vehicle_reg, '') IS NOT NULL
-                    AND ra.hire_vehicle_date_out IS NOT NULL
-
-                    UNION ALL
-
-                    -- All vehicles from change_vehicle_history JSON
-                    SELECT 
-                        j->>'vehicle_reg' AS vehicle_reg,
-                        (NULLIF(j->>'date_out', ''))::date AS date_out
-                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
-                    WHERE NULLIF(j->>'date_out', '') IS NOT NULL
-                    AND NULLIF(j->>'vehicle_reg', '') IS NOT NULL
-
-                ) AS all_vehicles
-                ORDER BY date_out DESC
-                LIMIT 1
-            ) AS latest_vehicle_reg
+            -- claim, latest invoice, stored hire dates and latest reg
+            {claim_payload_sql()}
 
         FROM claims c
 
@@ -1180,79 +1256,187 @@ class ClaimFormQueries:
         ) i
         ON c.claim_id = i.claim_id
 
-        LEFT JOIN rental_agreements ra
-        ON c.claim_id = ra.claim_id
-
         WHERE c.recently_deleted = FALSE;
         """
-        with self.conn.cursor() as cur:
-            cur.execute(query)
-            rows = cur.fetchall()
-            columns = [desc[0] for desc in cur.description]
-            return [dict(zip(columns, row)) for row in rows]
+        if stream:
+            return self._stream(query)
 
-        
-    def get_claim_by_id(self, claim_id: str) -> dict | None:
-        query = """
+        def load():
+            with self.conn.cursor() as cur:
+                prepared.execute(cur, "get_all_claims", query)
+                rows = cur.fetchall()
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in rows]
+
+        if versioned:
+            return claims_list_cache.get_or_load_versioned(("all",), load)
+        return claims_list_cache.get_or_load(("all",), load)
+
+    def get_claims_page(
+        self,
+        limit: int = 50,
+        cursor: str | None = None,
+        sort: str = "claim_id",
+        order: str = "desc",
+        status: list[str] | None = None,
+        claim_type: list[str] | None = None,
+        council: list[str] | None = None,
+        is_disputed: bool | None = None,
+        date_field: str = "claim_start_date",
+        date_from: date | None = None,
+        date_to: date | None = None,
+        versioned: bool = False,
+    ) -> dict:
+        """
+        One page of the claims list (same row shape as get_all_claims).
+        With versioned=True, (cache entry version, page) as for get_all_claims.
+
+        Filters and the keyset condition are applied to claims alone, so the
+        (sort key, claim_id) index only has to walk `limit` rows; the latest
+        invoice is then looked up for those rows only. `cursor` is the
+        `next_cursor` of the previous page.
+        """
+        if sort not in CLAIM_SORT_KEYS:
+            raise ValueError(f"Cannot sort by '{sort}'")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be 'asc' or 'desc'")
+        if date_field not in CLAIM_DATE_FILTERS:
+            raise ValueError(f"Cannot filter on date field '{date_field}'")
+
+        key_sql, key_type, _ = CLAIM_SORT_KEYS[sort]
+        direction = order.upper()
+
+        conditions = ["c.recently_deleted = FALSE"]
+        params = []
+
+        for column, values in (("status", status), ("claim_type", claim_type), ("council", council)):
+            if values:
+                conditions.append(f"c.{column} = ANY(%s)")
+                params.append(list(values))
+        if is_disputed is not None:
+            conditions.append("COALESCE(c.is_disputed, FALSE) = %s")
+            params.append(is_disputed)
+        if date_from:
+            conditions.append(f"c.{date_field} >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append(f"c.{date_field} <= %s")
+            params.append(date_to)
+
+        if cursor:
+            after = decode_claims_cursor(cursor, sort, order)
+            comparison = "<" if order == "desc" else ">"
+            if key_type is None:
+                conditions.append(f"c.claim_id {comparison} %s")
+                params.append(after[1])
+            else:
+                conditions.append(f"({key_sql.format(t='c')}, c.claim_id) {comparison} (%s::{key_type}, %s)")
+                params.extend(after)
+
+        # {t} is the table alias: "c" inside the page CTE, "page" outside it.
+        if key_type is None:
+            order_by = f"{{t}}.claim_id {direction}"
+        else:
+            order_by = f"{key_sql} {direction}, {{t}}.claim_id {direction}"
+
+        query = f"""
+        WITH page AS (
+            SELECT c.*
+            FROM claims c
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {order_by.format(t="c")}
+            LIMIT %s
+        )
         SELECT
-            c.*,
+            -- claim, latest invoice, stored hire dates and latest reg
+            {claim_payload_sql("page")}
 
-            -- latest invoice
-            i.id AS invoice_id,
-            i.invoice_datetime,
-            i.info,
+        FROM page
 
-            -- hire_end_date
-            CASE
-                WHEN ra.hire_vehicle_date_in IS NULL THEN NULL
-                WHEN EXISTS (
-                    SELECT 1
-                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
-                    WHERE j->>'date_in' = ''
-                ) THEN NULL
-                ELSE GREATEST(
-                    ra.hire_vehicle_date_in,
-                    (
-                        SELECT MAX((NULLIF(j->>'date_in',''))::date)
-                        FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
-                        WHERE NULLIF(j->>'date_in','') IS NOT NULL
-                    )
-                )
-            END AS hire_end_date,
+        LEFT JOIN LATERAL (
+            SELECT id, invoice_datetime, info
+            FROM invoice
+            WHERE invoice.claim_id = page.claim_id
+            ORDER BY invoice_datetime DESC
+            LIMIT 1
+        ) i ON TRUE
 
-            -- hire_start_date
-            LEAST(
-                ra.hire_vehicle_date_out,
-                (
-                    SELECT MIN((NULLIF(j->>'date_out',''))::date)
-                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
-                    WHERE NULLIF(j->>'date_out','') IS NOT NULL
-                )
-            ) AS hire_start_date,
+        ORDER BY {order_by.format(t="page")};
+        """
+        # One extra row tells us whether there is a next page.
+        params.append(limit + 1)
 
-            -- latest vehicle reg
-            (
-                SELECT vehicle_reg
-                FROM (
-                    SELECT 
-                        ra.hire_vehicle_reg AS vehicle_reg,
-                        ra.hire_vehicle_date_out AS date_out
-                    WHERE NULLIF(ra.hire_vehicle_reg, '') IS NOT NULL
-                    AND ra.hire_vehicle_date_out IS NOT NULL
+        def load():
+            with self.conn.cursor() as cur:
+                cur.execute(query, params)
+                columns = [desc[0] for desc in cur.description]
+                rows = [dict(zip(columns, row)) for row in cur.fetchall()]
 
-                    UNION ALL
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                next_cursor = encode_claims_cursor(sort, order, last.get(sort), last["claim_id"])
 
-                    SELECT
-                        j->>'vehicle_reg' AS vehicle_reg,
-                        (NULLIF(j->>'date_out',''))::date AS date_out
-                    FROM jsonb_array_elements(ra.change_vehicle_history::jsonb) AS j
-                    WHERE NULLIF(j->>'date_out','') IS NOT NULL
-                    AND NULLIF(j->>'vehicle_reg','') IS NOT NULL
+            return {"data": rows, "next_cursor": next_cursor, "has_more": has_more}
 
-                ) AS all_vehicles
-                ORDER BY date_out DESC
-                LIMIT 1
-            ) AS latest_vehicle_reg
+        key = (
+            "page", limit, cursor, sort, order,
+            tuple(status or ()), tuple(claim_type or ()), tuple(council or ()),
+            is_disputed, date_field, date_from, date_to,
+        )
+        if versioned:
+            return claims_list_cache.get_or_load_versioned(key, load)
+        return claims_list_cache.get_or_load(key, load)
+
+    def get_claims_changes(self, since: int | None = None) -> dict:
+        """
+        Claims created or modified since the `since` cursor, in the row shape
+        of get_all_claims, plus the ids of claims soft- or hard-deleted since.
+        Without a cursor every live claim is returned. The returned `cursor`
+        is the xmin of this read's snapshot (see migration 004), so rows can
+        repeat on the next poll but are never skipped.
+        """
+        with self.conn.cursor() as cur:
+            # Taken before the data so that anything this read misses is at or after it.
+            cur.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text;")
+            cursor = cur.fetchone()[0]
+
+            conditions = ["c.recently_deleted = FALSE"] if since is None else ["c.change_xid >= %(since)s::text::xid8"]
+            cur.execute(f"""
+                SELECT
+                    {claim_payload_sql()}
+                FROM claims c
+                LEFT JOIN LATERAL (
+                    SELECT id, invoice_datetime, info
+                    FROM invoice
+                    WHERE invoice.claim_id = c.claim_id
+                    ORDER BY invoice_datetime DESC
+                    LIMIT 1
+                ) i ON TRUE
+                WHERE {" AND ".join(conditions)}
+                ORDER BY c.change_xid, c.claim_id;
+            """, {"since": since})
+            columns = [desc[0] for desc in cur.description]
+            rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+
+            deleted = [row["claim_id"] for row in rows if row.get("recently_deleted")]
+            if since is not None:
+                cur.execute(
+                    "SELECT DISTINCT claim_id FROM claim_tombstones WHERE change_xid >= %s::text::xid8;",
+                    (since,),
+                )
+                deleted.extend(row[0] for row in cur.fetchall())
+
+        changed = [row for row in rows if not row.get("recently_deleted")]
+        return {"changed": changed, "deleted": deleted, "cursor": cursor}
+
+    def get_claim_by_id(self, claim_id: str) -> dict | None:
+        query = f"""
+        SELECT
+            -- claim, latest invoice, stored hire dates and latest reg
+            {claim_payload_sql()}
 
         FROM claims c
 
@@ -1267,15 +1451,12 @@ class ClaimFormQueries:
         ) i
         ON c.claim_id = i.claim_id
 
-        LEFT JOIN rental_agreements ra
-        ON c.claim_id = ra.claim_id
-
         WHERE c.claim_id = %s
         AND c.recently_deleted = FALSE;
         """
 
         with self.conn.cursor() as cur:
-            cur.execute(query, (claim_id,))
+            prepared.execute(cur, "get_claim_by_id", query, (claim_id,))
             row = cur.fetchone()
 
             if row:
@@ -1302,6 +1483,108 @@ class ClaimFormQueries:
 
         return None
 
+    def get_claim_bundle(self, claim_id: str, include: list[str] | None = None) -> tuple[int, str] | None:
+        """
+        (row_version, JSON text) for the requested CLAIM_BUNDLE_SECTIONS of a
+        live claim (all of them when `include` is None), built by Postgres in
+        one statement. None when the claim does not exist.
+        """
+        sections = list(CLAIM_BUNDLE_SECTIONS) if include is None else include
+        unknown = [name for name in sections if name not in CLAIM_BUNDLE_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown section(s): {', '.join(unknown)}")
+
+        pairs = ",\n".join(f"'{name}', {CLAIM_BUNDLE_SECTIONS[name]}" for name in sections)
+        query = f"""
+        SELECT
+            c.row_version,
+            json_build_object(
+                'claim_id', c.claim_id,
+                {pairs}
+            )::text
+        FROM claims c
+        WHERE c.claim_id = %s
+        AND c.recently_deleted = FALSE;
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, (claim_id,))
+            row = cur.fetchone()
+        return (row[0], row[1]) if row else None
+
+    def get_blob_storage_report(self) -> dict:
+        """
+        How the BLOB_COLUMNS payloads are stored: per column, values held as
+        blob references vs still inline, and overall the bytes those
+        references stand for vs the bytes of the distinct blobs behind them
+        (the difference is what deduplication saves). Scans every form table.
+        """
+        query = f"""
+        WITH v AS (
+            {_blob_values_sql()}
+        ),
+        r AS (
+            SELECT table_name, column_name,
+                split_part(value, ':', 3) AS digest,
+                split_part(value, ':', 4)::bigint AS size
+            FROM v
+            WHERE value LIKE %(prefix)s
+        )
+        SELECT
+            v.table_name,
+            v.column_name,
+            COUNT(*) FILTER (WHERE v.value LIKE %(prefix)s) AS refs,
+            COALESCE(SUM(split_part(v.value, ':', 4)::bigint) FILTER (WHERE v.value LIKE %(prefix)s), 0) AS ref_bytes,
+            COUNT(*) FILTER (WHERE v.value NOT LIKE %(prefix)s) AS inline_values,
+            COALESCE(SUM(octet_length(v.value)) FILTER (WHERE v.value NOT LIKE %(prefix)s), 0) AS inline_bytes,
+            (SELECT COUNT(*) FROM (SELECT DISTINCT digest FROM r) d) AS unique_blobs,
+            (SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM r) d) AS unique_bytes
+        FROM v
+        WHERE v.value IS NOT NULL AND v.value <> ''
+        GROUP BY v.table_name, v.column_name
+        ORDER BY v.table_name, v.column_name;
+        """
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query, {"prefix": REF_PREFIX + "%"})
+            rows = cur.fetchall()
+
+        unique_blobs = rows[0]["unique_blobs"] if rows else 0
+        stored_bytes = int(rows[0]["unique_bytes"]) if rows else 0
+        columns = [
+            {key: int(row[key]) if key not in ("table_name", "column_name") else row[key]
+             for key in ("table_name", "column_name", "refs", "ref_bytes", "inline_values", "inline_bytes")}
+            for row in rows
+        ]
+        referenced_bytes = sum(column["ref_bytes"] for column in columns)
+        return {
+            "references": sum(column["refs"] for column in columns),
+            "referenced_bytes": referenced_bytes,
+            "unique_blobs": unique_blobs,
+            "stored_bytes": stored_bytes,
+            "bytes_saved": referenced_bytes - stored_bytes,
+            "inline_values": sum(column["inline_values"] for column in columns),
+            "inline_bytes": sum(column["inline_bytes"] for column in columns),
+            "columns": columns,
+        }
+
+    def get_referenced_blob_digests(self) -> set[str]:
+        """Digests of every blob some form row references."""
+        query = f"""
+        SELECT DISTINCT split_part(value, ':', 3)
+        FROM ({_blob_values_sql()}) v
+        WHERE value LIKE %s;
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, (REF_PREFIX + "%",))
+            return {row[0] for row in cur.fetchall()}
+
+    def get_claim_version(self, claim_id: str) -> int | None:
+        """claims.row_version, bumped by triggers on every write to the claim or its forms."""
+        query = "SELECT row_version FROM claims WHERE claim_id = %s;"
+        with self.conn.cursor() as cur:
+            prepared.execute(cur, "get_claim_version", query, (claim_id,))
+            row = cur.fetchone()
+        return row[0] if row else None
+
     def get_claim_documents(self, claim_id: str) -> dict | None:
         query = "SELECT * FROM claim_documents WHERE claim_id = %s;"
         with self.conn.cursor() as cur:
@@ -1315,7 +1598,7 @@ class ClaimFormQueries:
     def get_user_by_username(self, username: str) -> dict | None:
         query = "SELECT * FROM users WHERE username = %s;"
         with self.conn.cursor() as cur:
-            cur.execute(query, (username,))
+            prepared.execute(cur, "get_user_by_username", query, (username,))
             row = cur.fetchone()
             if row:
                 columns = [desc[0] for desc in cur.description]
@@ -1325,6 +1608,7 @@ class ClaimFormQueries:
     
    
    
+    @transactional
     def soft_delete_claim(self, claim_id: str, deleted_by: str) -> bool:
         query = """
             UPDATE claims
@@ -1336,15 +1620,16 @@ class ClaimFormQueries:
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (deleted_by, claim_id))
+                self._claims_changed()
                 if cur.rowcount == 0:
                     return False
-                self.conn.commit()
             return True
         except Exception as e:
             print(f"Error in soft_delete_claim: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
         
+    @transactional
     def restore_short_claim(self, claim_id: str) -> bool:
         print("hello")
         query = """
@@ -1357,12 +1642,12 @@ class ClaimFormQueries:
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (claim_id,))
+                self._claims_changed()
                 print(f"restore_claim affected {cur.rowcount} rows")
-                self.conn.commit()
             return True
         except Exception as e:
             print(f"Error in restore_claim: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
         
         
@@ -1385,6 +1670,7 @@ class ClaimFormQueries:
             return {}
         
         
+    @transactional
     def permanently_delete_recently_deleted_claims(self) -> int:
         query = """
             DELETE FROM claims
@@ -1394,13 +1680,14 @@ class ClaimFormQueries:
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query)
+                self._claims_changed()
                 deleted_count = cur.rowcount
-                self.conn.commit()
                 return deleted_count
         except Exception as e:
             print(f"Error deleting recently deleted claims: {e}")
             return 0
         
+    @transactional
     def insert_invoice(
     self,
     claim_id: str,
@@ -1466,6 +1753,7 @@ class ClaimFormQueries:
                 """
 
                 cur.execute(upsert_query, tuple(insert_fields.values()))
+                self._claims_changed()
                 row = cur.fetchone()
 
                 if row is None:
@@ -1493,14 +1781,14 @@ class ClaimFormQueries:
                         fields=docs
                     )
 
-                self.conn.commit()
                 return invoice_id
 
         except Exception as e:
             print(f"Error inserting/updating invoice: {e}")
-            self.conn.rollback()
+            self._rollback()
             return 0
 
+    @transactional
     def update_invoice(
     self,
     invoice_id: int,
@@ -1568,6 +1856,7 @@ class ClaimFormQueries:
                 values.append(invoice_id)
 
                 cur.execute(query, values)
+                self._claims_changed()
                 result = cur.fetchone()
 
                 if result is None:
@@ -1577,15 +1866,15 @@ class ClaimFormQueries:
                 # if old_payment_date is None and new_payment_date is not None:
                 #     self.close_claim(claimId, user, 'Invoice payment recorded')
 
-                self.conn.commit()
                 return result[0]
 
         except Exception as e:
             print(f"Error updating invoice: {e}")
-            self.conn.rollback()
+            self._rollback()
             return 0    
         
 
+    @transactional
     def update_invoice_datetime(self, invoice_id: int, invoice_datetime):
         try:
             with self.conn.cursor() as cur:
@@ -1598,23 +1887,23 @@ class ClaimFormQueries:
                     """,
                     (invoice_datetime, invoice_id)
                 )
+                self._claims_changed()
 
                 result = cur.fetchone()
 
                 if result is None:
-                    self.conn.rollback()
+                    self._rollback()
                     return 0
 
-                self.conn.commit()
                 return result[0]
 
         except Exception as e:
             print(f"Error updating invoice datetime: {e}")
-            self.conn.rollback()
+            self._rollback()
             return 0
 
 
-    def get_all_invoices(self):
+    def get_all_invoices(self, stream: bool = False):
 
         query = """
            SELECT
@@ -1736,6 +2025,9 @@ ORDER BY i.invoice_datetime DESC;
         """
 
         try:
+            if stream:
+                return self._stream(query)
+
             with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute(query)
                 return cur.fetchall()
@@ -1762,6 +2054,7 @@ ORDER BY i.invoice_datetime DESC;
             return []
         
 
+    @transactional
     def change_user_password(self, username: str, new_password: str) -> bool:
         query = """
             UPDATE users
@@ -1773,15 +2066,15 @@ ORDER BY i.invoice_datetime DESC;
             with self.conn.cursor() as cur:
                 cur.execute(query, (new_password, username))
                 row = cur.fetchone()
-                self.conn.commit()
                 return row is not None
         except Exception as e:
             print(f"Error in change_user_password: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
  
  
  
+    @transactional
     def insert_car(self, model, name, reg_no, attributes=None) -> bool:
         try:
             query = """
@@ -1792,16 +2085,16 @@ ORDER BY i.invoice_datetime DESC;
                 attributes = []
             with self.conn.cursor() as cur:
                 cur.execute(query, (model, name, reg_no, attributes))
-            self.conn.commit()
             return True
         except psycopg2.errors.UniqueViolation:
-            self.conn.rollback()
+            self._rollback()
             raise Exception("Car with this registration number already exists")
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
 
+    @transactional
     def update_car(
         self,
         car_id,
@@ -1847,15 +2140,14 @@ ORDER BY i.invoice_datetime DESC;
 
                 updated = cur.rowcount
 
-            self.conn.commit()
             return updated > 0
 
         except psycopg2.errors.UniqueViolation:
-            self.conn.rollback()
+            self._rollback()
             raise Exception("Car with this registration number already exists")
 
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
     def get_car_by_id(self, car_id: int):
@@ -1962,6 +2254,7 @@ ORDER BY i.invoice_datetime DESC;
             return cur.fetchall()
         
 
+    @transactional
     def sync_last_service_miles(self, car_id: int):
         with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
             # 1. Fetch the car details, its current_miles, and historical miles
@@ -2060,6 +2353,7 @@ ORDER BY i.invoice_datetime DESC;
             return cur.fetchall()
         
          # ---------------------- LONG CLAIMS ----------------------
+    @transactional
     def insert_long_claim(self, starting_date, ending_date, hirer_name=None):
         try:
             query = """
@@ -2070,13 +2364,13 @@ ORDER BY i.invoice_datetime DESC;
             with self.conn.cursor() as cur:
                 cur.execute(query, (starting_date, ending_date, hirer_name))
                 long_claim_id = cur.fetchone()[0]
-                self.conn.commit()
                 self.insert_long_hire_invoice(claim_id=long_claim_id, amount=0 , user_name=None )
             return long_claim_id
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
+    @transactional
     def update_long_claim(self, long_claim_id, starting_date, ending_date, hirer_name=None):
         try:
             query = """
@@ -2088,33 +2382,33 @@ ORDER BY i.invoice_datetime DESC;
             """
             with self.conn.cursor() as cur:
                 cur.execute(query, (starting_date, ending_date, hirer_name, long_claim_id))
-                self.conn.commit()
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
+    @transactional
     def add_car_to_long_claim(self, long_claim_id: str, car_id: int):
         try:
             query = "INSERT INTO long_claim_cars (long_claim_id, car_id) VALUES (%s, %s);"
             with self.conn.cursor() as cur:
                 cur.execute(query, (long_claim_id, car_id))
-                self.conn.commit()
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
+    @transactional
     def remove_car_from_long_claim(self, long_claim_id: str, car_id: int):
         try:
             query = "DELETE FROM long_claim_cars WHERE long_claim_id=%s AND car_id=%s;"
             with self.conn.cursor() as cur:
                 cur.execute(query, (long_claim_id, car_id))
-                self.conn.commit()
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
     # ---------------------- CLAIMANT ----------------------
+    @transactional
     def insert_claimant(
     self,
     long_claim_id,
@@ -2153,12 +2447,11 @@ ORDER BY i.invoice_datetime DESC;
                 )
                 new_id = cur.fetchone()[0]
             print(f"Inserted claimant with ID: {new_id}")
-            self.conn.commit()
             return new_id
 
         except errors.UniqueViolation:
             print('hello')
-            self.conn.rollback()
+            self._rollback()
             raise HTTPException(
                 status_code=400,
                 detail="Claimant ID already exists"
@@ -2166,12 +2459,13 @@ ORDER BY i.invoice_datetime DESC;
 
         except Exception as e:
             print('hwllo')
-            self.conn.rollback()
+            self._rollback()
             raise e
         
         
         
 
+    @transactional
     def update_claimant(self, claimant_id: int, update_data: dict):
         try:
             if not update_data:
@@ -2195,30 +2489,29 @@ ORDER BY i.invoice_datetime DESC;
             with self.conn.cursor() as cur:
                 cur.execute(query, tuple(values))
 
-            self.conn.commit()
             return True
 
         except errors.UniqueViolation:
-            self.conn.rollback()
+            self._rollback()
             raise HTTPException(
                 status_code=400,
                 detail="Claimant ID already exists"
             )
 
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e    
 
 
+    @transactional
     def delete_claimant(self, claimant_id: int):
         try:
             query = "DELETE FROM claimant WHERE id=%s"
             with self.conn.cursor() as cur:
                 cur.execute(query, (claimant_id,))
-            self.conn.commit()
             return cur.rowcount > 0  # True if a row was deleted
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
         
     def get_claimant(self, claimant_id=None, long_claim_id=None, car_id=None):
@@ -2241,8 +2534,11 @@ ORDER BY i.invoice_datetime DESC;
             cur.execute(query, params)
             return cur.fetchall()
 
-    def get_all_claimants(self):
+    def get_all_claimants(self, stream: bool = False):
         query = "SELECT * FROM claimant ORDER BY id DESC"
+        if stream:
+            return self._stream(query)
+
         with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(query)
             return cur.fetchall()
@@ -2336,6 +2632,7 @@ ORDER BY i.invoice_datetime DESC;
         
 
 
+    @transactional
     def mark_invoice(self, long_claim_id: str):
         try:
             query = """
@@ -2346,12 +2643,12 @@ ORDER BY i.invoice_datetime DESC;
             """
             with self.conn.cursor() as cur:
                 cur.execute(query, (long_claim_id,))
-            self.conn.commit()
             return cur.rowcount > 0  # True if a row was updated
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
+    @transactional
     def mark_as_recently_deleted(self, claim_id: str, deleted_by: str):
         query = """
             UPDATE long_claims
@@ -2362,15 +2659,15 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (deleted_by, claim_id))
-            self.conn.commit()
             return cur.rowcount    
+    @transactional
     def delete_long_claim(self, claim_id: str):
         query = "DELETE FROM long_claims WHERE id = %s"
         with self.conn.cursor() as cur:
             cur.execute(query, (claim_id,))
-            self.conn.commit()
             return cur.rowcount > 0  # True if a row was deleted
         
+    @transactional
     def restore_claim(self, claim_id: str):
         query = """
             UPDATE long_claims
@@ -2380,7 +2677,6 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (claim_id,))
-            self.conn.commit()
             return cur.rowcount
         
 
@@ -2403,6 +2699,7 @@ ORDER BY i.invoice_datetime DESC;
             return cur.fetchall()
 
 
+    @transactional
     def upsert_hire_checklist(
     self,
     long_claim_id: str,
@@ -2411,61 +2708,37 @@ ORDER BY i.invoice_datetime DESC;
     data: dict
 ) -> dict | None:
 
-        updatable_columns = [
-            "condition_1", "condition_2", "condition_3", "condition_4", "condition_5",
-            "condition_6", "condition_7", "condition_8", "condition_9", "condition_10",
-            "condition_11", "condition_12", "condition_13", "condition_14", "condition_15",
-            "condition_16", "condition_17", "condition_18", "condition_19", "condition_20",
-            "condition_21", "condition_22", "condition_23", "condition_24", "condition_25",
-            "condition_26", "condition_27", "condition_28", "condition_29", "condition_30",
-            "date", "customer", "detailer", "order_number",
-            "year", "make", "model",
-            "notes", "recommendations",
-            "customer_signature", "detailer_signature",
-            "base_vehicle_image", "annotated_vehicle_image"
-        ]
+        form = form_for(self.conn, "hire_checklist")
 
-        fields_to_update = [col for col in updatable_columns if col in data]
+        data = form.coerce(store_blobs(data, form.blobs))
+        fields_to_update = form.fields_in(data)
 
 
         try:
             with self.conn.cursor() as cur:
 
-                columns = ["long_claim_id", "car_id", "claimant_id"] + fields_to_update
-                values_placeholders = ", ".join(f"%({col})s" for col in columns)
-
-                set_clause = ", ".join(f"{col} = EXCLUDED.{col}" for col in fields_to_update)
-
-                query = f"""
-                INSERT INTO hire_checklist ({', '.join(columns)})
-                VALUES ({values_placeholders})
-                ON CONFLICT (long_claim_id, car_id, claimant_id)
-                DO UPDATE SET
-                {set_clause}
-                RETURNING *;
-                """
+                keys = ("long_claim_id", "car_id", "claimant_id")
+                query = form.upsert_sql((*keys, *fields_to_update), keys, fields_to_update)
 
                 params = {
+                    **data,
                     "long_claim_id": long_claim_id,
                     "car_id": car_id,
                     "claimant_id": claimant_id,
-                    **{col: data[col] for col in fields_to_update}
                 }
 
                 cur.execute(query, params)
                 row = cur.fetchone()
 
                 if not row:
-                    self.conn.commit()
                     return None
 
                 columns_list = [desc[0] for desc in cur.description]
-                self.conn.commit()
 
                 return dict(zip(columns_list, row))
 
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             print("Error in upsert_hire_checklist:", e)
             return None
 
@@ -2473,15 +2746,16 @@ ORDER BY i.invoice_datetime DESC;
     self,
     long_claim_id: str,
     car_id: int,
-    claimant_id: int
+    claimant_id: int,
+    fields: list[str] | None = None
 ) -> list[dict]:
         """
         Get ALL hire checklists matching the given long_claim_id + car_id + claimant_id.
         Returns list of dictionaries (each = one checklist row), ordered by inspection_id.
         Returns empty list if no records found.
         """
-        query = """
-        SELECT * FROM hire_checklist
+        query = f"""
+        SELECT {form_for(self.conn, 'hire_checklist').select_list(fields)} FROM hire_checklist
         WHERE long_claim_id = %s
         AND car_id = %s
         AND claimant_id = %s
@@ -2497,18 +2771,19 @@ ORDER BY i.invoice_datetime DESC;
                     
     
     # Query method in your Queries class
+    @transactional
     def delete_car(self, car_id: str) -> bool:
         try:
             query = "DELETE FROM cars WHERE id = %s"
             with self.conn.cursor() as cur:
                 cur.execute(query, (car_id,))
-            self.conn.commit()
             return cur.rowcount > 0  # Returns True if a row was deleted
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
         
 
+    @transactional
     def close_claim(self, claim_id: str, closed_by: str, reason: str | None) -> bool:
         query = """
             UPDATE claims
@@ -2520,9 +2795,9 @@ ORDER BY i.invoice_datetime DESC;
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (closed_by, reason, claim_id))
+                self._claims_changed()
                 if cur.rowcount == 0:
                     return False
-                self.conn.commit()
             
             # Call the insert_claim_change function with the requested parameters
             current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -2536,10 +2811,11 @@ ORDER BY i.invoice_datetime DESC;
             
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             print("Error closing claim:", e)
             raise
     
+    @transactional
     def reopen_claim(self, claim_id: str) -> bool:
         query = """
             UPDATE claims
@@ -2551,17 +2827,18 @@ ORDER BY i.invoice_datetime DESC;
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (claim_id,))
+                self._claims_changed()
                 if cur.rowcount == 0:
                     return False
-                self.conn.commit()
             return True
         except Exception as e:
             print(f"Error in reopen_claim: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
             
 
 
+    @transactional
     def update_claim_status(self, claim_id: str, status: str) -> bool:
         query = """
             UPDATE claims
@@ -2570,11 +2847,12 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (status, claim_id))
+            self._claims_changed()
             if cur.rowcount == 0:
                 return False  # claim_id not found
-            self.conn.commit()
         return True
     
+    @transactional
     def update_claim_disputed(self, claim_id: str, is_disputed=None, dispute_reason=None) -> bool:
         fields = []
         values = []
@@ -2600,9 +2878,9 @@ ORDER BY i.invoice_datetime DESC;
 
         with self.conn.cursor() as cur:
             cur.execute(query, tuple(values))
+            self._claims_changed()
             if cur.rowcount == 0:
                 return False
-            self.conn.commit()
 
         return True
 
@@ -2633,6 +2911,7 @@ ORDER BY i.invoice_datetime DESC;
                 return None
             (invoice_total,) = row
             return invoice_total
+    @transactional
     def insert_long_hire_invoice(self, claim_id: str, amount: float, user_name: str) -> int:
         check_query = """
             SELECT id FROM long_hire_invoices WHERE claim_id = %s;
@@ -2674,7 +2953,7 @@ ORDER BY i.invoice_datetime DESC;
                     cur.execute(update_claim_query, (claim_id,))
 
                     if cur.rowcount == 0:
-                        self.conn.rollback()
+                        self._rollback()
                         print("Claim ID does not exist in long_claims")
                         return 0
 
@@ -2683,12 +2962,11 @@ ORDER BY i.invoice_datetime DESC;
                     cur.execute(insert_query, (claim_id, amount, user_name))
                     invoice_id = cur.fetchone()[0]
 
-                self.conn.commit()
                 return invoice_id
 
         except Exception as e:
             print(f"Error in upsert: {e}")
-            self.conn.rollback()
+            self._rollback()
             return 0
     def get_all_long_hire_invoices(self) -> List[Dict[str, Any]]:
         query = """
@@ -2714,6 +2992,7 @@ ORDER BY i.invoice_datetime DESC;
             return []
 
 
+    @transactional
     def update_daily_rate(self, long_claim_id: str, car_id: int, daily_rate: float) -> bool:
         query = """
             UPDATE long_claim_cars
@@ -2723,7 +3002,6 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (daily_rate, long_claim_id, car_id))
-            self.conn.commit()
             return cur.rowcount > 0
 
 
@@ -2738,6 +3016,7 @@ ORDER BY i.invoice_datetime DESC;
             cur.execute(query, (long_claim_id,))
             return cur.fetchall()  # returns a list of {car_id, daily_rate}
         
+    @transactional
     def upsert_accident_claim_with_json(
     self, claim_id: str, value_column: str, value: str, json_column: str, json_data: dict | None
 ) -> dict | None:
@@ -2745,6 +3024,7 @@ ORDER BY i.invoice_datetime DESC;
             return None
         if json_column not in ["json_before", "json_after"]:
             return None
+        value = to_ref(value)
 
         with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
             query = f"""
@@ -2758,10 +3038,10 @@ ORDER BY i.invoice_datetime DESC;
             """
             cur.execute(query, (claim_id, value, json_data))
             print(f"Executed upsert_accident_claim_with_json for claim_id={claim_id}, value_column={value_column}, json_column={json_column}")
-            self.conn.commit()
             return cur.fetchone()
         
 
+    @transactional
     def update_is_long_hire(self, car_id: int, value: bool) -> dict | None:
         with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
             query = """
@@ -2771,10 +3051,10 @@ ORDER BY i.invoice_datetime DESC;
                 RETURNING *;
             """
             cur.execute(query, (value, car_id))
-            self.conn.commit()
             return cur.fetchone()
 
 
+    @transactional
     def update_is_available(self, reg_no: str, value: bool) -> dict | None:
         with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
             query = """
@@ -2784,109 +3064,164 @@ ORDER BY i.invoice_datetime DESC;
                 RETURNING *;
             """
             cur.execute(query, (value, reg_no))
-            self.conn.commit()
             return cur.fetchone()
         
-    def get_claim_summary(self, claim_id: str) -> dict | None:
-        summary = {
-            "claim": None,
-            "accident_claim": None,
-            "rental_agreement": None,
-            "storage_form": None,
-            "invoices": []
-        }
+    @transactional
+    def recalculate_availability(self, regs: list) -> dict:
+        """
+        Recompute cars.is_available for all given regs in one statement.
+        A car is unavailable while any rental agreement has it out, either as
+        the main hire vehicle or in change_vehicle_history, without a date in.
+        Returns {reg_no: is_available} for the cars that exist.
+        """
+        regs = [r for r in dict.fromkeys(regs) if r]
+        if not regs:
+            return {}
 
+        query = """
+            WITH hired AS (
+                -- 1. NATIVE COLUMNS: Only check for IS NOT NULL and IS NULL
+                SELECT r.hire_vehicle_reg AS reg_no
+                FROM rental_agreements r
+                WHERE r.hire_vehicle_reg = ANY(%(regs)s)
+                AND r.hire_vehicle_date_out IS NOT NULL
+                AND r.hire_vehicle_date_in IS NULL
+
+                UNION
+
+                -- 2. JSON COLUMNS: Check for NULL, empty strings '', and "null" strings
+                SELECT ch->>'vehicle_reg' AS reg_no
+                FROM rental_agreements r
+                CROSS JOIN LATERAL jsonb_array_elements(r.change_vehicle_history) AS ch
+                WHERE ch->>'vehicle_reg' = ANY(%(regs)s)
+                AND ch->>'date_out' IS NOT NULL
+                AND ch->>'date_out' != ''
+                AND (ch->>'date_in' IS NULL OR ch->>'date_in' = '' OR ch->>'date_in' = 'null')
+            )
+            UPDATE cars c
+            SET is_available = NOT EXISTS (
+                SELECT 1 FROM hired h WHERE h.reg_no = c.reg_no
+            )
+            WHERE c.reg_no = ANY(%(regs)s)
+            RETURNING c.reg_no, c.is_available;
+        """
         with self.conn.cursor() as cur:
-            # 1. Basic claim info
-            cur.execute("""
-                SELECT claim_id, claimant_name, claim_type, claim_start_date, status, 
-                    closed_date, closed_by, recently_deleted , is_disputed, dispute_reason
-                FROM claims 
-                WHERE claim_id = %s;
-            """, (claim_id,))
-            row = cur.fetchone()
-            if not row:
-                return None
-            columns = [desc[0] for desc in cur.description]
-            summary["claim"] = dict(zip(columns, row))
+            cur.execute(query, {"regs": regs})
+            return {row[0]: row[1] for row in cur.fetchall()}
 
-            # 2. Accident claim (driver + vehicle + checklist_vd)
-            cur.execute("""
-                SELECT 
-                    checklist_vd,
-
-                    -- Driver details
-                    driver_full_name,
-                    driver_email,
-                    driver_telephone,
-                    driver_address,
-                    driver_postcode,
-                    driver_dob,
-                    driver_ni_number,
-                    driver_occupation,
-
-                    -- Vehicle details
-                    client_vehicle_make,
-                    client_vehicle_model,
-                    client_registration,
-                    client_policy_no,
-                    client_cover_type,
-                    client_policy_holder
-
-                FROM accident_claims 
-                WHERE claim_id = %s;
-            """, (claim_id,))
-            row = cur.fetchone()
-            if row:
-                columns = [desc[0] for desc in cur.description]
-                summary["accident_claim"] = dict(zip(columns, row))
+    @transactional
+    def refresh_claim_hire_fields(self, claim_ids: list) -> int:
+        """
+        Recompute claims.hire_start_date, hire_end_date and latest_vehicle_reg
+        from the rental agreements of the given claims, in one statement.
+        Claims without an agreement get NULLs. Returns the number of claims updated.
+        """
+        claim_ids = [c for c in dict.fromkeys(claim_ids) if c]
+        if not claim_ids:
+            return 0
 
-            # 3. Rental Agreement (expanded fields)
-            cur.execute("""
-                SELECT 
-                    hire_vehicle_reg,
-                    hire_vehicle_make,
-                    hire_vehicle_model,
-                    hire_vehicle_date_out,
-                    hire_vehicle_date_in,
-                    hire_vehicle_miles_out,
-                    hire_vehicle_miles_in,
-                    change_vehicle_history
-                        
+        query = f"""
+            UPDATE claims c
+            SET (hire_end_date, hire_start_date, latest_vehicle_reg) = (
+                SELECT
+{CLAIM_HIRE_FIELDS}
+                FROM rental_agreements ra
+                WHERE ra.claim_id = c.claim_id
+            )
+            WHERE c.claim_id = ANY(%s);
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, (claim_ids,))
+            self._claims_changed()
+            return cur.rowcount
 
+    def get_claim_summary(self, claim_id: str) -> dict | None:
+        """
+        Claim, accident claim (driver + vehicle + checklist_vd), rental
+        agreement, storage location and invoices as one nested dict, built by
+        a single statement. Cached briefly in claim_summary_cache.
+        """
+        query = """
+        SELECT json_build_object(
+            'claim', (
+                SELECT to_json(x) FROM (
+                    SELECT c.claim_id, c.claimant_name, c.claim_type, c.claim_start_date, c.status,
+                        c.closed_date, c.closed_by, c.recently_deleted, c.is_disputed, c.dispute_reason
+                ) x
+            ),
+
+            'accident_claim', (
+                SELECT to_json(a) FROM (
+                    SELECT
+                        checklist_vd,
+
+                        -- Driver details
+                        driver_full_name,
+                        driver_email,
+                        driver_telephone,
+                        driver_address,
+                        driver_postcode,
+                        driver_dob,
+                        driver_ni_number,
+                        driver_occupation,
+
+                        -- Vehicle details
+                        client_vehicle_make,
+                        client_vehicle_model,
+                        client_registration,
+                        client_policy_no,
+                        client_cover_type,
+                        client_policy_holder
+                    FROM accident_claims
+                    WHERE claim_id = c.claim_id
+                    LIMIT 1
+                ) a
+            ),
 
-                FROM rental_agreements 
-                WHERE claim_id = %s;
-            """, (claim_id,))
-            row = cur.fetchone()
-            if row:
-                columns = [desc[0] for desc in cur.description]
-                summary["rental_agreement"] = dict(zip(columns, row))
+            'rental_agreement', (
+                SELECT to_json(r) FROM (
+                    SELECT
+                        hire_vehicle_reg,
+                        hire_vehicle_make,
+                        hire_vehicle_model,
+                        hire_vehicle_date_out,
+                        hire_vehicle_date_in,
+                        hire_vehicle_miles_out,
+                        hire_vehicle_miles_in,
+                        change_vehicle_history
+                    FROM rental_agreements
+                    WHERE claim_id = c.claim_id
+                    LIMIT 1
+                ) r
+            ),
 
-            # 4. Storage Form
-            cur.execute("""
-                SELECT storage_location_key
-                FROM storage_forms 
-                WHERE claim_id = %s;
-            """, (claim_id,))
-            row = cur.fetchone()
-            if row:
-                summary["storage_form"] = {"storage_location_key": row[0]}
+            'storage_form', (
+                SELECT json_build_object('storage_location_key', storage_location_key)
+                FROM storage_forms
+                WHERE claim_id = c.claim_id
+                LIMIT 1
+            ),
+
+            'invoices', COALESCE((
+                SELECT json_agg(i ORDER BY i.invoice_datetime DESC) FROM (
+                    SELECT id, invoice_datetime, info, storage_bill, rent_bill
+                    FROM invoice
+                    WHERE claim_id = c.claim_id
+                ) i
+            ), '[]')
+        )
+        FROM claims c
+        WHERE c.claim_id = %s;
+        """
 
-            # 5. Invoices
-            cur.execute("""
-                SELECT id, invoice_datetime, info, storage_bill, rent_bill
-                FROM invoice 
-                WHERE claim_id = %s 
-                ORDER BY invoice_datetime DESC;
-            """, (claim_id,))
-            rows = cur.fetchall()
-            if rows:
-                columns = [desc[0] for desc in cur.description]
-                summary["invoices"] = [dict(zip(columns, row)) for row in rows]
+        def load():
+            with self.conn.cursor() as cur:
+                prepared.execute(cur, "get_claim_summary", query, (claim_id,))
+                row = cur.fetchone()
+            return row[0] if row else None
+
+        return claim_summary_cache.get_or_load(claim_id, load)
 
-        return summary  
-    
     def get_claim_lock(self, claim_id: str):
         query = """
             SELECT claim_id, locked_by, lock_expires_at
@@ -2894,7 +3229,7 @@ ORDER BY i.invoice_datetime DESC;
             WHERE claim_id = %s;
         """
         with self.conn.cursor() as cur:
-            cur.execute(query, (claim_id,))
+            prepared.execute(cur, "get_claim_lock", query, (claim_id,))
             row = cur.fetchone()
 
             if not row:
@@ -2907,6 +3242,7 @@ ORDER BY i.invoice_datetime DESC;
             }
  
 
+    @transactional
     def set_claim_lock(self, claim_id: str, locked_by: str, lock_expires_at):
         query = """
             UPDATE claims
@@ -2917,9 +3253,10 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (locked_by, lock_expires_at, claim_id))
+            self._claims_changed()
 
-        self.conn.commit()
 
+    @transactional
     def clear_claim_lock(self, claim_id: str):
         query = """
             UPDATE claims
@@ -2930,10 +3267,11 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (claim_id,))
+            self._claims_changed()
 
-        self.conn.commit()
 
 
+    @transactional
     def insert_fleet_history(
     self,
     hire_start: str,
@@ -2954,9 +3292,9 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (hire_start, hire_end, claim_id, car_reg, miles_in, miles_out))
-        self.conn.commit()
 
 
+    @transactional
     def update_fleet_history_hire_end(
         self,
         hire_end: str,
@@ -2982,18 +3320,20 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (hire_end, miles_in, miles_out, claim_id, car_reg, hire_start))
-        self.conn.commit()
 
 
     
 
 
-    def get_all_fleet_history(self) -> list[dict]:
+    def get_all_fleet_history(self, stream: bool = False) -> list[dict]:
         query = """
             SELECT *
             FROM fleet_history
             ORDER BY hire_start DESC;
         """
+        if stream:
+            return self._stream(query)
+
         with self.conn.cursor() as cur:
             cur.execute(query)
             rows = cur.fetchall()
@@ -3006,6 +3346,7 @@ ORDER BY i.invoice_datetime DESC;
         
 
 
+    @transactional
     def update_ref_no(self, claim_id: str, ref_no: str) -> dict | None:
         with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
             query = """
@@ -3015,12 +3356,13 @@ ORDER BY i.invoice_datetime DESC;
                 RETURNING *;
             """
             cur.execute(query, (ref_no, claim_id))
-            self.conn.commit()
+            self._claims_changed()
             return cur.fetchone()
         
 
             
 
+    @transactional
     def update_payment_details(self, claim_id: str, payment: str | None, pay_date: str | None) -> dict | None:
         with self.conn.cursor() as cur:
             # 1. Get old values
@@ -3056,7 +3398,7 @@ ORDER BY i.invoice_datetime DESC;
                 RETURNING *;
             """
             cur.execute(query, tuple(values))
-            self.conn.commit()
+            self._claims_changed()
 
             row = cur.fetchone()
             if row:
@@ -3070,6 +3412,7 @@ ORDER BY i.invoice_datetime DESC;
 
         return None
 
+    @transactional
     def update_invoice_date(self, claim_id: str, invoice_date: str) -> dict | None:
         query = """
             UPDATE claims
@@ -3079,7 +3422,7 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (invoice_date, claim_id))
-            self.conn.commit()
+            self._claims_changed()
             row = cur.fetchone()
             if row:
                 columns = [desc[0] for desc in cur.description]
@@ -3109,6 +3452,7 @@ ORDER BY i.invoice_datetime DESC;
             print(f"Error in get_user_by_id: {e}")
             return None
 
+    @transactional
     def update_hire_vehicle_dates(self, claim_id: str, date_in: str = None, date_out: str = None, updated_by: str = None) -> dict | None:
         fields = []
         updated_fields_log = []  # List to track the exact field names being updated for the history log
@@ -3145,8 +3489,8 @@ ORDER BY i.invoice_datetime DESC;
                 cur.execute(query, params)
                 row = cur.fetchone()
                 if row:
-                    self.conn.commit()
-                    self.refresh_rental_agreements_view()
+                    self.refresh_claim_hire_fields([claim_id])
+                    on_commit(self.conn, self.refresh_rental_agreements_view)
                     
                     # Log the changes
                     if updated_by:
@@ -3164,21 +3508,22 @@ ORDER BY i.invoice_datetime DESC;
             return None
         except Exception as e:
             print(f"Error updating hire vehicle dates: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
 
 
+    @transactional
     def refresh_rental_agreements_view(self):
         try:
             with self.conn.cursor() as cur:
                 cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY rental_agreements_mv;")
-            self.conn.commit()
         except Exception as e:
             print(f"Error refreshing materialized view: {e}")
-            self.conn.rollback()
+            self._rollback()
 
 
 
+    @transactional
     def add_update(self, claim_id: str, new_update: dict, user_id: int) -> bool:
         query = """
             UPDATE claims
@@ -3187,7 +3532,7 @@ ORDER BY i.invoice_datetime DESC;
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (json.dumps([new_update]), claim_id))
-            self.conn.commit()
+            self._claims_changed()
 
             # 👉 extract message safely
             message = new_update.get("message", "New update added")
@@ -3201,6 +3546,7 @@ ORDER BY i.invoice_datetime DESC;
             return cur.rowcount > 0
         
 
+    @transactional
     def edit_update(self, claim_id: str, update_id: int, new_data: dict) -> bool:
         select_query = "SELECT updates FROM claims WHERE claim_id = %s;"
         update_query = "UPDATE claims SET updates = %s WHERE claim_id = %s;"
@@ -3225,7 +3571,7 @@ ORDER BY i.invoice_datetime DESC;
                 return False
 
             cur.execute(update_query, (json.dumps(updates), claim_id))
-            self.conn.commit()
+            self._claims_changed()
             return True
         
     def get_updates(self, claim_id: str) -> list[dict]:
@@ -3242,6 +3588,7 @@ ORDER BY i.invoice_datetime DESC;
         
 
 
+    @transactional
     def broadcast_notification(self, sender_id: int, title: str, message: str) -> bool:
         try:
             # 1. Insert the notification and record WHO created it
@@ -3263,10 +3610,9 @@ ORDER BY i.invoice_datetime DESC;
             with self.conn.cursor() as cur:
                 cur.execute(mapping_query, (notification_id, sender_id))
                 
-            self.conn.commit()
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
         
     def get_user_notifications(self, user_id: int, unread_only: bool = False):
@@ -3298,9 +3644,10 @@ ORDER BY i.invoice_datetime DESC;
                 return cur.fetchall()
 
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             print("get_user_notifications ERROR:", e)
             raise e
+    @transactional
     def mark_single_as_read(self, notification_id: int, user_id: int) -> bool:
         try:
             query = """
@@ -3310,12 +3657,12 @@ ORDER BY i.invoice_datetime DESC;
             """
             with self.conn.cursor() as cur:
                 cur.execute(query, (notification_id, user_id))
-            self.conn.commit()
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
+    @transactional
     def mark_all_as_read(self, user_id: int) -> bool:
         try:
             query = """
@@ -3325,12 +3672,12 @@ ORDER BY i.invoice_datetime DESC;
             """
             with self.conn.cursor() as cur:
                 cur.execute(query, (user_id,))
-            self.conn.commit()
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
+    @transactional
     def delete_expired_notifications(self) -> int:
         try:
             # CASCADE will automatically delete the linked user_notifications rows
@@ -3341,13 +3688,13 @@ ORDER BY i.invoice_datetime DESC;
             with self.conn.cursor() as cur:
                 cur.execute(query)
                 deleted_count = cur.rowcount
-            self.conn.commit()
             return deleted_count
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
         
 
+    @transactional
     def clear_all_notifications(self, user_id: int) -> bool:
         try:
             query = """
@@ -3357,10 +3704,9 @@ ORDER BY i.invoice_datetime DESC;
             """
             with self.conn.cursor() as cur:
                 cur.execute(query, (user_id,))
-            self.conn.commit()
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
     def get_claim_changes_history(self, claim_id: str) -> list[dict]:
@@ -3376,6 +3722,7 @@ ORDER BY i.invoice_datetime DESC;
             columns = [desc[0] for desc in cur.description]
             return [dict(zip(columns, row)) for row in rows]
             
+    @transactional
     def insert_claim_change(
         self,
         claim_id: str,
@@ -3391,13 +3738,13 @@ ORDER BY i.invoice_datetime DESC;
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (claim_id, user_name, date, form, fields))
-            self.conn.commit()
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             print("Error inserting claim change:", e)
             raise
     
 
+    @transactional
     def update_payment_date(self, claim_id: str, payment_date: str) -> bool:
         query = """
             UPDATE long_hire_invoices
@@ -3408,12 +3755,11 @@ ORDER BY i.invoice_datetime DESC;
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (payment_date, claim_id))
-                self.conn.commit()
                 return cur.rowcount > 0
 
         except Exception as e:
             print(f"Error updating payment_date: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
         
 
@@ -3492,6 +3838,7 @@ ORDER BY i.invoice_datetime DESC;
         return due_cars
 
 
+    @transactional
     def update_mot_doc(self, car_id: int, mot_doc: str) -> bool:
         query = """
             UPDATE cars
@@ -3502,16 +3849,16 @@ ORDER BY i.invoice_datetime DESC;
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (mot_doc, car_id))
-                self.conn.commit()
                 return cur.rowcount > 0
 
         except Exception as e:
             print(f"Error updating mot_doc: {e}")
-            self.conn.rollback()
+            self._rollback()
             return False
 
 
 
+    @transactional
     def create_blank_offer(self, claim_id: str) -> bool:
         query = """
             INSERT INTO offer (claim_id)
@@ -3522,10 +3869,9 @@ ORDER BY i.invoice_datetime DESC;
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, (claim_id,))
-                self.conn.commit()
                 return cur.rowcount > 0
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             print(f"Error creating offer: {e}")
             return False
 
@@ -3553,6 +3899,7 @@ ORDER BY i.invoice_datetime DESC;
     # =========================
     # OFFER - UPDATE (ANY FIELD)
     # =========================
+    @transactional
     def update_offer(self, claim_id: str, data: dict) -> bool:
         if not data:
             return False
@@ -3575,10 +3922,9 @@ ORDER BY i.invoice_datetime DESC;
         try:
             with self.conn.cursor() as cur:
                 cur.execute(query, values)
-                self.conn.commit()
                 return cur.rowcount > 0
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             print(f"Error updating offer: {e}")
             return False
 
@@ -3586,22 +3932,86 @@ ORDER BY i.invoice_datetime DESC;
     # =========================
     # CLAIM SEARCH (FOR DROPDOWN)
     # =========================
-    def get_claim_search_list(self) -> list[dict]:
-        query = """
-            SELECT 
-                claim_id,
-                claimant_name,
-                claim_type
-            FROM claims
-            ORDER BY claim_id DESC;
-        """
+    def search_claims(self, q: str, limit: int = 10) -> list[dict]:
+        """
+        Top `limit` live claims matching `q` by prefix or fuzzily on claim_id,
+        claimant_name, ref_no or vehicle registration (the latest hire
+        vehicle or the client's own). Each branch of the candidate query is
+        served by a trigram index (migration 005); only the candidates are
+        ranked.
+        """
+        reg = q.replace(" ", "").upper()
+        params = {
+            "q": q,
+            "exact": _like_escape(q),
+            "prefix": _like_escape(q) + "%",
+            "contains": "%" + _like_escape(q) + "%",
+            "reg": reg,
+            "reg_prefix": _like_escape(reg) + "%",
+            "limit": limit,
+        }
+        hire_reg = _normalise_reg("c.latest_vehicle_reg")
+        client_reg = _normalise_reg("a.client_registration")
 
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query)
-            return cur.fetchall()
-        
+        query = f"""
+            WITH candidates AS (
+                SELECT claim_id FROM claims
+                WHERE recently_deleted = FALSE
+                AND (claim_id ILIKE %(prefix)s OR claim_id %% %(q)s)
+
+                UNION
+
+                SELECT claim_id FROM claims
+                WHERE recently_deleted = FALSE
+                AND (claimant_name ILIKE %(contains)s OR %(q)s <%% claimant_name)
+
+                UNION
+
+                SELECT claim_id FROM claims
+                WHERE recently_deleted = FALSE
+                AND (ref_no ILIKE %(prefix)s OR ref_no %% %(q)s)
+
+                UNION
+
+                SELECT claim_id FROM claims
+                WHERE recently_deleted = FALSE
+                AND ({_normalise_reg("latest_vehicle_reg")} LIKE %(reg_prefix)s
+                     OR {_normalise_reg("latest_vehicle_reg")} %% %(reg)s)
+
+                UNION
+
+                SELECT claim_id FROM accident_claims
+                WHERE {_normalise_reg("client_registration")} LIKE %(reg_prefix)s
+                   OR {_normalise_reg("client_registration")} %% %(reg)s
+            )
+            SELECT
+                c.claim_id,
+                c.claimant_name,
+                c.claim_type,
+                c.ref_no,
+                c.latest_vehicle_reg,
+                a.client_registration,
+                GREATEST(
+                    {_match_score("c.claim_id", "similarity(c.claim_id, %(q)s)")},
+                    {_match_score("c.ref_no", "similarity(c.ref_no, %(q)s)")},
+                    {_match_score("c.claimant_name", "word_similarity(%(q)s, c.claimant_name)", contains=True)},
+                    {_reg_score(hire_reg)},
+                    {_reg_score(client_reg)}
+                ) AS score
+            FROM candidates
+            JOIN claims c ON c.claim_id = candidates.claim_id
+            LEFT JOIN accident_claims a ON a.claim_id = c.claim_id
+            WHERE c.recently_deleted = FALSE
+            ORDER BY score DESC, c.claim_id DESC
+            LIMIT %(limit)s;
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            columns = [desc[0] for desc in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
 
 
+    @transactional
     def create_offer(
     self,
     claim_id: str,
@@ -3633,10 +4043,9 @@ ORDER BY i.invoice_datetime DESC;
                     )
                 )
 
-                self.conn.commit()
                 return cur.rowcount > 0
 
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             print(f"Error creating offer: {e}")
             return False
\ No newline at end of file
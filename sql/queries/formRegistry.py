@@ -0,0 +1,486 @@
+"""
+Form metadata registry: one entry per form table (accident claims, rental
+agreements, storage forms, ...) holding what the queries and routes need to
+know about its columns.
+
+Declared here (and used as is when the schema cannot be read):
+  keys       columns that identify a row; always selected
+  writable   columns an upsert may set, in the order changes are logged
+  readable   extra columns a GET may be narrowed to with ?fields=
+  blobs      signature/image columns kept in the blob store (utils/blobs.py)
+  views      response shapes, e.g. "read" for GET and "saved" for the POST
+             that returns the saved row
+
+form_for(conn, table) returns a table's Form. The first call in a process
+reflects every form table's columns, types and defaults from information_schema, on
+the caller's connection, so a cold start makes no extra round trip and an
+unreachable database never stops the app from starting. Declared columns a
+table does not have are dropped (and logged), so a save never names a
+column that a migration has not added yet.
+
+Per request nothing is rebuilt:
+  form.fields_in(data)             writable columns present in a payload
+  form.coerce(data)                "" as NULL for nullable non-text columns
+  form.update_sql(fields, key)     UPDATE ... RETURNING *, cached per field-set
+  form.insert_sql(columns)         INSERT ... RETURNING *, cached per column-set
+  form.select_list(fields)         SELECT list for ?fields=, cached per field-set
+  form.views["read"](row, fields)  response dict for a row
+"""
+
+import os
+import time
+import threading
+import psycopg2
+from dataclasses import dataclass
+from psycopg2.pool import PoolError
+from db.connection import DBConnection
+from utils.cache import TTLCache
+
+# Generated statements never go stale; the cache only bounds their number.
+form_sql_cache = TTLCache(
+    "form_sql",
+    ttl=float("inf"),
+    maxsize=int(os.getenv("FORM_SQL_CACHE_MAX_ENTRIES", "1024")),
+)
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    type: str              # information_schema data_type
+    nullable: bool
+    default: str | None    # column_default: the SQL expression, e.g. "now()" or "'open'::text"
+
+
+# Types for which "" is a value. For the rest (dates, times, amounts, flags)
+# the forms send "" for "not filled in", which Postgres would reject.
+_TEXT_TYPES = frozenset(("text", "character varying", "character", "json", "jsonb", "USER-DEFINED"))
+
+
+class View:
+    """
+    A response shape: (response key, column, value when the table has no
+    such column) per entry, in response order.
+    """
+
+    def __init__(self, entries):
+        self.entries = tuple(entries)
+        self.keys = tuple(entry[0] for entry in self.entries)
+        self.columns = tuple(entry[1] for entry in self.entries)
+        self.defaults = tuple(entry[2] for entry in self.entries)
+
+    def __call__(self, row: dict, fields: list[str] | None = None) -> dict:
+        if fields is None:
+            return dict(zip(self.keys, map(row.get, self.columns, self.defaults)))
+        # ?fields= read: only the keys whose column was selected
+        return {key: row[column] for key, column in zip(self.keys, self.columns) if column in row}
+
+    def without(self, *keys: str) -> "View":
+        return View(entry for entry in self.entries if entry[0] not in keys)
+
+
+class Form:
+    def __init__(
+        self,
+        table: str,
+        keys: tuple,
+        writable: tuple,
+        readable: tuple = (),
+        blobs: tuple = (),
+        defaults: dict | None = None,
+        renames: dict | None = None,
+    ):
+        self.table = table
+        self.keys = keys
+        self.blobs = blobs
+        self._declared = (writable, readable)
+        # Response value for a column the row lacks: "" unless set here.
+        self._defaults = {**dict.fromkeys((*keys, *blobs)), **(defaults or {})}
+        self._renames = renames or {}      # response key -> column
+        self.columns: dict[str, Column] = {}
+        self.views: dict[str, View] = {}
+        self._apply(writable, readable)
+
+    def _apply(self, writable: tuple, readable: tuple):
+        self.writable = writable
+        self.readable = frozenset((*writable, *readable))
+        # Only known once reflected; declared columns are written as sent.
+        self.blank_as_null = tuple(
+            column for column in writable
+            if column in self.columns
+            and self.columns[column].nullable
+            and self.columns[column].type not in _TEXT_TYPES
+        )
+
+    def view(self, *keys: str) -> View:
+        """A View over response `keys`, each read from its column (or its rename's)."""
+        entries = []
+        for key in keys:
+            column = self._renames.get(key, key)
+            entries.append((key, column, self._defaults.get(column, "")))
+        return View(entries)
+
+    def reflect(self, columns: dict[str, Column]):
+        """Use the table's actual columns; declared ones it lacks are dropped."""
+        writable, readable = self._declared
+        missing = [column for column in (*writable, *readable) if column not in columns]
+        if missing:
+            print(f"[FORMS] {self.table} has no column(s) {', '.join(missing)}; ignoring them")
+        self.columns = columns
+        self._apply(
+            tuple(column for column in writable if column in columns),
+            tuple(column for column in readable if column in columns),
+        )
+
+    # ----- PER REQUEST -----
+
+    def fields_in(self, data: dict) -> tuple:
+        """The writable columns present in `data`, in declared order."""
+        return tuple(column for column in self.writable if column in data)
+
+    def coerce(self, data: dict) -> dict:
+        """`data`, with "" as NULL for the nullable non-text columns it sets."""
+        blank = [column for column in self.blank_as_null if data.get(column) == ""]
+        if not blank:
+            return data
+        return {**data, **dict.fromkeys(blank)}
+
+    def select_list(self, fields: list[str] | None) -> str:
+        """
+        SELECT list for a form read: every column when `fields` is None,
+        otherwise the key columns plus `fields`. Raises ValueError for a field
+        the form does not allow.
+        """
+        if fields is None:
+            return "*"
+        fields = tuple(fields)
+
+        def build():
+            unknown = [field for field in fields if field not in self.readable and field not in self.keys]
+            if unknown:
+                raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+            return ", ".join(dict.fromkeys((*self.keys, *fields)))
+
+        return form_sql_cache.get_or_load((self.table, "select", fields), build)
+
+    def update_sql(self, fields: tuple, key: str) -> str:
+        return form_sql_cache.get_or_load((self.table, "update", key, fields), lambda: f"""
+            UPDATE {self.table}
+            SET {', '.join(f'{col} = %({col})s' for col in fields)}
+            WHERE {key} = %({key})s
+            RETURNING *;
+        """)
+
+    def insert_sql(self, columns: tuple) -> str:
+        return form_sql_cache.get_or_load((self.table, "insert", columns), lambda: f"""
+            INSERT INTO {self.table} ({', '.join(columns)})
+            VALUES ({', '.join(f'%({col})s' for col in columns)})
+            RETURNING *;
+        """)
+
+    def upsert_sql(self, columns: tuple, conflict: tuple, fields: tuple) -> str:
+        """INSERT `columns`, or on a `conflict` key clash set `fields` from it."""
+        return form_sql_cache.get_or_load((self.table, "upsert", columns, conflict, fields), lambda: f"""
+            INSERT INTO {self.table} ({', '.join(columns)})
+            VALUES ({', '.join(f'%({col})s' for col in columns)})
+            ON CONFLICT ({', '.join(conflict)})
+            DO UPDATE SET
+            {', '.join(f'{col} = EXCLUDED.{col}' for col in fields)}
+            RETURNING *;
+        """)
+
+
+# ----- DECLARATIONS -----
+
+_CONDITIONS = tuple(f"condition_{i}" for i in range(1, 31))
+_INSPECTION_DETAILS = (
+    "date", "customer", "detailer", "order_number",
+    "year", "make", "model",
+    "notes", "recommendations",
+)
+_INSPECTION_BLOBS = (
+    "customer_signature", "detailer_signature",
+    "base_vehicle_image", "annotated_vehicle_image",
+)
+_INSPECTION_COLUMNS = (*_CONDITIONS, *_INSPECTION_DETAILS, *_INSPECTION_BLOBS)
+
+_CHECKLIST = (
+    "checklist_vd", "checklist_pi", "checklist_dvla", "checklist_badge", "checklist_recovery",
+    "checklist_hire", "checklist_ni_no", "checklist_storage", "checklist_plate",
+    "checklist_licence", "checklist_logbook",
+)
+
+_ACCIDENT_CLAIM_COLUMNS = (
+    *_CHECKLIST,
+    "date_of_claim", "accident_date", "accident_time", "accident_location", "accident_description",
+    "owner_full_name", "owner_email", "owner_telephone", "owner_address",
+    "owner_postcode", "owner_dob", "owner_ni_number", "owner_occupation",
+    "driver_full_name", "driver_email", "driver_telephone", "driver_address",
+    "driver_postcode", "driver_dob", "driver_ni_number", "driver_occupation",
+    "client_vehicle_make", "client_vehicle_model", "client_registration",
+    "client_policy_no", "client_cover_type", "client_policy_holder",
+    "third_party_name", "third_party_email", "third_party_telephone",
+    "third_party_address", "third_party_postcode", "third_party_dob",
+    "third_party_ni_number", "third_party_occupation",
+    "third_party_vehicle_make", "third_party_vehicle_model",
+    "third_party_registration", "third_party_policy_no", "third_party_policy_holder",
+    "fault_opinion", "fault_reason", "road_conditions", "weather_conditions",
+    "witness1_name", "witness1_address", "witness1_postcode", "witness1_telephone",
+    "witness2_name", "witness2_address", "witness2_postcode", "witness2_telephone",
+    "loss_of_earnings", "employer_details",
+    "print_name", "declaration_date", "client_signature",
+    "circumstance_drawing", "direction_before_drawing", "direction_after_drawing",
+)
+
+_STORAGE_AMOUNTS = (
+    "number_of_days", "charges_per_day", "total_storage_charge",
+    "recovery_charge", "subtotal", "vat_amount", "invoice_total",
+)
+
+_STORAGE_COLUMNS = (
+    "name", "postcode", "address1", "address2",
+    "vehicle_make", "vehicle_model", "registration_number",
+    "date_of_recovery", "storage_start_date", "storage_end_date",
+    *_STORAGE_AMOUNTS,
+    "client_date", "owner_date", "client_signature", "owner_signature",
+)
+
+_RENTAL_AMOUNTS = (
+    "daily_rate", "policy_excess", "deposit", "refuelling_charge",
+    "admin_fee", "delivery_charge", "cdw_per_day",
+    "days_out", "days_in", "total_days",
+    "rate_per_day", "refuelling_total",
+    "subtotal", "vat", "total_cost",
+)
+
+_RENTAL_NEW_LICENCE = (
+    "new_licence_no", "new_date_issued", "new_expiry_date",
+    "new_dob", "new_date_test_passed", "new_occupation",
+)
+
+_RENTAL_HIRE_VEHICLE = (
+    "hire_vehicle_reg", "hire_vehicle_make", "hire_vehicle_model", "hire_vehicle_group",
+    "hire_vehicle_date_out", "hire_vehicle_date_in",
+    "hire_vehicle_fuel_out", "hire_vehicle_fuel_in",
+)
+
+_RENTAL_CHANGE_VEHICLE = (
+    "change_vehicle_reg", "change_vehicle_make", "change_vehicle_model", "change_vehicle_group",
+    "change_vehicle_date_out", "change_vehicle_date_in",
+    "change_vehicle_fuel_out", "change_vehicle_fuel_in",
+)
+
+_RENTAL_SIGNATURES = (
+    "hirer_signature_terms", "company_signature",
+    "hirer_signature_insurance", "declaration_signature", "liability_signature",
+)
+
+FORMS = {
+    "accident_claims": Form(
+        "accident_claims",
+        keys=("claim_id",),
+        writable=_ACCIDENT_CLAIM_COLUMNS,
+        readable=("user_name", "json_before", "json_after"),
+        blobs=(
+            "client_signature", "circumstance_drawing",
+            "direction_before_drawing", "direction_after_drawing",
+        ),
+        defaults=dict.fromkeys((*_CHECKLIST, "loss_of_earnings", "json_before", "json_after")),
+        renames={"checklist_v.d": "checklist_vd"},
+    ),
+    "pre_inspection_forms": Form(
+        "pre_inspection_forms",
+        keys=("claim_id", "inspection_id"),
+        writable=_INSPECTION_COLUMNS,
+        readable=("user_name",),
+        blobs=_INSPECTION_BLOBS,
+    ),
+    "cancellation_forms": Form(
+        "cancellation_forms",
+        keys=("claim_id",),
+        writable=("name", "address", "postcode", "email", "cancellation_date", "cancellation_signature"),
+        readable=("user_name",),
+        blobs=("cancellation_signature",),
+    ),
+    "storage_forms": Form(
+        "storage_forms",
+        keys=("claim_id",),
+        writable=(*_STORAGE_COLUMNS, "storage_location_key"),
+        readable=("user_name",),
+        blobs=("client_signature", "owner_signature"),
+        defaults=dict.fromkeys(_STORAGE_AMOUNTS),
+    ),
+    "rental_agreements": Form(
+        "rental_agreements",
+        keys=("claim_id", "rental_agreement_id"),
+        writable=(
+            "hirer_name", "title", "permanent_address",
+            "additional_driver_name", "licence_no",
+            "new_date_issued", "new_expiry_date", "new_dob", "new_date_test_passed", "new_occupation", "new_licence_no",
+            "date_issued", "expiry_date", "dob", "date_test_passed", "occupation",
+            "daily_rate", "policy_excess", "deposit", "refuelling_charge",
+            "insurance_company", "policy_no", "insurance_dates",
+            "own_insurance_confirm", "insurance_date", "insurance_time",
+            "motoring_offence_3yrs", "disqualified_5yrs", "accident_3yrs",
+            "insurance_declined_5yrs", "dishonesty_conviction",
+            "medical_condition1", "medical_condition2", "medical_details",
+            "additional_driver_auth",
+            *_RENTAL_HIRE_VEHICLE, "hire_vehicle_rate_per_day",
+            *_RENTAL_CHANGE_VEHICLE,
+            "admin_fee", "delivery_charge", "cdw_per_day",
+            "days_out", "days_in", "total_days",
+            "rate_per_day", "refuelling_total",
+            "subtotal", "vat", "total_cost",
+            "declaration_date", "liability_date",
+            *_RENTAL_SIGNATURES,
+            "change_vehicle_history", "hire_vehicle_miles_out", "hire_vehicle_miles_in",
+        ),
+        readable=("user_name",),
+        blobs=_RENTAL_SIGNATURES,
+        defaults={**dict.fromkeys(_RENTAL_AMOUNTS), "own_insurance_confirm": "No"},
+    ),
+    "hire_checklist": Form(
+        "hire_checklist",
+        keys=("long_claim_id", "car_id", "claimant_id", "inspection_id"),
+        writable=_INSPECTION_COLUMNS,
+        blobs=_INSPECTION_BLOBS,
+    ),
+}
+
+# Columns holding signatures, drawings and images. Saves move large values to
+# the blob store (utils/blobs.py) and keep a reference in the row.
+BLOB_COLUMNS = {table: form.blobs for table, form in FORMS.items()}
+
+# ----- VIEWS -----
+
+_accident = FORMS["accident_claims"]
+_accident.views["read"] = _accident.view(
+    "user_name", "claim_id", "checklist_v.d", *_ACCIDENT_CLAIM_COLUMNS[1:], "json_before", "json_after",
+)
+_accident.views["saved"] = _accident.views["read"].without(
+    "user_name", "checklist_pi", "accident_description", "json_before", "json_after",
+)
+
+_inspection = FORMS["pre_inspection_forms"]
+_inspection.views["read"] = _inspection.view(
+    *_CONDITIONS, "user_name", *_INSPECTION_DETAILS, *_INSPECTION_BLOBS, "claim_id", "inspection_id",
+)
+_inspection.views["saved"] = _inspection.views["read"].without("user_name")
+
+_cancellation = FORMS["cancellation_forms"]
+_cancellation.views["read"] = _cancellation.view("user_name", *_cancellation.writable, "claim_id")
+_cancellation.views["saved"] = _cancellation.views["read"].without("user_name")
+
+_storage = FORMS["storage_forms"]
+_storage.views["read"] = _storage.view("user_name", *_STORAGE_COLUMNS, "claim_id", "storage_location_key")
+_storage.views["saved"] = _storage.views["read"].without("user_name")
+
+_rental = FORMS["rental_agreements"]
+_rental.views["read"] = _rental.view(
+    "user_name", "rental_agreement_id", "claim_id",
+    "hirer_name", "title", "permanent_address", "additional_driver_name", "licence_no",
+    "date_issued", "expiry_date", "dob", "date_test_passed", "occupation",
+    "daily_rate", "policy_excess", "deposit", "refuelling_charge",
+    "insurance_company", "policy_no", "insurance_dates",
+    "own_insurance_confirm", "insurance_date", "insurance_time",
+    *_RENTAL_NEW_LICENCE,
+    "motoring_offence_3yrs", "disqualified_5yrs", "accident_3yrs",
+    "insurance_declined_5yrs", "dishonesty_conviction",
+    "medical_condition1", "medical_condition2", "medical_details",
+    "additional_driver_auth",
+    *_RENTAL_HIRE_VEHICLE, "hire_vehicle_rate_per_day",
+    *_RENTAL_CHANGE_VEHICLE,
+    "admin_fee", "delivery_charge", "cdw_per_day",
+    "days_out", "days_in", "total_days",
+    "rate_per_day", "refuelling_total",
+    "subtotal", "vat", "total_cost",
+    "declaration_date", "liability_date",
+    *_RENTAL_SIGNATURES,
+    "change_vehicle_history", "hire_vehicle_miles_out", "hire_vehicle_miles_in",
+)
+_rental.views["saved"] = _rental.views["read"].without(
+    "user_name", *_RENTAL_NEW_LICENCE, "hire_vehicle_rate_per_day",
+    "change_vehicle_history", "hire_vehicle_miles_out", "hire_vehicle_miles_in",
+)
+
+_checklist = FORMS["hire_checklist"]
+_checklist.views["read"] = _checklist.view(
+    *_INSPECTION_COLUMNS, "long_claim_id", "car_id", "claimant_id", "inspection_id",
+)
+_checklist.views["saved"] = _checklist.view(
+    "inspection_id", "long_claim_id", "car_id", "claimant_id", *_INSPECTION_COLUMNS,
+)
+
+# ----- REFLECTION -----
+
+# After a failed reflection, the declarations are used until this many seconds
+# have passed; then the next form_for() tries again.
+REFLECT_RETRY_SECONDS = float(os.getenv("FORM_REFLECT_RETRY_SECONDS", "60"))
+
+_reflect_lock = threading.Lock()
+_reflected = False
+_retry_at = 0.0
+
+
+def _read_columns(conn) -> dict[str, dict[str, Column]]:
+    """Columns of every form table found, read inside a savepoint so a failure
+    leaves the caller's transaction usable."""
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT reflect_forms")
+        try:
+            cur.execute("""
+                SELECT table_name, column_name, data_type, is_nullable = 'YES', column_default
+                FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = ANY(%s)
+                ORDER BY table_name, ordinal_position;
+            """, (list(FORMS),))
+            rows = cur.fetchall()
+        except psycopg2.Error:
+            cur.execute("ROLLBACK TO SAVEPOINT reflect_forms")
+            raise
+        cur.execute("RELEASE SAVEPOINT reflect_forms")
+
+    tables = {}
+    for table, name, data_type, nullable, default in rows:
+        tables.setdefault(table, {})[name] = Column(name, data_type, nullable, default)
+    return tables
+
+
+def reflect_forms(conn=None) -> int:
+    """
+    Load every form table's columns from information_schema into FORMS, on
+    `conn` (or a pooled connection of its own). Returns the number of tables
+    found. Missing tables, or a database that cannot be reached, leave the
+    declarations in use.
+    """
+    global _reflected, _retry_at
+    try:
+        if conn is not None:
+            tables = _read_columns(conn)
+        else:
+            with DBConnection.connection() as own:
+                tables = _read_columns(own)
+                own.rollback()
+    except (psycopg2.Error, PoolError, RuntimeError) as e:
+        # RuntimeError: DATABASE_URL unset or the connection could not be opened
+        print(f"[FORMS] Could not read form columns, using declared columns: {e}")
+        _retry_at = time.monotonic() + REFLECT_RETRY_SECONDS
+        return 0
+
+    for table, form in FORMS.items():
+        if table in tables:
+            form.reflect(tables[table])
+        else:
+            print(f"[FORMS] Table {table} not found; using declared columns")
+    form_sql_cache.invalidate()
+    _reflected = True
+    return len(tables)
+
+
+def form_for(conn, table: str) -> Form:
+    """FORMS[table], reflecting the form tables on `conn` first if not done yet."""
+    if not _reflected and time.monotonic() >= _retry_at:
+        with _reflect_lock:
+            if not _reflected and time.monotonic() >= _retry_at:
+                reflect_forms(conn)
+    return FORMS[table]
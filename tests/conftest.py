@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Import the app's packages (db, sql, utils, api) as main.py does.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
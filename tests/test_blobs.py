@@ -0,0 +1,93 @@
+import hashlib
+
+import pytest
+
+from utils import blobs
+from utils.blobs import FileBlobBackend, expand, expand_blobs, parse_ref, store_blobs, to_ref
+
+IMAGE = "data:image/png;base64," + "iVBORw0KGgo" * 200
+DIGEST = hashlib.sha256(IMAGE.encode()).hexdigest()
+REF = f"blob:sha256:{DIGEST}:{len(IMAGE)}"
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    backend = FileBlobBackend(tmp_path / "blob_store")
+    assert backend.check_writable()
+    monkeypatch.setattr(blobs, "backend", backend)
+    return backend
+
+
+# ----- REFERENCES -----
+
+def test_parse_ref():
+    assert parse_ref(REF) == (DIGEST, len(IMAGE))
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    42,
+    "",
+    IMAGE,
+    f"blob:sha256:{DIGEST}",                   # no size
+    f"blob:sha256:{DIGEST[:-1]}:10",           # short digest
+    f"blob:sha256:{DIGEST.upper()}:10",
+    f"blob:sha256:{DIGEST}:10 ",
+    f"blob:md5:{DIGEST}:10",
+])
+def test_parse_ref_rejects_anything_else(value):
+    assert parse_ref(value) is None
+
+
+def test_to_ref_stores_large_strings(store):
+    assert to_ref(IMAGE) == REF
+    assert store.get(DIGEST) == IMAGE.encode()
+
+
+def test_to_ref_is_idempotent(store):
+    assert to_ref(to_ref(IMAGE)) == REF
+    assert [digest for digest, _, _ in store.scan()] == [DIGEST]
+
+
+@pytest.mark.parametrize("value", [None, "", "short signature", 12.5, {"x": IMAGE}])
+def test_to_ref_keeps_small_and_non_string_values(value, store):
+    assert to_ref(value) == value
+    assert list(store.scan()) == []
+
+
+def test_to_ref_keeps_values_inline_when_the_store_is_not_writable(tmp_path, monkeypatch):
+    (tmp_path / "file").write_text("")
+    backend = FileBlobBackend(tmp_path / "file" / "blob_store")   # parent is a file
+    assert not backend.check_writable()
+    monkeypatch.setattr(blobs, "backend", backend)
+    assert to_ref(IMAGE) == IMAGE
+
+
+# ----- ROWS -----
+
+def test_store_blobs_moves_only_the_given_columns():
+    data = {"claim_id": "C1", "client_signature": IMAGE, "notes": IMAGE}
+    stored = store_blobs(data, ("client_signature", "circumstance_drawing"))
+    assert stored == {"claim_id": "C1", "client_signature": REF, "notes": IMAGE}
+    assert data["client_signature"] == IMAGE   # the caller's dict is not changed
+
+
+def test_store_blobs_returns_the_same_dict_without_blob_columns():
+    data = {"claim_id": "C1"}
+    assert store_blobs(data, ("client_signature",)) is data
+
+
+def test_expand_round_trip():
+    assert expand(to_ref(IMAGE)) == IMAGE
+    assert expand("plain text") == "plain text"
+
+
+def test_expand_missing_blob_is_none():
+    assert expand(REF) is None
+
+
+def test_expand_blobs_nested():
+    ref = to_ref(IMAGE)
+    row = {"claim_id": "C1", "images": [ref, {"drawing": ref}], "n": 3}
+    assert expand_blobs(row) == {"claim_id": "C1", "images": [IMAGE, {"drawing": IMAGE}], "n": 3}
+    assert expand_blobs([row, None]) == [expand_blobs(row), None]
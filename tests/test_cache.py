@@ -0,0 +1,27 @@
+from utils.cache import TTLCache
+
+
+def test_version_is_stable_while_the_entry_is_cached():
+    cache = TTLCache("test_versions_stable", ttl=60)
+    version, value = cache.get_or_load_versioned("k", lambda: [1])
+    assert version is not None
+    assert cache.get_or_load_versioned("k", lambda: [2]) == (version, [1])
+    assert cache.get_or_load("k", lambda: [2]) == [1]
+
+
+def test_version_changes_when_the_entry_is_loaded_again():
+    cache = TTLCache("test_versions_reload", ttl=60)
+    first, _ = cache.get_or_load_versioned("k", lambda: [1])
+    other, _ = cache.get_or_load_versioned("other", lambda: [1])
+    cache.invalidate()
+    second, value = cache.get_or_load_versioned("k", lambda: [2])
+    assert value == [2]
+    assert len({first, other, second}) == 3
+
+
+def test_no_version_when_the_value_is_not_stored():
+    assert TTLCache("test_versions_disabled", ttl=0).get_or_load_versioned("k", lambda: 1) == (None, 1)
+
+    settling = TTLCache("test_versions_settle", ttl=60, settle=60)
+    settling.invalidate()
+    assert settling.get_or_load_versioned("k", lambda: 1) == (None, 1)
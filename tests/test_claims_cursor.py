@@ -0,0 +1,43 @@
+from datetime import date
+
+import pytest
+
+from sql.queries.claimFormQueries import decode_claims_cursor, encode_claims_cursor
+
+
+def test_round_trip():
+    cursor = encode_claims_cursor("claimant_name", "asc", "Ali Khan", "C976")
+    assert decode_claims_cursor(cursor, "claimant_name", "asc") == ("Ali Khan", "C976")
+
+
+def test_cursor_is_url_safe_and_unpadded():
+    cursor = encode_claims_cursor("claimant_name", "desc", "?/+ " * 7, "C1")
+    assert "=" not in cursor
+    assert all(c.isalnum() or c in "-_" for c in cursor)
+
+
+def test_dates_are_encoded_as_iso_strings():
+    cursor = encode_claims_cursor("pay_date", "desc", date(2025, 3, 1), "C7")
+    assert decode_claims_cursor(cursor, "pay_date", "desc") == ("2025-03-01", "C7")
+
+
+def test_null_sort_value_uses_the_sort_key_placeholder():
+    # Same value the ORDER BY coalesces NULL to, so the next page starts right.
+    cursor = encode_claims_cursor("invoice_date", "asc", None, "C2")
+    assert decode_claims_cursor(cursor, "invoice_date", "asc") == ("-infinity", "C2")
+
+    cursor = encode_claims_cursor("claimant_name", "asc", None, "C2")
+    assert decode_claims_cursor(cursor, "claimant_name", "asc") == ("", "C2")
+
+
+@pytest.mark.parametrize("sort, order", [("claim_id", "asc"), ("pay_date", "desc")])
+def test_cursor_for_another_sort_order_is_rejected(sort, order):
+    cursor = encode_claims_cursor("pay_date", "asc", "2025-03-01", "C7")
+    with pytest.raises(ValueError, match="different sort order"):
+        decode_claims_cursor(cursor, sort, order)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "W10", "eyJhIjoxfQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_claims_cursor(cursor, "claim_id", "desc")
@@ -0,0 +1,158 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from utils import compression
+from utils.compression import CompressionMiddleware, choose_encoding, compress_cached, compressed_cache
+
+BODY = json.dumps([{"claim_id": f"C{i}", "claimant_name": "Ali Khan"} for i in range(200)]).encode()
+ETAG = '"0123456789abcdef-7"'
+
+
+@pytest.fixture(autouse=True)
+def gzip_only(monkeypatch):
+    # Tests do not depend on the optional brotli package being installed.
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+def app(status=200, body=BODY, content_type="application/json", etag=ETAG, chunks=None):
+    async def asgi(scope, receive, send):
+        headers = [(b"content-type", content_type.encode())]
+        if etag:
+            headers.append((b"etag", etag.encode()))
+        if chunks is None:
+            headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if chunks is None:
+            await send({"type": "http.response.body", "body": body})
+        else:
+            for i, chunk in enumerate(chunks):
+                await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return asgi
+
+
+def call(asgi, **headers):
+    """Run `asgi` behind the middleware; returns (status, headers, body)."""
+    scope = {
+        "type": "http", "method": "GET", "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(CompressionMiddleware(asgi)(scope, receive, send))
+    start, *bodies = messages
+    return (
+        start["status"],
+        {name.decode(): value.decode() for name, value in start["headers"]},
+        b"".join(message.get("body", b"") for message in bodies),
+    )
+
+
+# ----- NEGOTIATION -----
+
+@pytest.mark.parametrize("accept, encoding", [
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "gzip"),      # br is not offered without brotli
+    ("GZIP;q=0.5", "gzip"),
+    ("*", "gzip"),
+    ("gzip;q=0", None),
+    ("*;q=0", None),
+    ("*, gzip;q=0", None),
+    ("identity", None),
+    ("br", None),
+    ("", None),
+    ("gzip;q=x", None),
+])
+def test_choose_encoding(accept, encoding):
+    assert choose_encoding(accept) == encoding
+
+
+def test_brotli_is_preferred_when_installed(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+
+
+# ----- RESPONSES -----
+
+def test_large_json_is_gzipped_with_a_weak_etag():
+    status, headers, body = call(app(), accept_encoding="gzip")
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == f"W/{ETAG}"
+    assert headers["content-length"] == str(len(body))
+    assert gzip.decompress(body) == BODY
+
+
+def test_without_accept_encoding_the_response_is_untouched():
+    status, headers, body = call(app())
+    assert body == BODY
+    assert headers["etag"] == ETAG
+    assert "content-encoding" not in headers
+
+
+@pytest.mark.parametrize("asgi", [
+    app(body=b'{"success": true}'),                            # below COMPRESSION_MIN_BYTES
+    app(content_type="image/png"),
+    app(status=204, body=b""),
+])
+def test_not_compressed(asgi):
+    status, headers, body = call(asgi, accept_encoding="gzip")
+    assert "content-encoding" not in headers
+    assert headers.get("etag", ETAG) == ETAG
+
+
+def test_streamed_body_is_compressed_chunk_by_chunk():
+    chunks = [BODY[:500], BODY[500:1500], BODY[1500:]]
+    status, headers, body = call(app(content_type="application/x-ndjson", chunks=chunks), accept_encoding="gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert gzip.decompress(body) == BODY
+
+
+# ----- 304 -----
+
+def test_304_repeats_the_weak_etag_the_client_holds():
+    status, headers, body = call(app(status=304, body=b""), accept_encoding="gzip", if_none_match=f"W/{ETAG}")
+    assert status == 304
+    assert headers["etag"] == f"W/{ETAG}"
+    assert body == b""
+
+
+def test_304_keeps_a_strong_etag_the_client_holds():
+    status, headers, _ = call(app(status=304, body=b""), if_none_match=ETAG)
+    assert headers["etag"] == ETAG
+
+
+def test_304_matched_among_several_etags_without_accept_encoding():
+    status, headers, _ = call(app(status=304, body=b""), if_none_match=f'"other", W/{ETAG}')
+    assert headers["etag"] == f"W/{ETAG}"
+
+
+# ----- CACHE -----
+
+def test_compressed_bodies_are_cached_by_etag():
+    compressed_cache.invalidate()
+    before = compressed_cache.stats()
+    first = compress_cached(BODY, "gzip", ETAG)
+    assert compress_cached(BODY, "gzip", ETAG) is first
+    after = compressed_cache.stats()
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 1)
+
+
+def test_bodies_without_an_etag_are_not_cached():
+    compressed_cache.invalidate()
+    before = compressed_cache.stats()
+    assert gzip.decompress(compress_cached(BODY, "gzip", None)) == BODY
+    after = compressed_cache.stats()
+    assert after["entries"] == 0
+    assert (after["hits"], after["misses"]) == (before["hits"], before["misses"])
@@ -0,0 +1,115 @@
+import psycopg2
+import pytest
+from psycopg2.extensions import STATUS_READY, TRANSACTION_STATUS_IDLE
+
+from db.connection import ConnectionPool, current, detach
+from sql.combinedQueries import AsyncQueries
+
+
+class FakeInfo:
+    transaction_status = TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    """Just enough of PooledConnection for the pool; `dropped` fails its next query."""
+
+    def __init__(self):
+        self.closed = 0
+        self.status = STATUS_READY
+        self.info = FakeInfo()
+        self.created_at = self.last_used_at = self.last_checked_at = float("inf")
+        self.pool = self.lease = self.admission = self.replaced_by = None
+        self.unverified = False
+        self.dropped = False
+
+    def query(self):
+        if self.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        if self.dropped:
+            self.closed = 2
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        return "row"
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeQueries:
+    def __init__(self, conn):
+        self.conn = conn
+        self.calls = 0
+
+    def read(self):
+        self.calls += 1
+        return self.conn.query()
+
+    def read_quietly(self):
+        # Like the query methods that log and swallow their errors.
+        self.calls += 1
+        try:
+            return self.conn.query()
+        except psycopg2.Error:
+            return None
+
+
+class FakeAsyncQueries(AsyncQueries):
+    queries_class = FakeQueries
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=2, keepalive_interval=0)
+    yield pool
+    pool.closeall()
+
+
+def checkout(pool):
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn = pool.getconn()   # reused from the idle list
+    conn.pool, conn.lease = pool, object()
+    return conn
+
+
+def test_reused_connections_are_unverified_new_ones_are_not(pool):
+    assert pool.getconn().unverified is False
+    assert checkout(pool).unverified is True
+
+
+@pytest.mark.parametrize("method", ["read", "read_quietly"])
+def test_dropped_connection_is_replaced_and_the_call_retried(pool, method):
+    conn = checkout(pool)
+    lease = conn.lease
+    conn.dropped = True
+    queries = FakeAsyncQueries(conn)
+
+    assert queries._call(method, (), {}) == "row"
+    assert queries.sync.calls == 2
+
+    new = current(conn)
+    assert new is not conn and conn.closed
+    assert queries.conn is new and queries.sync.conn is new
+    assert new.lease is lease and conn.lease is None
+    assert pool.stats()["in_use"] == 1 and pool.stats()["size"] == 1
+
+    detach(conn)   # the old reference still reaches the connection in use
+    assert new.lease is None
+
+
+def test_only_the_first_call_is_retried(pool):
+    conn = checkout(pool)
+    queries = FakeAsyncQueries(conn)
+    assert queries._call("read", (), {}) == "row"
+
+    conn.dropped = True
+    with pytest.raises(psycopg2.OperationalError):
+        queries._call("read", (), {})
+    assert current(conn) is conn
+
+
+def test_connections_not_from_a_request_are_not_retried(pool):
+    conn = checkout(pool)
+    conn.pool = None
+    conn.dropped = True
+    with pytest.raises(psycopg2.OperationalError):
+        FakeAsyncQueries(conn)._call("read", (), {})
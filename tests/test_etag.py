@@ -0,0 +1,56 @@
+import pytest
+from starlette.requests import Request
+
+from utils.etag import CACHE_CONTROL, cache_etag, claim_etag, etag_matches, not_modified
+
+ETAG = '"0123456789abcdef-7"'
+
+
+def request(if_none_match: str | None = None) -> Request:
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_claim_etag_is_strong_and_versioned():
+    etag = claim_etag("accident_claim", "C1", 3)
+    assert etag.startswith('"') and etag.endswith('-3"')
+    assert claim_etag("accident_claim", "C1", 4) != etag
+    assert claim_etag("rental_agreement", "C1", 3) != etag
+
+
+def test_claim_etag_is_none_for_a_missing_claim():
+    assert claim_etag("accident_claim", "C1", None) is None
+
+
+def test_cache_etag():
+    etag = cache_etag("claims?limit=50", "ab12cd34.7")
+    assert etag.startswith('"') and etag.endswith('-ab12cd34.7"')
+    assert cache_etag("claims?limit=20", "ab12cd34.7") != etag
+    assert cache_etag("claims?limit=50", None) is None
+
+
+@pytest.mark.parametrize("header", [
+    ETAG,
+    f"W/{ETAG}",                          # weak comparison: W/ is ignored
+    f'"other", {ETAG}',
+    f'"other",W/{ETAG}',
+    "*",
+])
+def test_matches(header):
+    assert etag_matches(request(header), ETAG)
+
+
+@pytest.mark.parametrize("header", [None, "", '"other"', 'W/"other"', ETAG[:-1]])
+def test_does_not_match(header):
+    assert not etag_matches(request(header), ETAG)
+
+
+def test_nothing_matches_a_missing_etag():
+    assert not etag_matches(request("*"), None)
+
+
+def test_not_modified_carries_the_validator():
+    response = not_modified(ETAG)
+    assert response.status_code == 304
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == CACHE_CONTROL
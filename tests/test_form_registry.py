@@ -0,0 +1,180 @@
+import time
+
+import psycopg2
+import pytest
+
+from api.forms import etag_resource, parse_fields
+from db.connection import DBConnection
+from sql.queries import formRegistry
+from sql.queries.formRegistry import FORMS, Column, Form, form_for, reflect_forms
+
+# ----- ?fields= PROJECTION -----
+
+
+def test_no_fields_selects_every_column():
+    assert FORMS["accident_claims"].select_list(None) == "*"
+
+
+def test_fields_are_selected_with_the_key_columns():
+    form = FORMS["accident_claims"]
+    assert form.select_list(["checklist_pi", "client_signature"]) == "claim_id, checklist_pi, client_signature"
+    # A key asked for explicitly is not selected twice.
+    assert form.select_list(["claim_id", "checklist_pi"]) == "claim_id, checklist_pi"
+
+
+def test_readable_only_columns_are_allowed():
+    assert FORMS["accident_claims"].select_list(["json_after"]) == "claim_id, json_after"
+
+
+@pytest.mark.parametrize("fields", [
+    ["no_such_column"],
+    ["checklist_pi", "password"],
+    ["claim_id; DROP TABLE claims"],
+    ["*"],
+    ["checklist_pi AS x"],
+])
+def test_fields_outside_the_allowlist_are_rejected(fields):
+    with pytest.raises(ValueError, match="Unknown field"):
+        FORMS["accident_claims"].select_list(fields)
+
+
+def test_rejection_is_not_cached():
+    form = FORMS["storage_forms"]
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            form.select_list(["no_such_column"])
+
+
+def test_narrowed_view_returns_only_selected_columns():
+    view = FORMS["accident_claims"].views["read"]
+    row = {"claim_id": "C1", "checklist_pi": True}
+    assert view(row, ["checklist_pi"]) == {"claim_id": "C1", "checklist_pi": True}
+    # The full view fills in every key.
+    assert len(view(row)) == len(view.keys)
+
+
+@pytest.mark.parametrize("raw, fields", [
+    (None, None),
+    ("", None),
+    (" , ", None),
+    ("a,b", ["a", "b"]),
+    (" b , a ,b", ["b", "a"]),
+])
+def test_parse_fields(raw, fields):
+    assert parse_fields(raw) == fields
+
+
+def test_each_projection_has_its_own_etag_resource():
+    assert etag_resource("accident_claim", None) == "accident_claim"
+    assert etag_resource("accident_claim", ["b", "a"]) == etag_resource("accident_claim", ["a", "b"])
+    assert etag_resource("accident_claim", ["a"]) != etag_resource("accident_claim", None)
+    assert etag_resource("accident_claim", None, "ref") == "accident_claim?blobs=ref"
+
+
+# ----- REFLECTION -----
+
+@pytest.fixture
+def unreflected(monkeypatch):
+    """A process that has not reflected yet and has no database configured."""
+    monkeypatch.setattr(formRegistry, "_reflected", False)
+    monkeypatch.setattr(formRegistry, "_retry_at", 0.0)
+    monkeypatch.setattr(DBConnection, "_pool", None)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append(" ".join(query.split()))
+        if "information_schema" in query and self.conn.error:
+            raise self.conn.error
+
+    def fetchall(self):
+        return self.conn.rows
+
+
+class FakeConnection:
+    def __init__(self, rows=(), error=None):
+        self.rows = list(rows)
+        self.error = error
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def test_reflect_forms_without_a_database_keeps_the_declarations(unreflected):
+    writable = {table: form.writable for table, form in FORMS.items()}
+    assert reflect_forms() == 0
+    assert formRegistry._reflected is False
+    assert formRegistry._retry_at > time.monotonic()
+    assert {table: form.writable for table, form in FORMS.items()} == writable
+
+
+def test_form_for_without_a_database_waits_before_retrying(unreflected, monkeypatch):
+    attempts = []
+    monkeypatch.setattr(formRegistry, "reflect_forms", lambda conn=None: attempts.append(conn) or reflect_forms(conn))
+
+    assert form_for(None, "accident_claims") is FORMS["accident_claims"]
+    assert form_for(None, "rental_agreements") is FORMS["rental_agreements"]
+    assert len(attempts) == 1
+
+    monkeypatch.setattr(formRegistry, "_retry_at", 0.0)
+    form_for(None, "accident_claims")
+    assert len(attempts) == 2
+
+
+def test_failed_reflection_leaves_the_callers_transaction_usable(unreflected):
+    conn = FakeConnection(error=psycopg2.errors.InsufficientPrivilege("permission denied"))
+    assert reflect_forms(conn) == 0
+    assert conn.executed[0] == "SAVEPOINT reflect_forms"
+    assert conn.executed[-1] == "ROLLBACK TO SAVEPOINT reflect_forms"
+
+
+def test_missing_tables_keep_the_declarations(unreflected):
+    conn = FakeConnection(rows=[])
+    writable = FORMS["storage_forms"].writable
+    assert reflect_forms(conn) == 0
+    assert formRegistry._reflected is True
+    assert FORMS["storage_forms"].writable == writable
+    assert conn.executed[-1] == "RELEASE SAVEPOINT reflect_forms"
+
+
+def test_read_columns_holds_types_nullability_and_defaults():
+    conn = FakeConnection(rows=[
+        ("storage_forms", "claim_id", "text", False, None),
+        ("storage_forms", "created_at", "timestamp with time zone", True, "now()"),
+        ("rental_agreements", "daily_rate", "numeric", True, "0"),
+    ])
+    tables = formRegistry._read_columns(conn)
+    assert tables["storage_forms"]["created_at"] == Column("created_at", "timestamp with time zone", True, "now()")
+    assert tables["storage_forms"]["claim_id"].default is None
+    assert tables["rental_agreements"]["daily_rate"].default == "0"
+    assert "column_default" in conn.executed[1]
+
+
+def test_reflect_drops_columns_the_table_lacks_and_types_blanks():
+    form = Form("reflect_test", ("claim_id",), ("pay_date", "notes", "amount", "planned"), ("extra",))
+    form.reflect({
+        "claim_id": Column("claim_id", "text", False, None),
+        "pay_date": Column("pay_date", "date", True, None),
+        "notes": Column("notes", "text", True, "''::text"),
+        "amount": Column("amount", "numeric", False, "0"),
+    })
+    assert form.writable == ("pay_date", "notes", "amount")
+    assert form.columns["amount"].default == "0"
+    assert form.blank_as_null == ("pay_date",)
+    with pytest.raises(ValueError):
+        form.select_list(["extra"])
+
+    data = {"pay_date": "", "notes": "", "amount": ""}
+    assert form.coerce(data) == {"pay_date": None, "notes": "", "amount": ""}
+    assert form.coerce({"notes": ""}) == {"notes": ""}
@@ -0,0 +1,160 @@
+import pytest
+
+from db import query_metrics
+from db.query_metrics import (
+    UNTAGGED, _BUCKETS, _MIN_SECONDS, _MethodStats, _TimingMixin, _bucket, _bucket_upper,
+    current_method, instrumented, query_stats, record, tag,
+)
+
+pytestmark = pytest.mark.skipif(not query_metrics.ENABLED, reason="QUERY_METRICS=0")
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(query_metrics, "_stats", {})
+    monkeypatch.setattr(query_metrics, "BYTES_SAMPLE_EVERY", 1)
+
+
+# ----- HISTOGRAM -----
+
+def test_bucket_edges():
+    assert _bucket(0.0) == 0
+    assert _bucket(_MIN_SECONDS) == 0
+    assert _bucket(_MIN_SECONDS * 1.01) == 1
+    assert _bucket(_MIN_SECONDS * 2.01) == 5          # four buckets per doubling
+    assert _bucket(1e6) == _BUCKETS - 1
+
+
+@pytest.mark.parametrize("seconds", [2e-5, 3.3e-4, 0.001, 0.0123, 0.25, 1.0, 42.0])
+def test_bucket_upper_bound_is_within_one_step(seconds):
+    upper = _bucket_upper(_bucket(seconds))
+    assert seconds <= upper <= seconds * 2 ** 0.25 * (1 + 1e-9)
+
+
+def stats_of(samples) -> _MethodStats:
+    for seconds in samples:
+        record("m", seconds, 0)
+    return query_metrics._stats["m"]
+
+
+def test_quantiles():
+    stats = stats_of([0.001] * 90 + [0.1] * 9 + [2.0])
+    assert 0.001 <= stats.quantile(0.50) < 0.0012
+    assert 0.1 <= stats.quantile(0.95) < 0.12
+    assert stats.quantile(0.99) < 0.12
+    assert stats.quantile(1.0) == 2.0
+
+
+def test_quantile_never_exceeds_the_maximum():
+    stats = stats_of([0.0101] * 10)
+    assert stats.quantile(0.5) == stats.max == 0.0101
+
+
+def test_empty_stats():
+    assert _MethodStats().quantile(0.99) == 0.0
+    assert _MethodStats().summary()["mean_ms"] == 0.0
+
+
+def test_record_summary():
+    record("m", 0.002, 3)
+    record("m", 0.004, -1)                  # rowcount -1: statement without rows
+    record("m", 0.006, 0, failed=True)
+    summary = query_stats()["m"]
+    assert summary["count"] == 3
+    assert summary["errors"] == 1
+    assert summary["rows"] == 3
+    assert summary["mean_ms"] == 4.0
+    assert summary["max_ms"] == 6.0
+    assert summary["total_ms"] == 12.0
+
+
+def test_query_stats_are_ordered_by_total_time():
+    record("fast", 0.001, 0)
+    record("slow", 0.5, 0)
+    assert list(query_stats()) == ["slow", "fast"]
+
+
+# ----- CURSORS -----
+
+class FakeCursor:
+    rowcount = -1
+
+    def __init__(self, rows=(), error=None):
+        self.rows = list(rows)
+        self.error = error
+
+    def execute(self, query, vars=None):
+        if self.error:
+            raise self.error
+        self.rowcount = len(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchmany(self, size=None):
+        return self.rows[:size]
+
+    def fetchall(self):
+        return self.rows
+
+
+class TimingFakeCursor(_TimingMixin, FakeCursor):
+    pass
+
+
+def test_timing_cursor_records_execute_and_result_bytes():
+    cur = TimingFakeCursor(rows=[("abcd", 1, None), ("ef", 2.5, b"xyz")])
+    with tag("get_things"):
+        cur.execute("SELECT ...")
+        assert cur.fetchall() == cur.rows
+    summary = query_stats()["get_things"]
+    assert (summary["count"], summary["rows"], summary["errors"]) == (1, 2, 0)
+    assert summary["bytes"] == 4 + 8 + 2 + 8 + 3
+
+
+def test_timing_cursor_records_failures_and_reraises():
+    cur = TimingFakeCursor(error=ValueError("boom"))
+    with tag("broken"), pytest.raises(ValueError):
+        cur.execute("SELECT ...")
+    assert query_stats()["broken"]["errors"] == 1
+
+
+# ----- METHOD TAGGING -----
+
+@instrumented
+class Queries:
+    def __init__(self):
+        self.cursor = TimingFakeCursor(rows=[(1,)])
+
+    def outer(self):
+        self.inner()
+        self.cursor.execute("SELECT outer")
+        return current_method()
+
+    def inner(self):
+        self.cursor.execute("SELECT inner")
+
+    def _helper(self):
+        return current_method()
+
+
+def test_queries_are_attributed_to_the_innermost_method():
+    queries = Queries()
+    assert queries.outer() == "outer"
+    stats = query_stats()
+    assert stats["outer"]["count"] == 1
+    assert stats["inner"]["count"] == 1
+    assert current_method() == UNTAGGED
+
+
+def test_private_methods_keep_the_callers_tag():
+    assert Queries()._helper() == UNTAGGED
+    with tag("caller"):
+        assert Queries()._helper() == "caller"
+
+
+def test_tag_is_restored_after_an_error():
+    with pytest.raises(RuntimeError):
+        with tag("failing"):
+            raise RuntimeError
+    assert current_method() == UNTAGGED
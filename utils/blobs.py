@@ -0,0 +1,187 @@
+"""
+Content-addressed store for the large payloads kept on form rows:
+signatures, drawings and vehicle images (base64 data URLs).
+
+A payload is written once, under the SHA-256 of its bytes, and the row keeps
+only a reference:
+
+    blob:sha256:<64 hex digits>:<size in bytes>
+
+so SELECT * / RETURNING * on the form tables move a few dozen bytes per
+column instead of the image. Identical payloads share one blob.
+
+Usage:
+    data = store_blobs(data, ("client_signature", ...))   # before writing a row
+    row = expand_blobs(row)                              # before returning it
+
+GET /api/blobs/{hash} serves a blob on its own; clients that ask for
+references (?blobs=ref) fetch images from there and can cache them forever.
+
+Blobs live in files under BLOB_STORE_DIR (default blob_store/ in the
+project directory; relative paths are taken from there too). The directory
+must be shared by every instance and survive deploys. main.py checks at
+startup that it can be written; where it cannot (e.g. a read-only
+serverless filesystem) payloads are kept inline in the row as before, so
+no instance writes a reference the others cannot resolve.
+
+Blobs are written before the row that references them is committed, so a
+rolled-back save or a replaced image leaves an unreferenced blob behind;
+scripts/dedupe_form_blobs.py --gc removes those once they are old enough.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BLOB_STORE_DIR = BASE_DIR / os.getenv("BLOB_STORE_DIR", "blob_store")   # an absolute value replaces BASE_DIR
+
+# Values shorter than this stay inline: a reference is ~80 bytes.
+BLOB_MIN_BYTES = int(os.getenv("BLOB_MIN_BYTES", "1024"))
+
+REF_PREFIX = "blob:sha256:"
+
+_REF_RE = re.compile(r"^blob:sha256:([0-9a-f]{64}):(\d+)$")
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class FileBlobBackend:
+    """Blobs as files, fanned out by the first two bytes of the digest."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.writable = True   # until check_writable() finds otherwise
+
+    def check_writable(self) -> bool:
+        """Create the store directory if needed and try writing a file in it."""
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with tempfile.TemporaryFile(dir=self.root, prefix=".check-"):
+                pass
+        except OSError as e:
+            logger.error("Blob store %s is not writable (%s); keeping payloads inline", self.root, e)
+            self.writable = False
+        else:
+            self.writable = True
+        return self.writable
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def exists(self, digest: str) -> bool:
+        return self._path(digest).is_file()
+
+    def get(self, digest: str) -> bytes | None:
+        try:
+            return self._path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def scan(self):
+        """(digest, size, mtime) of every stored blob."""
+        for path in self.root.glob("??/??/*"):
+            if is_digest(path.name):
+                stat = path.stat()
+                yield path.name, stat.st_size, stat.st_mtime
+
+    def delete(self, digest: str):
+        self._path(digest).unlink(missing_ok=True)
+
+    def put(self, digest: str, data: bytes):
+        path = self._path(digest)
+        if path.is_file():
+            # Reused: refresh its age so a GC pass cannot delete it before
+            # the row that references it is committed.
+            os.utime(path)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial blob.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+backend = FileBlobBackend(BLOB_STORE_DIR)
+
+
+# ----- REFERENCES -----
+
+def parse_ref(value) -> tuple[str, int] | None:
+    """(digest, size) if `value` is a blob reference, else None."""
+    if not isinstance(value, str) or not value.startswith(REF_PREFIX):
+        return None
+    match = _REF_RE.match(value)
+    return (match.group(1), int(match.group(2))) if match else None
+
+
+def is_digest(value: str) -> bool:
+    return bool(_DIGEST_RE.match(value))
+
+
+def put(value: str) -> str:
+    """Store `value` and return its reference."""
+    data = value.encode()
+    digest = hashlib.sha256(data).hexdigest()
+    backend.put(digest, data)
+    return f"{REF_PREFIX}{digest}:{len(data)}"
+
+
+def get(digest: str) -> bytes | None:
+    return backend.get(digest)
+
+
+# ----- ROWS -----
+
+def to_ref(value):
+    """
+    The reference for a large string payload; anything else unchanged (as is
+    everything while the store cannot be written).
+    """
+    if not isinstance(value, str) or len(value) < BLOB_MIN_BYTES or value.startswith(REF_PREFIX):
+        return value
+    if not backend.writable:
+        return value
+    return put(value)
+
+
+def store_blobs(data: dict, columns) -> dict:
+    """Copy of `data` with the large payloads in `columns` moved to the store."""
+    if not any(column in data for column in columns):
+        return data
+    data = dict(data)
+    for column in columns:
+        if column in data:
+            data[column] = to_ref(data[column])
+    return data
+
+
+def expand(value):
+    """The payload for a reference; None if the blob is missing."""
+    ref = parse_ref(value)
+    if ref is None:
+        return value
+    data = backend.get(ref[0])
+    if data is None:
+        # Never hand the reference itself to a client that expects an image.
+        logger.warning("Missing blob %s (store %s)", ref[0], backend.root)
+        return None
+    return data.decode()
+
+
+def expand_blobs(row):
+    """Replace references in a row dict, a list of them, or nested JSON."""
+    if isinstance(row, dict):
+        return {key: expand_blobs(value) for key, value in row.items()}
+    if isinstance(row, list):
+        return [expand_blobs(value) for value in row]
+    return expand(row)
@@ -0,0 +1,109 @@
+import os
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+_caches = {}   # name -> TTLCache, for cache_stats()
+
+# Prefix of entry versions, so two processes never hand out the same one.
+_PROCESS = os.urandom(4).hex()
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with expiry and explicit invalidation.
+
+    Entries live for `ttl` seconds at most; writers call invalidate() (after
+    their transaction commits) to drop everything at once. A load that was
+    already running when invalidate() was called is returned to its caller
+    but not stored, so a stale result never outlives the write that made it
+    stale. For `settle` seconds after an invalidation nothing is stored
+    either, which covers reads served by a lagging replica.
+
+    The cache is per process: other instances only see a write once their
+    own entries expire, so keep `ttl` short. ttl <= 0 disables caching.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 256, settle: float = 0.0):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.settle = settle
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()      # key -> (expires_at, value, version), oldest first
+        self._versions = itertools.count(1)
+        self._generation = 0
+        self._invalidated_at = float("-inf")
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+        _caches[name] = self
+
+    def get_or_load(self, key, load):
+        """
+        Cached value for `key`, or the result of load() (stored for next time).
+        Callers share cached values and must not mutate them.
+        """
+        return self.get_or_load_versioned(key, load)[1]
+
+    def get_or_load_versioned(self, key, load) -> tuple:
+        """
+        (version, value) as get_or_load(), where version identifies the stored
+        entry: it changes whenever the entry is loaded again, so it can back
+        an ETag. None when the value was not stored.
+        """
+        if self.ttl <= 0:
+            return None, load()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[2], entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = load()
+        version = None
+
+        with self._lock:
+            now = time.monotonic()
+            if generation == self._generation and now - self._invalidated_at >= self.settle:
+                version = f"{_PROCESS}.{next(self._versions)}"
+                self._entries[key] = (now + self.ttl, value, version)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return version, value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _caches.items()}
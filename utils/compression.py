@@ -0,0 +1,211 @@
+"""
+Response compression (brotli or gzip, negotiated from Accept-Encoding).
+
+JSON, NDJSON and text responses of at least COMPRESSION_MIN_BYTES are
+compressed; smaller ones, images and anything already encoded are sent as
+is. Streamed responses (NDJSON) are compressed chunk by chunk and flushed
+after each one, so rows still reach the client as they are produced.
+
+Large bodies are compressed on a worker thread to keep the event loop free.
+Those with an ETag are cached by it: the same ETag means the same bytes, so
+every client after the first gets the stored compressed body instead of
+compressing it again, without hashing the body to find out. Lists served
+from an in-process cache (GET /api/claims) get an ETag from their cache entry
+for this reason.
+
+A compressed representation carries the weak form of the route's ETag
+(W/"..."). A 304 answering an If-None-Match that holds that weak form
+repeats it, so the client keeps the validator it cached.
+
+Brotli needs the optional `brotli` package; without it only gzip is offered.
+
+Usage (main.py):
+    app.add_middleware(CompressionMiddleware)
+"""
+
+import os
+import gzip
+import zlib
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from utils.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:   # optional: gzip only
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Bodies this large are compressed on a worker thread (and cached, if they have an ETag).
+COMPRESSION_CACHE_MIN_BYTES = int(os.getenv("COMPRESSION_CACHE_MIN_BYTES", "65536"))
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5   # close to gzip speed, noticeably smaller output
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript")
+
+compressed_cache = TTLCache(
+    "compressed_responses",
+    ttl=float(os.getenv("COMPRESSION_CACHE_TTL", "300")),
+    maxsize=int(os.getenv("COMPRESSION_CACHE_MAX_ENTRIES", "64")),
+)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """"br" or "gzip" if the client accepts it (brotli preferred), else None."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_cached(body: bytes, encoding: str, etag: str | None) -> bytes:
+    if not etag:
+        return compress(body, encoding)
+    key = (encoding, etag, len(body))
+    return compressed_cache.get_or_load(key, lambda: compress(body, encoding))
+
+
+def weak(etag: str) -> str:
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if last else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None and "if-none-match" not in headers:
+            await self.app(scope, receive, send)
+            return
+        responder = _Responder(send, encoding, self.minimum_size, headers.get("if-none-match", ""))
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    """Holds back http.response.start until the first body chunk shows what to do."""
+
+    def __init__(self, send, encoding: str | None, minimum_size: int, if_none_match: str = ""):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.if_none_match = if_none_match
+        self.start = None
+        self.stream = None          # _StreamCompressor once a streamed body is being compressed
+        self.passthrough = False
+
+    def _compressible(self, headers) -> bool:
+        if self.encoding is None or self.start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _set_encoded(self, headers, length: int | None):
+        headers["Content-Encoding"] = self.encoding
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        # The encoded bytes differ from the identity ones; a strong ETag
+        # must not be shared between them.
+        etag = headers.get("etag")
+        if etag:
+            headers["ETag"] = weak(etag)
+
+    def _not_modified(self, headers):
+        """A 304 repeats the ETag in the form the client holds (weak if it came compressed)."""
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            held = [tag.strip() for tag in self.if_none_match.split(",")]
+            if weak(etag) in held:
+                headers["ETag"] = weak(etag)
+
+    async def send(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start = message
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+
+        if self.stream is not None:
+            await self._send({"type": kind, "body": self.stream.chunk(body, last=not more), "more_body": more})
+            return
+
+        self.start["headers"] = list(self.start.get("headers", []))
+        headers = MutableHeaders(raw=self.start["headers"])
+        if self.start["status"] == 304:
+            self._not_modified(headers)
+        if not self._compressible(headers):
+            self.passthrough = True
+            await self._send(self.start)
+            await self._send(message)
+            return
+        headers.add_vary_header("Accept-Encoding")
+
+        if more:
+            self.stream = _StreamCompressor(self.encoding)
+            self._set_encoded(headers, None)
+            await self._send(self.start)
+            await self._send({"type": kind, "body": self.stream.chunk(body, last=False), "more_body": True})
+            return
+
+        if len(body) < self.minimum_size:
+            self.passthrough = True
+            await self._send(self.start)
+            await self._send(message)
+            return
+
+        if len(body) >= COMPRESSION_CACHE_MIN_BYTES:
+            body = await run_in_threadpool(compress_cached, body, self.encoding, headers.get("etag"))
+        else:
+            body = compress(body, self.encoding)
+        self._set_encoded(headers, len(body))
+        await self._send(self.start)
+        await self._send({"type": kind, "body": body, "more_body": False})
@@ -0,0 +1,49 @@
+import hashlib
+from fastapi import Request, Response
+
+# Representations keyed by the claim's row_version may be cached by the
+# browser but must be revalidated on every use.
+CACHE_CONTROL = "private, no-cache"
+
+
+def claim_etag(resource: str, claim_id: str, version: int | None) -> str | None:
+    """
+    Strong ETag for one per-claim representation (`resource` tells the
+    endpoints apart). None when the claim does not exist.
+    """
+    if version is None:
+        return None
+    digest = hashlib.sha1(f"{resource}:{claim_id}".encode()).hexdigest()[:16]
+    return f'"{digest}-{version}"'
+
+
+def cache_etag(resource: str, version: str | None) -> str | None:
+    """
+    ETag for a response served from an in-process cache entry, from the
+    entry's version (TTLCache.get_or_load_versioned). None when the result
+    was not stored, so nothing can be revalidated against it.
+    """
+    if version is None:
+        return None
+    digest = hashlib.sha1(resource.encode()).hexdigest()[:16]
+    return f'"{digest}-{version}"'
+
+
+def etag_matches(request: Request, etag: str | None) -> bool:
+    """True when If-None-Match lists `etag` (or is *)."""
+    header = request.headers.get("if-none-match")
+    if not etag or not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored.
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str | None):
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,157 @@
+"""
+Fast JSON rendering for route results.
+
+FastAPI's default path runs every result through jsonable_encoder, which
+walks each row dict in pure Python (converting Decimal, date and datetime as
+it goes), and then json.dumps walks it all again. For the large lists
+(get_all_claims, get_all_invoices, get_all_cars) that walk is most of the
+time a request takes once the rows come from cache.
+
+FastJSONResponse serializes straight from the row dicts with orjson, which
+handles date/datetime/UUID/dict subclasses natively and calls `default`
+only for the rest (Decimal, bytea). The output matches jsonable_encoder:
+Decimals with no fractional part become ints, the rest floats.
+
+FastJSONRoute skips jsonable_encoder: results of routes that return plain
+JSON (no pydantic response_model to filter through) are rendered with
+FastJSONResponse directly. Status codes and headers set on an injected
+`Response` (ETag, Cache-Control) are kept, as FastAPI would keep them.
+
+Without orjson installed the stdlib json module is used with the same
+`default`, which still saves the jsonable_encoder pass.
+
+Usage:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    router = APIRouter(prefix="/api", route_class=FastJSONRoute)
+"""
+
+import json
+import types
+import inspect
+import functools
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Union, get_args, get_origin
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:   # optional: stdlib json
+    orjson = None
+
+
+def default(value):
+    """Conversions for the types orjson (or json) does not handle itself."""
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).decode()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=default, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ----- ROUTES -----
+
+_PLAIN_TYPES = (str, int, float, bool, type(None), dict, list, Any)
+
+
+def _plain_json(annotation) -> bool:
+    """True if `annotation` declares plain JSON, i.e. no model to validate/filter through."""
+    if annotation is None or annotation is inspect.Signature.empty or annotation in _PLAIN_TYPES:
+        return True
+    if get_origin(annotation) in (dict, list, Union, types.UnionType):
+        return all(arg is Ellipsis or _plain_json(arg) for arg in get_args(annotation))
+    return False
+
+
+def _is_response(annotation) -> bool:
+    return inspect.isclass(annotation) and issubclass(annotation, Response)
+
+
+def _render_json(endpoint, status_code: int | None):
+    """
+    Wrap `endpoint` so a plain result is rendered with FastJSONResponse.
+
+    The wrapper asks FastAPI for the per-request Response (adding a parameter
+    for it if the endpoint has none) to carry its status code and headers
+    over, since FastAPI only copies them onto responses it builds itself.
+    """
+    signature = inspect.signature(endpoint, eval_str=True)
+    name = next((p.name for p in signature.parameters.values() if _is_response(p.annotation)), None)
+    added = name is None
+    if added:
+        name = "_json_response"
+        params = list(signature.parameters.values())
+        position = len(params)
+        if params and params[-1].kind is inspect.Parameter.VAR_KEYWORD:
+            position -= 1
+        params.insert(position, inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+        signature = signature.replace(parameters=params)
+
+    def render(result, sub_response: Response):
+        if isinstance(result, Response):
+            return result
+        response = FastJSONResponse(result, status_code=sub_response.status_code or status_code or 200)
+        if not is_body_allowed_for_status_code(response.status_code):
+            response.body = b""
+        response.raw_headers.extend(sub_response.raw_headers)
+        return response
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            sub_response = kwargs.pop(name) if added else kwargs[name]
+            return render(await endpoint(**kwargs), sub_response)
+    else:
+        # Sync endpoints run on the threadpool; so does their rendering.
+        @functools.wraps(endpoint)
+        def wrapper(**kwargs):
+            sub_response = kwargs.pop(name) if added else kwargs[name]
+            return render(endpoint(**kwargs), sub_response)
+
+    wrapper.__signature__ = signature
+    wrapper.renders_json = True
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """APIRoute that renders plain-JSON results with orjson, skipping jsonable_encoder."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        response_model = kwargs.get("response_model")
+        if isinstance(response_model, DefaultPlaceholder):
+            response_model = inspect.signature(endpoint, eval_str=True).return_annotation
+        response_class = kwargs.get("response_class")
+        if (
+            not getattr(endpoint, "renders_json", False)   # already wrapped (include_router)
+            and (response_class is None or isinstance(response_class, DefaultPlaceholder))
+            and _plain_json(response_model)
+        ):
+            endpoint = _render_json(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
@@ -1,9 +1,21 @@
-from passlib.context import CryptContext
+import threading
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# passlib + argon2 are only needed by login and user management, so the
+# context is built on first use instead of at import (keeps cold starts fast).
+_pwd_context = None
+_pwd_context_lock = threading.Lock()
+
+def _get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        with _pwd_context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+                _pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+    return _pwd_context
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _get_pwd_context().hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+    return _get_pwd_context().verify(password, hashed)